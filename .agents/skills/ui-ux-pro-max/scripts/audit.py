@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Audit - Statically scan a source tree for the anti-patterns
+listed in the guideline CSVs and report file, line, rule and severity.
+
+The "Code Example Bad" / "Code Bad" / "Don't" cells of the react, web and ux
+guidelines (plus the stack CSVs passed with --stack) are compiled into
+detectors: a whitespace- and quote-tolerant regex per example and the
+longest literal it requires. Each file is memory-mapped and searched for
+the literals first; only the detectors whose literal occurs run their
+regex. Files are spread over a process pool.
+
+Prose examples ("No padding compensation") and examples without enough code
+to be specific ("useState only") are skipped, so this is a fast first pass,
+not a linter.
+
+Usage: python audit.py <path> [--stack nextjs] [--min-severity High]
+       python audit.py src --stack nextjs,react --format json
+       Append "uipro-ignore" in a comment on a line to silence it.
+"""
+
+import argparse
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from core import CSV_CONFIG, DATA_DIR, STACK_CONFIG, AVAILABLE_STACKS, load_rows
+from render import iter_json, iter_jsonl, write_lines
+
+
+# ============ CONFIGURATION ============
+# Guideline domains always audited: (domain, title column); stacks add ("stack:<name>", "Guideline")
+AUDIT_DOMAINS = [("react", "Issue"), ("web", "Issue"), ("ux", "Issue")]
+BAD_CODE_COLUMNS = ["Code Example Bad", "Code Bad", "Don't"]
+SEVERITIES = ["Critical", "High", "Medium-High", "Medium", "Low"]
+
+SOURCE_EXTENSIONS = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".vue", ".svelte", ".astro", ".html", ".htm",
+                     ".css", ".scss", ".dart", ".swift", ".kt"}
+IGNORED_DIRS = {".git", ".hg", ".svn", "node_modules", ".next", ".nuxt", ".svelte-kit", ".astro", ".turbo",
+                ".vercel", ".cache", "dist", "build", "out", "coverage", "vendor", "__pycache__", ".venv", "Pods"}
+MAX_FILE_BYTES = 1 << 20    # larger files are bundles or generated code
+BINARY_SNIFF = 8192         # a NUL byte in the first bytes marks a binary file
+IGNORE_MARKER = b"uipro-ignore"
+
+MIN_LITERAL = 4             # shortest literal a detector may require
+MIN_FIXED = 9               # fewest literal characters a whole example must pin down
+MAX_SNIPPET = 120
+FILES_PER_TASK = 256        # files sent to a worker at a time
+PARALLEL_MIN_FILES = 512    # smaller trees are scanned in-process
+
+# Words that turn an example into a description of when it is bad ("h-screen on mobile")
+_PROSE_WORDS = {"on", "in", "for", "or", "and", "with", "without", "only", "of", "to", "the", "every", "each", "all",
+                "no", "not", "everywhere", "then", "instead", "when"}
+# Words in a "// note" meaning the code is only bad when something is missing ("// no replacement")
+_NOTE_QUALIFIERS = {"no", "not", "nothing", "without", "only", "alone", "for", "above", "below"}
+_TRAILING_WORD = re.compile(r"^[a-z]+$")                  # "width='800' fixed"
+_LEADING_PROSE = re.compile(r"^[A-Z][a-z]+(?:[-/][A-Za-z]+)*$")  # "Click-only", "Self-host"
+# A bare call that matches most code whatever its arguments ("sort()", ".find()")
+_GENERIC_CALL = re.compile(r"^\.?\w+\((?:\.\.\.)?\)$")
+# Characters that make an example code; prose cells (Don't) need the structural ones
+_CODE_CHARS = set("()<>{}[]=.:;-")
+_STRUCTURAL_CHARS = set("()<>{}[]=;")
+_WILDCARDS = [("[...]", r"\[[^\]]*\]"), ("{...}", r"\{[^}]*\}"), ("...", r"[^\n]{0,80}?"),
+              ("()", r"\([^()\n]*\)"), ("{}", r"\{[^{}\n]*\}"), ("[]", r"\[[^\]\n]*\]")]
+
+
+# ============ DETECTOR COMPILATION ============
+def _is_code(text, prose=False):
+    """Whether an example (its "// note" already removed) is code rather than a described situation"""
+    words = text.split()
+    if not words or _LEADING_PROSE.match(words[0]) or _GENERIC_CALL.match(text):
+        return False
+    if any(word.strip("()[],.").lower() in _PROSE_WORDS for word in words):
+        return False
+    if len(words) > 1 and _TRAILING_WORD.match(words[-1]):
+        return False
+    return bool((_STRUCTURAL_CHARS if prose else _CODE_CHARS) & set(text))
+
+
+def compile_example(example, prose=False):
+    """(regex source, required literal) for one bad-code example, None if it is prose or too generic.
+
+    prose marks a free-text cell (Don't), which must contain structural code
+    characters to count. Whitespace and quote styles are matched loosely,
+    "class=" also matches "className=", and "...", "()", "{}" and "[]" match
+    any content.
+    """
+    text, _, note = example.partition(" // ")
+    text = text.strip()
+    if not _is_code(text, prose) or _NOTE_QUALIFIERS & set(note.lower().split()):
+        return None
+
+    pieces, literals, current = [], [], ""
+    i = 0
+    while i < len(text):
+        wildcard = next(((token, regex) for token, regex in _WILDCARDS if text.startswith(token, i)), None)
+        if wildcard:
+            pieces.append(wildcard[1])
+            literals.append(current)
+            current = ""
+            i += len(wildcard[0])
+        elif text[i].isspace():
+            j = i
+            while j < len(text) and text[j].isspace():
+                j += 1
+            word_boundary = i and j < len(text) and (text[i - 1].isalnum() and text[j].isalnum())
+            pieces.append(r"\s+" if word_boundary else r"\s*")
+            literals.append(current)
+            current = ""
+            i = j
+        elif text[i] in "'\"`":
+            pieces.append(r"['\"`]")
+            literals.append(current)
+            current = ""
+            i += 1
+        elif text.startswith("class=", i):
+            pieces.append(r"class(?:Name)?=")
+            literals.append(current)
+            current = ""
+            i += len("class=")
+        else:
+            pieces.append(re.escape(text[i]))
+            current += text[i]
+            i += 1
+    literals.append(current)
+
+    literal = max(literals, key=len)
+    if len(literal) < MIN_LITERAL or sum(map(len, literals)) < MIN_FIXED:
+        return None
+    return "".join(pieces), literal
+
+
+def load_rules(stacks=None):
+    """(rules, detectors) for the audited guideline files.
+
+    rules: [{"rule", "title", "severity", "fix", "source"}]
+    detectors: [(rule index, regex source, literal)], one per compilable example
+    """
+    sources = [(domain, DATA_DIR / CSV_CONFIG[domain]["file"], title) for domain, title in AUDIT_DOMAINS]
+    sources += [(f"stack:{stack}", DATA_DIR / STACK_CONFIG[stack]["file"], "Guideline") for stack in stacks or []]
+
+    rules, detectors, seen = [], [], set()
+    for name, filepath, title_col in sources:
+        if not filepath.exists():
+            continue
+        for row in load_rows(filepath):
+            compiled = []
+            for col in BAD_CODE_COLUMNS:
+                result = compile_example(row.get(col) or "", prose=col == "Don't")
+                if result and result not in compiled:
+                    compiled.append(result)
+            if not compiled:
+                continue
+            severity = (row.get("Severity") or "").strip()
+            rules.append({
+                "rule": f"{name}:{row.get('No', len(rules) + 1)}",
+                "title": row.get(title_col, ""),
+                "severity": severity if severity in SEVERITIES else "Medium",
+                "fix": row.get("Do", ""),
+                "source": filepath.name
+            })
+            for regex, literal in compiled:
+                # The same anti-pattern listed by several guidelines is reported once, by the first
+                if regex not in seen:
+                    seen.add(regex)
+                    detectors.append((len(rules) - 1, regex, literal))
+    return rules, detectors
+
+
+# ============ SCANNING ============
+_SCANNER = None
+
+
+class Scanner:
+    """Compiled detectors: a literal prefilter over all of them, one regex each."""
+
+    def __init__(self, detectors):
+        self.detectors = [(rule, re.compile(regex.encode("utf-8"))) for rule, regex, _ in detectors]
+        # Literal -> detector ids; each distinct literal is looked for once with a
+        # substring search, which beats one large alternation and cannot miss overlaps
+        self.literals = {}
+        for i, (_, _, literal) in enumerate(detectors):
+            self.literals.setdefault(literal.encode("utf-8"), []).append(i)
+
+    def scan(self, data):
+        """[(offset, rule index)] of every detector match in a buffer"""
+        candidates = sorted(i for literal, ids in self.literals.items() if data.find(literal) >= 0 for i in ids)
+        if not candidates:
+            return []
+        hits = []
+        for i in candidates:
+            rule, regex = self.detectors[i]
+            hits.extend((match.start(), rule) for match in regex.finditer(data))
+        return hits
+
+
+def _init_worker(detectors):
+    global _SCANNER
+    _SCANNER = Scanner(detectors)
+
+
+def scan_file(path, scanner=None):
+    """[(line, rule index, snippet)] for one file, read through mmap; [] for empty, huge or binary files"""
+    scanner = scanner or _SCANNER
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size or size > MAX_FILE_BYTES:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if b"\0" in data[:BINARY_SNIFF]:
+                    return []
+                hits = sorted(scanner.scan(data))
+                findings, line, pos, reported = [], 1, 0, set()
+                for offset, rule in hits:
+                    line += data[pos:offset].count(b"\n")  # mmap has no count()
+                    pos = offset
+                    if (line, rule) in reported:
+                        continue
+                    reported.add((line, rule))
+                    start = data.rfind(b"\n", 0, offset) + 1
+                    end = data.find(b"\n", offset)
+                    text = data[start:end if end != -1 else size]
+                    if IGNORE_MARKER in text:
+                        continue
+                    findings.append((line, rule, text.decode("utf-8", "replace").strip()[:MAX_SNIPPET]))
+                return findings
+    except (OSError, ValueError):
+        return []
+
+
+def _scan_batch(paths):
+    return [(path, scan_file(path)) for path in paths]
+
+
+def iter_source_files(root):
+    """Source files under root (or root itself), skipping dependency, build and VCS directories"""
+    root = Path(root)
+    if root.is_file():
+        yield str(root)
+        return
+    stack = [str(root)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in IGNORED_DIRS:
+                    stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False) and os.path.splitext(entry.name)[1].lower() in SOURCE_EXTENSIONS \
+                    and not entry.name.endswith((".min.js", ".min.css")):
+                yield entry.path
+
+
+def audit(path, stacks=None, min_severity=None, jobs=None):
+    """Scan a file or source tree against the guideline anti-patterns.
+
+    Returns {"path", "stacks", "files", "rules", "detectors", "count",
+    "severities", "seconds", "findings": [{"file", "line", "rule", "title",
+    "severity", "match", "fix"}]}, or {"error": ...}.
+    """
+    unknown = [stack for stack in stacks or [] if stack not in STACK_CONFIG]
+    if unknown:
+        return {"error": f"Unknown stack: {', '.join(unknown)}. Available: {', '.join(AVAILABLE_STACKS)}"}
+    if min_severity is not None and min_severity not in SEVERITIES:
+        return {"error": f"Unknown severity: {min_severity}. Available: {', '.join(SEVERITIES)}"}
+    if not Path(path).exists():
+        return {"error": f"Path not found: {path}"}
+
+    started = time.perf_counter()
+    rules, detectors = load_rules(stacks)
+    if min_severity is not None:
+        allowed = set(SEVERITIES[:SEVERITIES.index(min_severity) + 1])
+        detectors = [detector for detector in detectors if rules[detector[0]]["severity"] in allowed]
+    files = list(iter_source_files(path))
+
+    if not detectors:
+        results = []
+    elif len(files) < PARALLEL_MIN_FILES or jobs == 1:
+        scanner = Scanner(detectors)
+        results = [(file, scan_file(file, scanner)) for file in files]
+    else:
+        batches = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(detectors,)) as executor:
+            results = [item for batch in executor.map(_scan_batch, batches) for item in batch]
+
+    base = Path(path) if Path(path).is_dir() else Path(path).parent
+    findings = []
+    for file, hits in results:
+        for line, rule, snippet in hits:
+            findings.append({
+                "file": os.path.relpath(file, base),
+                "line": line,
+                "rule": rules[rule]["rule"],
+                "title": rules[rule]["title"],
+                "severity": rules[rule]["severity"],
+                "match": snippet,
+                "fix": rules[rule]["fix"]
+            })
+    findings.sort(key=lambda f: (f["file"], f["line"], SEVERITIES.index(f["severity"])))
+
+    severities = {}
+    for finding in findings:
+        severities[finding["severity"]] = severities.get(finding["severity"], 0) + 1
+    return {
+        "path": str(path),
+        "stacks": stacks or [],
+        "files": len(files),
+        "rules": len({rule for rule, _, _ in detectors}),
+        "detectors": len(detectors),
+        "count": len(findings),
+        "severities": {severity: severities[severity] for severity in SEVERITIES if severity in severities},
+        "seconds": round(time.perf_counter() - started, 3),
+        "findings": findings
+    }
+
+
+# ============ OUTPUT ============
+def iter_report(result):
+    """Yield a token-optimized audit report, one line at a time"""
+    if "error" in result:
+        yield f"Error: {result['error']}"
+        return
+    yield "## UI Pro Max Audit"
+    stacks = ", ".join(result["stacks"]) or "none"
+    yield f"**Path:** {result['path']} | **Stack:** {stacks} | **Files:** {result['files']} | " \
+          f"**Detectors:** {result['detectors']} ({result['rules']} rules) | **Time:** {result['seconds']}s"
+    counts = ", ".join(f"{severity} {count}" for severity, count in result["severities"].items())
+    yield f"**Findings:** {result['count']}" + (f" ({counts})" if counts else "")
+    for finding in result["findings"]:
+        yield ""
+        yield f"{finding['file']}:{finding['line']} [{finding['severity']}] {finding['rule']} {finding['title']}"
+        yield f"    {finding['match']}"
+        if finding["fix"]:
+            yield f"    Fix: {finding['fix']}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max anti-pattern audit")
+    parser.add_argument("path", help="Source file or directory to scan")
+    parser.add_argument("--stack", "-s", type=str, default=None, help="Also audit against these stack guidelines (comma-separated, e.g. nextjs,react)")
+    parser.add_argument("--min-severity", choices=SEVERITIES, default=None, help="Only report rules of this severity or higher")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", "-f", choices=["text", "json", "jsonl"], default="text", help="Output format")
+
+    args = parser.parse_args()
+    stacks = [stack.strip() for stack in args.stack.split(",") if stack.strip()] if args.stack else []
+    for stack in stacks:
+        if stack not in AVAILABLE_STACKS:
+            parser.error(f"argument --stack/-s: invalid choice: '{stack}' (choose from {', '.join(AVAILABLE_STACKS)})")
+
+    result = audit(args.path, stacks, args.min_severity, args.jobs)
+    if args.format == "json":
+        write_lines(iter_json(result), sys.stdout)
+    elif args.format == "jsonl":
+        write_lines(iter_jsonl(result, "findings"), sys.stdout)
+    else:
+        write_lines(iter_report(result), sys.stdout)
+
+    sys.exit(2 if "error" in result else 1 if result["count"] else 0)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Build Index - Validate every data CSV and compile it into
+ready-to-load index artifacts, in parallel across cores.
+
+Run at deploy time so searches load prebuilt indexes instead of fitting
+them on the request path.
+
+Usage: python build_index.py [--engine bm25] [--engine sqlite] [--jobs 4]
+       python build_index.py --check            # validate columns only
+       python build_index.py --index-dir /srv/uipro/index --json
+       python build_index.py --design-systems   # also precompute per-category-alias design systems
+       python build_index.py --compact          # fold $UIPRO_EXTRA_DATA overlay segments into one artifact
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from core import (DEFAULT_ENGINE, INDEX_DIR, ENGINES, available_engines, compact_segments, iter_sources,
+                  resolve_engine, segment_files)
+from palette import ROLES as PALETTE_ROLES, PaletteIndex, build_palette_index
+from perf import COST_COLUMNS, StyleCostIndex, build_style_cost_index
+from render import iter_json, write_lines
+
+
+# ============ VALIDATION ============
+def validate_source(filepath, search_cols, output_cols):
+    """Return (headers, errors) for a data file checked against its configured columns"""
+    if not filepath.exists():
+        return [], [f"file not found: {filepath}"]
+    with open(filepath, 'r', encoding='utf-8') as f:
+        headers = next(csv.reader(f), [])
+    errors = [f"search column missing: {col}" for col in search_cols if col not in headers]
+    errors += [f"output column missing: {col}" for col in output_cols if col not in headers]
+    return headers, errors
+
+
+# ============ BUILD ============
+def _artifact_bytes(engine):
+    """Size of the artifact an engine loads from"""
+    path = getattr(engine, "artifact_path", None) or getattr(engine, "db_path", None)
+    return path.stat().st_size if path and path.exists() else 0
+
+
+def build_source(name, engine_name, index_dir, check_only=False, filepath=None):
+    """Validate and build one data file (or one overlay segment of it) with one engine. Runs in a worker process."""
+    source = next(s for s in iter_sources() if s[0] == name)
+    _, bundled, search_cols, output_cols = source
+    filepath = Path(filepath or bundled)
+    report = {"name": name, "engine": engine_name, "file": str(filepath)}
+
+    _, errors = validate_source(filepath, search_cols, output_cols)
+    report["errors"] = errors
+    if errors or check_only:
+        return report
+
+    start = time.perf_counter()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    resolve_engine(engine=engine_name)
+    engine = ENGINES[engine_name](filepath, search_cols, index_dir)
+    engine.build(rows)
+    engine.save()
+    stats = engine.stats()
+
+    report.update({
+        "rows": len(rows),
+        "vocabulary": stats.get("vocabulary", 0),
+        "artifact_bytes": _artifact_bytes(engine),
+        "build_seconds": round(time.perf_counter() - start, 4)
+    })
+    return report
+
+
+def build_palette(index_dir, check_only=False):
+    """Validate and build the Lab array of colors.csv used by nearest-palette search. Runs in a worker process."""
+    index = PaletteIndex(index_dir=index_dir)
+    report = {"name": "color:palette", "engine": "lab", "file": str(index.filepath)}
+    _, errors = validate_source(index.filepath, [], list(PALETTE_ROLES.values()))
+    report["errors"] = errors
+    if errors or check_only:
+        return report
+
+    start = time.perf_counter()
+    index = build_palette_index(index_dir)
+    report.update({
+        "rows": len(index.rows),
+        "vocabulary": 0,
+        "artifact_bytes": _artifact_bytes(index),
+        "build_seconds": round(time.perf_counter() - start, 4)
+    })
+    return report
+
+
+def build_style_costs(index_dir, check_only=False):
+    """Validate and build the parsed cost scores of styles.csv used by performance budgets. Runs in a worker process."""
+    index = StyleCostIndex(index_dir=index_dir)
+    report = {"name": "style:perf", "engine": "cost", "file": str(index.filepath)}
+    _, errors = validate_source(index.filepath, [], COST_COLUMNS)
+    report["errors"] = errors
+    if errors or check_only:
+        return report
+
+    start = time.perf_counter()
+    index = build_style_cost_index(index_dir)
+    report.update({
+        "rows": len(index.rows),
+        "vocabulary": 0,
+        "artifact_bytes": _artifact_bytes(index),
+        "build_seconds": round(time.perf_counter() - start, 4)
+    })
+    return report
+
+
+def build_all(engines=None, index_dir=None, jobs=None, check_only=False):
+    """Build every (data file segment, engine) pair, the palette and style cost indexes in a process pool, returns the reports in source order"""
+    engines = engines or [DEFAULT_ENGINE]
+    index_dir = str(index_dir or INDEX_DIR)
+    tasks = [(name, engine, str(path)) for engine in engines
+             for name, filepath, *_ in iter_sources() for path in segment_files(filepath)]
+
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        futures = [executor.submit(build_source, name, engine, index_dir, check_only, path) for name, engine, path in tasks]
+        futures.append(executor.submit(build_palette, index_dir, check_only))
+        futures.append(executor.submit(build_style_costs, index_dir, check_only))
+        return [future.result() for future in futures]
+
+
+def iter_report(reports):
+    """Yield a plain-text table of build reports"""
+    yield f"{'NAME':<24} {'ENGINE':<8} {'ROWS':>6} {'VOCAB':>7} {'BYTES':>10} {'SECONDS':>8}"
+    for report in reports:
+        if report["errors"]:
+            for error in report["errors"]:
+                yield f"{report['name']:<24} {report['engine']:<8} ERROR {error}"
+        elif "rows" in report:
+            yield (f"{report['name']:<24} {report['engine']:<8} {report['rows']:>6} {report['vocabulary']:>7} "
+                   f"{report['artifact_bytes']:>10} {report['build_seconds']:>8.4f}")
+        else:
+            yield f"{report['name']:<24} {report['engine']:<8} ok"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max index builder")
+    parser.add_argument("--engine", "-e", action="append", choices=available_engines(), help=f"Engine to build for (repeatable, default: {DEFAULT_ENGINE})")
+    parser.add_argument("--index-dir", type=str, default=None, help="Artifact directory (default: $UIPRO_INDEX_DIR or cache dir)")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--check", action="store_true", help="Only validate CSV headers against the configured columns")
+    parser.add_argument("--json", action="store_true", help="Output reports as JSON")
+    parser.add_argument("--design-systems", action="store_true", help="Also precompute the design system of every products.csv category (with the first --engine)")
+    parser.add_argument("--compact", action="store_true", help="Also compact overlay segments ($UIPRO_EXTRA_DATA) into one artifact per data file")
+
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    reports = build_all(args.engine, args.index_dir and Path(args.index_dir), args.jobs, args.check)
+
+    compacted = None
+    if args.compact and not args.check and not any(report["errors"] for report in reports):
+        index_dir = args.index_dir and Path(args.index_dir)
+        compacted = [entry for engine in args.engine or [DEFAULT_ENGINE] for entry in compact_segments(engine, index_dir)]
+
+    precomputed = None
+    if args.design_systems and not args.check and not any(report["errors"] for report in reports):
+        from design_system import precompute_design_systems
+        precomputed = precompute_design_systems(engine=args.engine[0] if args.engine else None)
+
+    if args.json:
+        if precomputed or compacted is not None:
+            write_lines(iter_json({"indexes": reports, "compacted": compacted, "design_systems": precomputed}), sys.stdout)
+        else:
+            write_lines(iter_json(reports), sys.stdout)
+    else:
+        write_lines(iter_report(reports), sys.stdout)
+        for entry in compacted or []:
+            status = entry.get("error") or f"{entry['segments']} segments, {entry['rows']} rows -> {entry['artifact']}"
+            print(f"compacted {entry['name']:<24} {entry['engine']:<8} {status}")
+        if precomputed:
+            print(f"\n{precomputed['queries']} design systems precomputed for {precomputed['categories']} categories "
+                  f"-> {precomputed['file']}")
+            for alias, category in precomputed["rerouted"].items():
+                print(f"  alias {alias!r} resolves to {category}")
+        print(f"\n{len(reports)} indexes in {time.perf_counter() - started:.2f}s")
+
+    sys.exit(1 if any(report["errors"] for report in reports) else 0)
@@ -4,20 +4,69 @@
 UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
+import bisect
 import csv
+import hashlib
+import importlib
+import json
+import os
+import pickle
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from math import log
 from collections import defaultdict
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
+CACHE_DIR = Path(os.environ.get("UIPRO_CACHE_DIR") or Path.home() / ".cache" / "ui-ux-pro-max")
+INDEX_DIR = Path(os.environ.get("UIPRO_INDEX_DIR") or CACHE_DIR / "index")
 MAX_RESULTS = 3
 
+# Search engine backend: CLI --engine > UIPRO_ENGINE > per-domain "engine" key > default
+DEFAULT_ENGINE = "bm25"
+ENGINE_ENV = "UIPRO_ENGINE"
+
+# Cursor pagination: ranked candidate lists are kept this long (seconds)
+CURSOR_TTL = 600
+MAX_CURSORS = 256
+CURSOR_DIR = CACHE_DIR / "cursors"
+
+# Typo tolerance (SymSpell-style symmetric delete dictionary): one edit for words of up to
+# LONG_WORD characters, two beyond. A correction is confident when it has a single best
+# term found in at least MIN_CORRECTION_DF documents; others replace the typo only if the
+# rest of the query matches nothing, and are otherwise reported as suggestions
+MAX_EDIT_DISTANCE = 2
+LONG_WORD = 8
+PREFIX_LENGTH = 7
+MAX_EXPANSIONS = 3
+MIN_CORRECTION_DF = 2
+
+# Alias groups expanded into documents at index time (weighted postings); a
+# multi-word alias is indexed as one phrase term, its words joined by PHRASE_JOINER
+SYNONYMS_FILE = DATA_DIR / "synonyms.csv"
+PHRASE_JOINER = "_"
+
+# Phrase queries: '"dark mode"' must match as a phrase, '"dark mode"~3' boosts rows
+# having the words in order within 3 extra positions
+PHRASE_PATTERN = re.compile(r'"([^"]+)"(?:~(\d+))?')
+PROXIMITY_BOOST = 0.5
+
+# Bump when the pickled index layout changes so stale artifacts are rebuilt
+INDEX_VERSION = 3
+
+# Overlay data: CSVs found at the same relative path under any of these directories
+# ($UIPRO_EXTRA_DATA, os.pathsep separated) are indexed as extra segments of the bundled file
+EXTRA_DATA_ENV = "UIPRO_EXTRA_DATA"
+COMPACT_DIR = "compacted"  # subdirectory of the index dir holding compacted segments
+
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
         "search_cols": ["Style Category", "Keywords", "Best For", "Type", "AI Prompt Keywords"],
+        "facet_cols": ["Type", "Complexity", "Performance", "Light Mode ✓", "Dark Mode ✓", "Mobile-Friendly", "Conversion-Focused"],
         "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Performance", "Accessibility", "Framework Compatibility", "Complexity", "AI Prompt Keywords", "CSS/Technical Keywords", "Implementation Checklist", "Design System Variables"]
     },
     "color": {
@@ -28,6 +77,7 @@ CSV_CONFIG = {
     "chart": {
         "file": "charts.csv",
         "search_cols": ["Data Type", "Keywords", "Best Chart Type", "Accessibility Notes"],
+        "facet_cols": ["Interactive Level"],
         "output_cols": ["Data Type", "Keywords", "Best Chart Type", "Secondary Options", "Color Guidance", "Accessibility Notes", "Library Recommendation", "Interactive Level"]
     },
     "landing": {
@@ -43,26 +93,31 @@ CSV_CONFIG = {
     "ux": {
         "file": "ux-guidelines.csv",
         "search_cols": ["Category", "Issue", "Description", "Platform"],
+        "facet_cols": ["Category", "Platform", "Severity"],
         "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
     },
     "typography": {
         "file": "typography.csv",
         "search_cols": ["Font Pairing Name", "Category", "Mood/Style Keywords", "Best For", "Heading Font", "Body Font"],
+        "facet_cols": ["Category"],
         "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"]
     },
     "icons": {
         "file": "icons.csv",
         "search_cols": ["Category", "Icon Name", "Keywords", "Best For"],
+        "facet_cols": ["Category", "Library", "Style"],
         "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"]
     },
     "react": {
         "file": "react-performance.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
+        "facet_cols": ["Category", "Severity"],
         "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
     },
     "web": {
         "file": "web-interface.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
+        "facet_cols": ["Category", "Severity"],
         "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
     }
 }
@@ -86,10 +141,320 @@ STACK_CONFIG = {
 # Common columns for all stacks
 _STACK_COLS = {
     "search_cols": ["Category", "Guideline", "Description", "Do", "Don't"],
+    "facet_cols": ["Category", "Severity"],
     "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"]
 }
 
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
+MAX_STACK_WORKERS = 8
+
+
+def iter_sources():
+    """Yield (name, filepath, search_cols, output_cols) for every domain and stack data file"""
+    for domain, config in CSV_CONFIG.items():
+        yield domain, DATA_DIR / config["file"], config["search_cols"], config["output_cols"]
+    for stack, config in STACK_CONFIG.items():
+        yield f"stack:{stack}", DATA_DIR / config["file"], _STACK_COLS["search_cols"], _STACK_COLS["output_cols"]
+
+
+# ============ TYPO TOLERANCE ============
+def _edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 if it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SymSpell:
+    """Symmetric delete spelling correction over a fixed vocabulary"""
+
+    def __init__(self, max_edit_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.deletes = defaultdict(list)
+
+    def _deletes(self, word):
+        """All strings reachable from word by up to max_edit_distance deletions"""
+        results = {word}
+        frontier = {word}
+        for _ in range(self.max_edit_distance):
+            next_frontier = set()
+            for item in frontier:
+                if len(item) <= 1:
+                    continue
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            next_frontier -= results
+            results |= next_frontier
+            frontier = next_frontier
+        return results
+
+    def build(self, word_freqs):
+        """Precompute the delete dictionary from {word: frequency}"""
+        self.words = dict(word_freqs)
+        self.deletes = defaultdict(list)
+        for word in self.words:
+            for delete in self._deletes(word[:self.prefix_length]):
+                self.deletes[delete].append(word)
+
+    def lookup(self, term, max_edit_distance=None):
+        """Return [(word, distance, frequency)] sorted by distance, then frequency"""
+        if max_edit_distance is None:
+            max_edit_distance = min(self.max_edit_distance, 1 if len(term) <= LONG_WORD else 2)
+        if term in self.words:
+            return [(term, 0, self.words[term])]
+
+        seen = set()
+        suggestions = []
+        for delete in self._deletes(term[:self.prefix_length]):
+            for word in self.deletes.get(delete, ()):
+                if word in seen:
+                    continue
+                seen.add(word)
+                distance = _edit_distance(term, word, max_edit_distance)
+                if distance <= max_edit_distance:
+                    suggestions.append((word, distance, self.words[word]))
+        return sorted(suggestions, key=lambda x: (x[1], -x[2], x[0]))
+
+
+def correct_tokens(tokens, vocabulary, lookup):
+    """Spell-correct out-of-vocabulary tokens with a SymSpell lookup function.
+
+    Returns (tokens, corrections) where corrections maps each unknown token
+    that has suggestions to {"terms": [best suggestions], "applied": bool}.
+    Confident corrections (one best term, frequent enough) are applied;
+    the others only when nothing else in the query matches, otherwise the
+    token is kept and the correction is only reported.
+    """
+    suggested = {}
+    for token in tokens:
+        if token not in vocabulary and token not in suggested:
+            suggestions = lookup(token)
+            if suggestions:
+                best = suggestions[0][1]
+                terms = [(word, freq) for word, distance, freq in suggestions if distance == best]
+                suggested[token] = ([word for word, _ in terms[:MAX_EXPANSIONS]],
+                                    len(terms) == 1 and terms[0][1] >= MIN_CORRECTION_DF)
+    anchored = any(token in vocabulary or (token in suggested and suggested[token][1]) for token in tokens)
+
+    corrected = []
+    corrections = {}
+    for token in tokens:
+        if token not in suggested:
+            corrected.append(token)
+            continue
+        terms, confident = suggested[token]
+        applied = confident or not anchored
+        corrected.extend(terms if applied else [token])
+        corrections[token] = {"terms": terms, "applied": applied}
+    return corrected, corrections
+
+
+def split_corrections(corrections):
+    """({typo: terms} applied, {typo: terms} only suggested) from correct_tokens() corrections"""
+    applied, suggested = {}, {}
+    for token, correction in corrections.items():
+        (applied if correction["applied"] else suggested)[token] = correction["terms"]
+    return applied, suggested
+
+
+# ============ SYNONYMS ============
+class Synonyms:
+    """Alias groups from synonyms.csv, expanded into document term weights at index time"""
+
+    def __init__(self, groups=None):
+        self.groups = []         # [(phrase token tuples, weight)]
+        self._by_first = defaultdict(list)
+        for phrases, weight in groups or []:
+            self.add(phrases, weight)
+
+    def add(self, phrases, weight):
+        """Add one group of equivalent phrases (raw strings) with its expansion weight"""
+        tokenize = BM25().tokenize
+        phrases = [tuple(tokenize(p)) for p in phrases]
+        phrases = list(dict.fromkeys(p for p in phrases if p))
+        if len(phrases) < 2:
+            return
+        group = len(self.groups)
+        self.groups.append((phrases, weight))
+        for phrase in phrases:
+            self._by_first[phrase[0]].append((phrase, group))
+
+    @classmethod
+    def load(cls, filepath=SYNONYMS_FILE):
+        """Read groups from a CSV with Term, Aliases (comma separated) and Weight columns"""
+        synonyms = cls()
+        if not Path(filepath).exists():
+            return synonyms
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                phrases = [row.get("Term", "")] + row.get("Aliases", "").split(",")
+                try:
+                    weight = float(row.get("Weight") or 1)
+                except ValueError:
+                    weight = 1.0
+                synonyms.add(phrases, weight)
+        return synonyms
+
+    def _matches(self, tokens):
+        """{group: alias phrases of it found in tokens}"""
+        found = defaultdict(set)
+        for i, token in enumerate(tokens):
+            for phrase, group in self._by_first.get(token, ()):
+                if tuple(tokens[i:i + len(phrase)]) == phrase:
+                    found[group].add(phrase)
+        return found
+
+    def phrase_terms(self, tokens):
+        """Phrase terms of the multi-word aliases in a tokenized query, to match their expansions"""
+        return list(dict.fromkeys(phrase_term(phrase) for phrases in self._matches(tokens).values()
+                                  for phrase in phrases if len(phrase) > 1))
+
+    def expand(self, tokens):
+        """Return {term: weight} to add to a tokenized document for every alias group it mentions.
+
+        Each term is added once, with the highest weight of the groups that
+        produce it, however often the document repeats an alias. Multi-word
+        aliases become phrase terms; one the document contains verbatim gets
+        weight 1 so it ranks like the aliases expanded from it.
+        """
+        present = set(tokens)
+        expansions = {}
+        for group, found in self._matches(tokens).items():
+            phrases, weight = self.groups[group]
+            for phrase in phrases:
+                if len(phrase) == 1:
+                    if phrase[0] in present:
+                        continue
+                    term = phrase[0]
+                else:
+                    term = phrase_term(phrase)
+                term_weight = 1.0 if phrase in found else weight
+                expansions[term] = max(expansions.get(term, 0.0), term_weight)
+        return expansions
+
+
+def phrase_term(phrase):
+    """Single index term standing for a multi-word alias phrase (token tuple)"""
+    return PHRASE_JOINER.join(phrase)
+
+
+_SYNONYMS = {}
+
+
+def load_synonyms():
+    """Synonyms table for index builds, reloaded when synonyms.csv changes"""
+    fingerprint = file_fingerprint(SYNONYMS_FILE) if SYNONYMS_FILE.exists() else None
+    if fingerprint not in _SYNONYMS:
+        _SYNONYMS.clear()
+        _SYNONYMS[fingerprint] = Synonyms.load(SYNONYMS_FILE)
+    return _SYNONYMS[fingerprint]
+
+
+def index_fingerprint(filepath):
+    """Fingerprint of everything an index is built from: the data file and the synonyms table"""
+    if not SYNONYMS_FILE.exists():
+        return file_fingerprint(filepath)
+    return f"{file_fingerprint(filepath)}+{file_fingerprint(SYNONYMS_FILE)}"
+
+
+def write_artifact(path, fingerprint, state):
+    """Pickle an index's state to path, tagged with the fingerprint of its sources (atomic replace)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({"fingerprint": fingerprint, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path, fingerprint):
+    """The state written by write_artifact(), None if missing, unreadable or built from other sources"""
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(artifact, dict) or artifact.get("fingerprint") != fingerprint:
+        return None
+    return artifact
+
+
+# ============ FACETS ============
+def _facet_value(value):
+    """Case-, symbol- and spacing-insensitive form of a categorical value or column name"""
+    return " ".join(re.sub(r'[^\w]+', ' ', str(value).lower()).split())
+
+
+def iter_bits(mask):
+    """Row indices set in a bitset, ascending"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class FacetIndex:
+    """Per-value bitsets over categorical columns (bit i set = row i has the value).
+
+    Multi-valued cells like "Hover + Zoom" are indexed under the whole value
+    and under each "+"-separated part.
+    """
+
+    def __init__(self, facet_cols):
+        self.facet_cols = list(facet_cols)
+        self.bitsets = {}
+        self.N = 0
+
+    def build(self, rows):
+        """Precompute the bitsets from CSV rows"""
+        self.N = len(rows)
+        bitsets = {col: defaultdict(int) for col in self.facet_cols}
+        for idx, row in enumerate(rows):
+            bit = 1 << idx
+            for col in self.facet_cols:
+                raw = str(row.get(col) or "")
+                values = {_facet_value(raw)} | {_facet_value(part) for part in raw.split("+")}
+                for value in values - {""}:
+                    bitsets[col][value] |= bit
+        self.bitsets = {col: dict(values) for col, values in bitsets.items()}
+
+    def resolve(self, filters):
+        """Candidate bitset for {column: value or [values]}: OR within a column, AND across columns.
+
+        Raises ValueError for a column that is not a facet.
+        """
+        names = {_facet_value(col): col for col in self.facet_cols}
+        mask = (1 << self.N) - 1
+        for col, wanted in filters.items():
+            name = names.get(_facet_value(col))
+            if name is None:
+                available = ", ".join(self.facet_cols) or "none"
+                raise ValueError(f"Cannot filter on '{col}'. Facet columns: {available}")
+            values = [wanted] if isinstance(wanted, str) else wanted
+            column_mask = 0
+            for value in values:
+                column_mask |= self.bitsets[name].get(_facet_value(value), 0)
+            mask &= column_mask
+        return mask
+
+    def stats(self):
+        """Distinct values per facet column"""
+        return {col: len(values) for col, values in self.bitsets.items()}
 
 
 # ============ BM25 IMPLEMENTATION ============
@@ -105,86 +470,831 @@ class BM25:
         self.idf = {}
         self.doc_freqs = defaultdict(int)
         self.N = 0
+        self.speller = SymSpell()
+        self.expansions = []
+        self.postings = {}            # term -> {doc idx: [positions]}
+        self.expansion_postings = {}  # term -> {doc idx: weight}
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
         text = re.sub(r'[^\w\s]', ' ', str(text).lower())
         return [w for w in text.split() if len(w) > 2]
 
-    def fit(self, documents):
-        """Build BM25 index from documents"""
+    def fit(self, documents, synonyms=None):
+        """Build BM25 index from documents, adding weighted alias terms from synonyms"""
         self.corpus = [self.tokenize(doc) for doc in documents]
         self.N = len(self.corpus)
         if self.N == 0:
             return
         self.doc_lengths = [len(doc) for doc in self.corpus]
         self.avgdl = sum(self.doc_lengths) / self.N
+        self.expansions = [synonyms.expand(doc) for doc in self.corpus] if synonyms else []
 
-        for doc in self.corpus:
+        postings = defaultdict(dict)
+        expansion_postings = defaultdict(dict)
+        for idx, doc in enumerate(self.corpus):
+            for position, word in enumerate(doc):
+                postings[word].setdefault(idx, []).append(position)
+            for word, weight in (self.expansions[idx].items() if self.expansions else ()):
+                expansion_postings[word][idx] = weight
+        self.postings = dict(postings)
+        self.expansion_postings = dict(expansion_postings)
+
+        for idx, doc in enumerate(self.corpus):
             seen = set()
             for word in doc:
                 if word not in seen:
                     self.doc_freqs[word] += 1
                     seen.add(word)
+            for word in (self.expansions[idx] if self.expansions else ()):
+                self.doc_freqs[word] += 1
 
         for word, freq in self.doc_freqs.items():
             self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
 
+        self.speller.build(self.doc_freqs)
+
+    @classmethod
+    def merged(cls, parts):
+        """Collection-wide statistics (N, avgdl, idf, speller) of several fitted models.
+
+        The result has no corpus; pass it as stats to score_tokens() so that
+        segments are scored as if they were one index.
+        """
+        merged = cls(parts[0].k1, parts[0].b) if parts else cls()
+        total_length = 0
+        for part in parts:
+            merged.N += part.N
+            total_length += sum(part.doc_lengths)
+            for word, freq in part.doc_freqs.items():
+                merged.doc_freqs[word] += freq
+        if merged.N:
+            merged.avgdl = total_length / merged.N
+        for word, freq in merged.doc_freqs.items():
+            merged.idf[word] = log((merged.N - freq + 0.5) / (freq + 0.5) + 1)
+        merged.speller.build(merged.doc_freqs)
+        return merged
+
+    def correct(self, tokens):
+        """Replace out-of-vocabulary tokens with their closest vocabulary terms (see correct_tokens)"""
+        return correct_tokens(tokens, self.idf, self.speller.lookup)
+
     def score(self, query):
         """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        query_tokens, _ = self.correct(self.tokenize(query))
+        return self.score_tokens(query_tokens)
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+    def score_tokens(self, query_tokens, candidates=None, stats=None):
+        """Score all documents (or only the candidates bitset) against already tokenized query terms.
+
+        Walks the postings of each query term, so only documents containing
+        a term are touched. stats (see merged()) replaces this model's idf
+        and average length with collection-wide ones.
+        """
+        stats = stats or self
+        scores = [0] * self.N
+        allowed = None if candidates is None else set(iter_bits(candidates))
+
+        for token in query_tokens:
+            if token not in stats.idf:
+                continue
+            idf = stats.idf[token]
+            term_freqs = {idx: len(positions) for idx, positions in self.postings.get(token, {}).items()}
+            for idx, weight in self.expansion_postings.get(token, {}).items():
+                term_freqs[idx] = term_freqs.get(idx, 0) + weight
+            for idx, tf in term_freqs.items():
+                if allowed is not None and idx not in allowed:
+                    continue
+                numerator = tf * (self.k1 + 1)
+                denominator = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / stats.avgdl)
+                scores[idx] += idf * numerator / denominator
+
+        docs = range(self.N) if allowed is None else sorted(idx for idx in allowed if idx < self.N)
+        return sorted(((idx, scores[idx]) for idx in docs), key=lambda x: x[1], reverse=True)
+
+    def phrase_matches(self, phrase_tokens, slop=0):
+        """Documents containing the tokens in order, each within slop extra positions of the previous.
+
+        Only the intersection of the terms' postings lists is checked.
+        Returns a bitset.
+        """
+        lists = [self.postings.get(token) for token in phrase_tokens]
+        if not lists or not all(lists):
+            return 0
+        docs = set(min(lists, key=len))
+        for postings in lists:
+            docs &= postings.keys()
+
+        mask = 0
+        for idx in docs:
+            positions = [postings[idx] for postings in lists]
+            for start in positions[0]:
+                previous = start
+                for following in positions[1:]:
+                    i = bisect.bisect_right(following, previous)
+                    if i == len(following) or following[i] > previous + 1 + slop:
+                        break
+                    previous = following[i]
+                else:
+                    mask |= 1 << idx
+                    break
+        return mask
+
+
+def parse_phrases(text):
+    """Split a query into its quoted phrases: [(phrase text, slop or None)]"""
+    return [(phrase, int(slop) if slop else None) for phrase, slop in PHRASE_PATTERN.findall(text)]
+
+
+# ============ SEARCH ENGINES ============
+def index_key(filepath, search_cols):
+    """Stable, filesystem/SQL-safe name for one (data file, search columns) index"""
+    path = Path(filepath)
+    try:
+        stem = path.relative_to(DATA_DIR).with_suffix("").as_posix()
+    except ValueError:
+        stem = path.stem
+    digest = hashlib.sha256("|".join([str(path.resolve()), *search_cols]).encode("utf-8")).hexdigest()[:8]
+    return re.sub(r'[^0-9a-zA-Z]+', '_', stem).strip('_') + "_" + digest
+
+
+def documents_from_rows(rows, search_cols):
+    """One document string per row, built from the search columns"""
+    return [" ".join(str(row.get(col, "")) for col in search_cols) for row in rows]
+
+
+class BM25Engine:
+    """Reference engine: the pure-Python BM25 above.
+
+    Every engine implements the same small protocol so that core can dispatch
+    through it without knowing the backend:
+        engine = Engine(filepath, search_cols, index_dir)
+        engine.load() -> bool        # restore an up-to-date prebuilt artifact from index_dir
+        engine.build(rows)           # index CSV rows (list of dicts)
+        engine.save()                # write the artifact into index_dir
+        engine.query(text, k=None, candidates=None)
+                                     # -> ([(row_idx, score)] with score > 0, corrections
+                                     #    as returned by correct_tokens);
+                                     #    candidates is an optional row bitset to score;
+                                     #    text may hold "exact phrases" and "proximity"~N terms
+
+        engine.fetch(indices)        # -> row dicts, in the given order
+        engine.stats()               # -> dict
+
+    Engines built on BM25 also take query(..., stats=BM25.merged(...)) so
+    SegmentedIndex can score them with collection-wide statistics.
+    """
+
+    name = "bm25"
+    segmentable = True  # overlay segments can be queried separately and merged (see SegmentedIndex)
+
+    def __init__(self, filepath, search_cols, index_dir=None):
+        self.filepath = Path(filepath)
+        self.search_cols = list(search_cols)
+        self.index_dir = Path(index_dir or INDEX_DIR)
+        self.bm25 = BM25()
+        self.rows = []
+
+    @property
+    def artifact_path(self):
+        return self.index_dir / f"{self.name}-{index_key(self.filepath, self.search_cols)}.pkl"
+
+    def build(self, rows):
+        """Fit the index from CSV rows"""
+        self.rows = rows
+        self.bm25.fit(documents_from_rows(rows, self.search_cols), load_synonyms())
+
+    def _state(self):
+        """Fitted state stored in the artifact; subclasses extend it"""
+        return {"version": INDEX_VERSION, "bm25": self.bm25, "rows": self.rows}
+
+    def _restore(self, artifact):
+        """Inverse of _state(), returns False if the artifact lacks a required key or is outdated"""
+        if artifact.get("version") != INDEX_VERSION or "bm25" not in artifact or "rows" not in artifact:
+            return False
+        self.bm25 = artifact["bm25"]
+        self.rows = artifact["rows"]
+        return True
+
+    def save(self):
+        """Write the fitted index and rows to an artifact file, tagged with the source fingerprint"""
+        write_artifact(self.artifact_path, index_fingerprint(self.filepath), self._state())
+
+    def load(self):
+        """Restore a fitted index from its artifact, returns False if missing or stale"""
+        artifact = read_artifact(self.artifact_path, index_fingerprint(self.filepath))
+        return artifact is not None and self._restore(artifact)
+
+    def _lexical(self, text, candidates=None, stats=None):
+        """BM25 ranking of a query with its phrase clauses applied.
+
+        Returns (query tokens, ranked [(idx, score)] with score > 0, corrections,
+        candidates). Exact phrases narrow the candidates to rows containing them;
+        proximity phrases multiply the score of rows having the words close together.
+        stats are collection-wide BM25 statistics (BM25.merged) used for typo
+        correction and scoring when this engine is one segment of an index.
+        """
+        model = stats or self.bm25
+        query_tokens, corrections = model.correct(model.tokenize(text))
+        query_tokens += load_synonyms().phrase_terms(query_tokens)
+        boosted = 0
+        for phrase, slop in parse_phrases(text):
+            phrase_tokens = [model.correct([token])[0][0] for token in model.tokenize(phrase)]
+            if not phrase_tokens:
+                continue
+            if slop is None:
+                matches = self.bm25.phrase_matches(phrase_tokens)
+                candidates = matches if candidates is None else candidates & matches
+            else:
+                boosted |= self.bm25.phrase_matches(phrase_tokens, slop)
+
+        ranked = [(idx, score) for idx, score in self.bm25.score_tokens(query_tokens, candidates, stats) if score > 0]
+        if boosted:
+            ranked = sorted(((idx, score * (1 + PROXIMITY_BOOST) if boosted >> idx & 1 else score)
+                             for idx, score in ranked), key=lambda x: x[1], reverse=True)
+        return query_tokens, ranked, corrections, candidates
+
+    def query(self, text, k=None, candidates=None, stats=None):
+        """Return (top-k ranked [(idx, score)] with score > 0, corrections)"""
+        _, ranked, corrections, _ = self._lexical(text, candidates, stats)
+        return ranked[:k] if k is not None else ranked, corrections
+
+    def fetch(self, indices):
+        """Return the CSV rows for the given indices"""
+        return [self.rows[idx] for idx in indices]
+
+    def stats(self):
+        """Index statistics"""
+        return {
+            "engine": self.name,
+            "documents": self.bm25.N,
+            "vocabulary": len(self.bm25.idf),
+            "avg_doc_length": round(self.bm25.avgdl, 2),
+            "symspell_deletes": len(self.bm25.speller.deletes),
+            **expansion_stats(self.bm25.expansions)
+        }
+
+
+# expansion_stats() keys that add up across the segments of one index
+EXPANSION_TOTALS = ("expanded_documents", "expansion_postings")
+
+
+def expansion_stats(expansions):
+    """Summary of index-time alias expansion: [{term: weight}] per document"""
+    return {
+        "synonym_groups": len(load_synonyms().groups),
+        "expanded_documents": sum(1 for terms in expansions if terms),
+        "expansion_postings": sum(len(terms) for terms in expansions)
+    }
+
+
+ENGINES = {"bm25": BM25Engine}
+
+# Backends living in their own modules, imported on first use: {name: module}
+_ENGINE_MODULES = {"sqlite": "sqlite_engine", "hybrid": "semantic"}
+
+
+def register_engine(name, engine_cls):
+    """Register a search engine backend under a name"""
+    ENGINES[name] = engine_cls
+
+
+def available_engines():
+    """Names of all registered and lazily importable engines"""
+    return sorted(set(ENGINES) | set(_ENGINE_MODULES))
+
+
+def resolve_engine(config=None, engine=None):
+    """Pick the engine name for a domain: explicit > env var > config > default"""
+    name = engine or os.environ.get(ENGINE_ENV) or (config or {}).get("engine") or DEFAULT_ENGINE
+    if name not in ENGINES and name in _ENGINE_MODULES:
+        importlib.import_module(_ENGINE_MODULES[name])
+    if name not in ENGINES:
+        raise ValueError(f"Unknown search engine: {name}. Available: {', '.join(available_engines())}")
+    return name
+
+
+# ============ SEGMENTS ============
+def overlay_dirs():
+    """Overlay data directories listed in $UIPRO_EXTRA_DATA"""
+    return [Path(d) for d in os.environ.get(EXTRA_DATA_ENV, "").split(os.pathsep) if d]
+
+
+def segment_files(filepath):
+    """Data files making up one index: the bundled CSV, then its copy in each overlay directory"""
+    filepath = Path(filepath)
+    try:
+        relative = filepath.relative_to(DATA_DIR)
+    except ValueError:
+        return [filepath]
+    return [filepath] + [d / relative for d in overlay_dirs() if (d / relative).is_file()]
+
+
+def source_fingerprint(filepath):
+    """index_fingerprint() over every segment of a data file"""
+    return "|".join(index_fingerprint(path) for path in segment_files(filepath))
+
+
+class SegmentedIndex:
+    """Engine protocol over immutable segments: the bundled CSV plus one per overlay file.
+
+    Each segment is an ordinary engine with its own artifact, so changing an
+    overlay only rebuilds that segment. Row indices are global (segment
+    offset + local index). Segments of BM25-based engines are scored with
+    collection-wide statistics (BM25.merged), so their scores compare as if
+    they were one index. compact() folds all segments into one artifact,
+    which is used until any segment changes; engines that are not
+    segmentable (one model over all rows, or scores that only hold within
+    one segment, like sqlite) are compacted on open.
+    """
+
+    def __init__(self, filepath, search_cols, engine, index_dir=None):
+        self.filepath = Path(filepath)
+        self.search_cols = list(search_cols)
+        self.engine = engine
+        self.index_dir = Path(index_dir or INDEX_DIR)
+        self.files = segment_files(filepath)
+        self.fingerprints = [index_fingerprint(path) for path in self.files]
+        self.segments = []
+        self.offsets = []
+        self.sizes = []
+        self.model = None
+        self.compacted = None
+
+    @property
+    def manifest_path(self):
+        return self.index_dir / COMPACT_DIR / f"{self.engine}-{index_key(self.filepath, self.search_cols)}.json"
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+    def _compacted_engine(self):
+        return ENGINES[self.engine](self.filepath, self.search_cols, self.index_dir / COMPACT_DIR)
 
-            scores.append((idx, score))
+    def _compacted_segments(self):
+        """Segment fingerprints the compacted artifact was built from, or None"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("segments")
+        except (OSError, ValueError):
+            return None
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+    def open(self):
+        """Use a current compacted artifact, else the segment engines (loaded or built)"""
+        if self._compacted_segments() == self.fingerprints:
+            compacted = self._compacted_engine()
+            if compacted.load():
+                self.compacted = compacted
+                return self
+        if not ENGINES[self.engine].segmentable:
+            self.compact()
+            return self
+        self.segments = [_get_segment(path, self.search_cols, self.engine) for path in self.files]
+        self.sizes = [segment.stats()["documents"] for segment in self.segments]
+        self.offsets = [sum(self.sizes[:i]) for i in range(len(self.sizes))]
+        if all(hasattr(segment, "bm25") for segment in self.segments):
+            self.model = BM25.merged([segment.bm25 for segment in self.segments])
+        return self
+
+    def compact(self):
+        """Build and save one artifact over the rows of every segment, returns a report"""
+        report = {"file": str(self.filepath), "engine": self.engine, "segments": len(self.files)}
+        compacted = self._compacted_engine()
+        if not hasattr(compacted, "artifact_path"):
+            return {**report, "error": f"engine {self.engine} does not support compaction"}
+        rows = load_rows(self.filepath)
+        compacted.build(rows)
+        compacted.save()
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"segments": self.fingerprints, "files": [str(path) for path in self.files]}, f)
+        os.replace(tmp_path, self.manifest_path)
+        self.compacted = compacted
+        return {**report, "rows": len(rows), "artifact": str(compacted.artifact_path)}
+
+    def query(self, text, k=None, candidates=None):
+        """Query every segment and merge the rankings on global row indices"""
+        if self.compacted is not None:
+            return self.compacted.query(text, k, candidates)
+        ranked, corrections = [], {}
+        for segment, offset, size in zip(self.segments, self.offsets, self.sizes):
+            local = None if candidates is None else (candidates >> offset) & ((1 << size) - 1)
+            if local == 0:
+                continue
+            if self.model is not None:
+                hits, fixed = segment.query(text, None, local, stats=self.model)
+            else:
+                hits, fixed = segment.query(text, None, local)
+            ranked.extend((offset + idx, score) for idx, score in hits)
+            corrections.update(fixed)
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        return ranked[:k] if k is not None else ranked, corrections
+
+    def fetch(self, indices):
+        """Return the rows for global indices, each from its segment"""
+        if self.compacted is not None:
+            return self.compacted.fetch(indices)
+        rows = []
+        for idx in indices:
+            i = bisect.bisect_right(self.offsets, idx) - 1
+            rows.extend(self.segments[i].fetch([idx - self.offsets[i]]))
+        return rows
+
+    def stats(self):
+        """Statistics of the compacted index, or of the first segment with collection totals"""
+        if self.compacted is not None:
+            return {**self.compacted.stats(), "segments": len(self.files), "compacted": True}
+        per_segment = [segment.stats() for segment in self.segments]
+        stats = dict(per_segment[0])
+        stats["documents"] = sum(self.sizes)
+        for key in EXPANSION_TOTALS:
+            stats[key] = sum(segment.get(key, 0) for segment in per_segment)
+        if self.model is not None:
+            stats["vocabulary"] = len(self.model.idf)
+            stats["avg_doc_length"] = round(self.model.avgdl, 2)
+        stats["segments"] = [
+            {"file": str(path), "documents": size, **{key: segment.get(key, 0) for key in EXPANSION_TOTALS}}
+            for path, size, segment in zip(self.files, self.sizes, per_segment)
+        ]
+        stats["compacted"] = False
+        return stats
+
+
+# ============ DATA INDEXES ============
+def load_rows(filepath):
+    """Rows of a data file followed by those of its overlays"""
+    return [row for path in segment_files(filepath) for row in _load_csv(path)]
+
+
+class DataIndex:
+    """Base of the precomputed per-file tables (palette Lab values, style costs).
+
+    Subclasses set filepath, index_dir and artifact_path, and implement
+    build(rows), _state() and _restore(artifact) as BM25Engine does. The
+    artifact is tagged with source_fingerprint(), so overlays are covered.
+    """
+
+    def save(self):
+        """Write the precomputed table to its artifact"""
+        write_artifact(self.artifact_path, source_fingerprint(self.filepath), self._state())
+
+    def load(self):
+        """Restore from the artifact, returns False if missing or stale"""
+        artifact = read_artifact(self.artifact_path, source_fingerprint(self.filepath))
+        return artifact is not None and self._restore(artifact)
+
+    @classmethod
+    def build_artifact(cls, index_dir=None):
+        """Build and save the artifact of the default data file (deploy time), returns the index"""
+        index = cls(index_dir=index_dir)
+        index.build(load_rows(index.filepath))
+        index.save()
+        return index
+
+
+# Data indexes shared by every search in the process: {artifact path: (source fingerprint, index)}
+_DATA_INDEXES = {}
+_DATA_INDEX_LOCK = threading.Lock()
+
+
+def get_data_index(index_cls, filepath=None, index_dir=None):
+    """A DataIndex of a data file: reused while its sources are unchanged, else loaded from a current artifact or built"""
+    index = index_cls(filepath, index_dir)
+    fingerprint = source_fingerprint(index.filepath)
+    with _DATA_INDEX_LOCK:
+        cached = _DATA_INDEXES.get(str(index.artifact_path))
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        if not index.load():
+            index.build(load_rows(index.filepath))
+        _DATA_INDEXES[str(index.artifact_path)] = (fingerprint, index)
+        return index
+
+
+# ============ REQUEST COALESCING ============
+class _Flight:
+    """One in-flight computation and the number of callers waiting on it"""
+
+    __slots__ = ("done", "waiters", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers with the same key wait for it.
+
+    The caller that started the computation gets the result object itself and
+    waiters each get their own JSON copy, so no caller can alter what the
+    others see. Nothing is kept once the computation finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.counts = defaultdict(int)
+
+    def do(self, key, compute):
+        """Return compute(), or a copy of the result of an identical computation already running"""
+        with self._lock:
+            self.counts["calls"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.counts["executions"] += 1
+            else:
+                flight.waiters += 1
+                self.counts["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return json.loads(flight.result)
+
+        try:
+            result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # No waiter can join once the flight is unregistered
+            with self._lock:
+                del self._flights[key]
+            if flight.error is None and flight.waiters:
+                flight.result = json.dumps(result, ensure_ascii=False)
+            flight.done.set()
+        return result
+
+    def stats(self):
+        """Counters: calls, executions, calls coalesced into another one, computations in flight"""
+        with self._lock:
+            return {
+                "calls": self.counts.get("calls", 0),
+                "executions": self.counts.get("executions", 0),
+                "coalesced": self.counts.get("coalesced", 0),
+                "in_flight": len(self._flights)
+            }
+
+
+# Concurrent identical search() / search_stack() calls of the process
+_FLIGHTS = SingleFlight()
+
+
+def _flight_key(kind, target, query, max_results, *options):
+    """Coalescing key: what is searched, the normalized query, k and every other option"""
+    return (kind, target, " ".join(query.lower().split()), max_results,
+            *(json.dumps(option, sort_keys=True) for option in options))
+
+
+def coalescing_stats():
+    """Request coalescing counters of this process, see SingleFlight"""
+    return _FLIGHTS.stats()
 
 
 # ============ SEARCH FUNCTIONS ============
+# Built engines shared by every search in the process: {(file, cols, engine): (mtimes, engine)}
+_INDEX_CACHE = {}
+_INDEX_LOCK = threading.Lock()
+
+
 def _load_csv(filepath):
     """Load CSV and return list of dicts"""
     with open(filepath, 'r', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
+_FINGERPRINTS = {}
+
+
+def file_fingerprint(filepath):
+    """Content hash of a data file, recomputed only when its size or mtime changes"""
+    stat = Path(filepath).stat()
+    key = str(filepath)
+    cached = _FINGERPRINTS.get(key)
+    if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    with open(filepath, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _FINGERPRINTS[key] = ((stat.st_mtime_ns, stat.st_size), digest)
+    return digest
+
+
+def _get_index(filepath, search_cols, engine=DEFAULT_ENGINE):
+    """Return a ready engine for a CSV, a SegmentedIndex if overlays add rows to it.
+
+    Segments are reused while their files are unchanged.
+    """
+    files = segment_files(filepath)
+    if len(files) == 1:
+        return _get_segment(filepath, search_cols, engine)
+
+    key = (str(filepath), tuple(search_cols), engine, "segments")
+    fingerprints = [index_fingerprint(path) for path in files]
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached and cached[0] == fingerprints:
+            return cached[1]
+    index = SegmentedIndex(filepath, search_cols, engine, INDEX_DIR).open()
+    with _INDEX_LOCK:
+        _INDEX_CACHE[key] = (fingerprints, index)
+    return index
+
+
+def _get_segment(filepath, search_cols, engine=DEFAULT_ENGINE):
+    """Return a ready engine for one CSV: a prebuilt artifact if one is current, else built once.
+
+    Engines are reused while the file is unchanged.
+    """
+    key = (str(filepath), tuple(search_cols), engine)
+    mtime = (filepath.stat().st_mtime_ns, SYNONYMS_FILE.stat().st_mtime_ns if SYNONYMS_FILE.exists() else None)
+
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        index = ENGINES[engine](filepath, search_cols, INDEX_DIR)
+        if not index.load():
+            index.build(_load_csv(filepath))
+
+        _INDEX_CACHE[key] = (mtime, index)
+        return index
+
+
+# Facet bitsets per data file: {(file, cols): (mtimes, FacetIndex)}
+_FACET_CACHE = {}
+
+
+def _get_facets(filepath, facet_cols):
+    """Return the FacetIndex for a CSV and its overlays, rebuilt only when a file changes"""
+    key = (str(filepath), tuple(facet_cols))
+    files = segment_files(filepath)
+    mtime = tuple(path.stat().st_mtime_ns for path in files)
+    with _INDEX_LOCK:
+        cached = _FACET_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        facets = FacetIndex(facet_cols)
+        facets.build(load_rows(filepath))
+        _FACET_CACHE[key] = (mtime, facets)
+        return facets
+
+
+# Ranked candidate lists behind cursor tokens: {token: (expires_at, ranked, corrections, ranking key)}
+_CURSORS = {}
+_CURSOR_LOCK = threading.Lock()
+
+
+def _ranking_key(filepath, search_cols, engine, query, candidates=None):
+    """Everything a ranked list depends on: data file version, search columns, engine, query and filters"""
+    return "|".join([str(filepath), ",".join(search_cols), engine, source_fingerprint(filepath), " ".join(query.lower().split()),
+                     "" if candidates is None else format(candidates, "x")])
+
+
+def _cursor_token(key):
+    """Opaque, deterministic cursor token for a ranking key"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _load_cursor(token, key):
+    """Return (ranked, corrections) for a live cursor from memory or disk.
+
+    None if the cursor is unknown, expired, or was created for another
+    ranking key (a different file, engine, query or filter).
+    """
+    now = time.time()
+    with _CURSOR_LOCK:
+        entry = _CURSORS.get(token)
+    if entry is None:
+        try:
+            with open(CURSOR_DIR / f"{token}.json", 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            entry = (stored["expires_at"], [tuple(item) for item in stored["ranked"]], stored["corrections"],
+                     stored["key"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    if entry[0] < now:
+        _remove_cursor_files([token])
+        return None
+    if entry[3] != key:
+        return None
+    with _CURSOR_LOCK:
+        _CURSORS[token] = entry
+    return entry[1], entry[2]
+
+
+def _remove_cursor_files(tokens):
+    """Delete the files of cursors that expired or were evicted (best effort)"""
+    for token in tokens:
+        try:
+            (CURSOR_DIR / f"{token}.json").unlink()
+        except OSError:
+            pass
+
+
+def _prune_cursor_files(now):
+    """Delete cursor files written by any process that are past CURSOR_TTL, then the oldest beyond MAX_CURSORS"""
+    files = []
+    for path in CURSOR_DIR.glob("*.json"):
+        try:
+            files.append((path.stat().st_mtime, path.stem))
+        except OSError:
+            pass
+    files.sort()
+    expired = [token for mtime, token in files if mtime + CURSOR_TTL < now]
+    _remove_cursor_files(expired + [token for _, token in files[len(expired):-MAX_CURSORS]])
+
+
+def _store_cursor(token, key, ranked, corrections):
+    """Cache a ranked candidate list under a cursor token, in memory and on disk (best effort).
+
+    The disk copy follows the memory one: it is deleted when the cursor
+    expires or is evicted, and the directory is pruned to MAX_CURSORS files.
+    """
+    now = time.time()
+    entry = (now + CURSOR_TTL, ranked, corrections, key)
+    with _CURSOR_LOCK:
+        evicted = [t for t, e in _CURSORS.items() if e[0] < now]
+        for stale in evicted:
+            del _CURSORS[stale]
+        while len(_CURSORS) >= MAX_CURSORS:
+            oldest = next(iter(_CURSORS))
+            evicted.append(oldest)
+            del _CURSORS[oldest]
+        _CURSORS[token] = entry
+    _remove_cursor_files(t for t in evicted if t != token)
+    try:
+        CURSOR_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = CURSOR_DIR / f"{token}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"expires_at": entry[0], "ranked": ranked, "corrections": corrections, "key": key}, f)
+        os.replace(tmp_path, CURSOR_DIR / f"{token}.json")
+        _prune_cursor_files(now)
+    except OSError:
+        pass
+
+
+def _search_csv(filepath, search_cols, output_cols, query, max_results, offset=None, cursor=None,
+                engine=DEFAULT_ENGINE, session=None, candidates=None):
+    """Core search function, dispatched through the selected engine.
+
+    Returns (results, extras) where extras holds optional payload keys:
+    "corrections" for fixed typos, "suggestions" for typos only reported
+    (see correct_tokens) and, when paginating (offset or cursor
+    given), "cursor", "offset", "next_offset" and "total", plus
+    "cursor_ignored" when the cursor passed in belongs to another search
+    (that search is re-ranked instead). A SearchSession
+    reuses rankings and rows already computed in the same run. candidates
+    is a facet bitset; only those rows are scored.
+    """
     if not filepath.exists():
-        return []
+        return [], {}
 
-    data = _load_csv(filepath)
+    # Search over the warm index
+    index = _get_index(filepath, search_cols, engine)
+    extras = {}
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+    if offset is None and cursor is None:
+        start = 0
+        if session is not None:
+            ranked, corrections = session.rank(index, filepath, search_cols, engine, query, max_results, candidates)
+        else:
+            ranked, corrections = index.query(query, max_results, candidates)
+    else:
+        # Paginated: slice a cached ranked list instead of re-scoring for every page
+        start = max(offset or 0, 0)
+        key = _ranking_key(filepath, search_cols, engine, query, candidates)
+        token = _cursor_token(key)
+        if cursor and cursor != token:
+            extras["cursor_ignored"] = True
+        cached = _load_cursor(token, key)
+        if cached is None:
+            cached = index.query(query, None, candidates)
+            _store_cursor(token, key, *cached)
+        ranked, corrections = cached
+        end = start + max_results
+        extras.update({
+            "cursor": token,
+            "offset": start,
+            "next_offset": end if end < len(ranked) else None,
+            "total": len(ranked)
+        })
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
+    applied, suggested = split_corrections(corrections)
+    if applied:
+        extras["corrections"] = applied
+    if suggested:
+        extras["suggestions"] = suggested
 
-    # Get top results with score > 0
+    indices = [idx for idx, _ in ranked[start:start + max_results]]
+    rows = session.fetch(index, filepath, indices) if session is not None else index.fetch(indices)
     results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+    for row in rows:
+        results.append({col: row.get(col, "") for col in output_cols if col in row})
 
-    return results
+    return results, extras
 
 
 def detect_domain(query):
@@ -209,10 +1319,59 @@ def detect_domain(query):
     return best if scores[best] > 0 else "style"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
+def _resolve_filters(filepath, config, filters):
+    """Candidate bitset for filters against a data file's facet columns (None when unfiltered)"""
+    if not filters:
+        return None
+    return _get_facets(filepath, config.get("facet_cols", [])).resolve(filters)
+
+
+def search(query, domain=None, max_results=MAX_RESULTS, offset=None, cursor=None, engine=None, session=None,
+           filters=None, min_contrast=None, perf_budget=None):
+    """Main search function with auto-domain detection.
+
+    Pass offset (and the returned cursor on later calls) to page through the
+    ranked results; the ranking is computed once and cached for CURSOR_TTL.
+    engine overrides the backend chosen by resolve_engine(). Prefer
+    session.search() to share work across the searches of one run.
+    filters ({column: value or [values]}) restricts scoring to rows matching
+    every column, using the domain's "facet_cols" bitsets. min_contrast (a
+    ratio or WCAG level name, color domain only) keeps palettes whose
+    text/background and CTA/background pairs reach it, using the contrast
+    bitsets precomputed by the palette index. perf_budget (strict, balanced
+    or rich, style domain only) keeps styles whose parsed Performance,
+    Complexity and effects scores fit that budget (see perf.PERF_BUDGETS).
+    Concurrent identical calls outside a session run once (see SingleFlight).
+    """
     if domain is None:
         domain = detect_domain(query)
+    if session is not None:
+        return _search_domain(query, domain, max_results, offset, cursor, engine, session, filters, min_contrast,
+                              perf_budget)
+
+    key = _flight_key("domain", domain, query, max_results, offset, cursor, engine, filters, min_contrast, perf_budget)
+    result = _FLIGHTS.do(key, lambda: _search_domain(query, domain, max_results, offset, cursor, engine, None, filters,
+                                                     min_contrast, perf_budget))
+    if "query" in result:
+        result["query"] = query
+    return result
+
+
+def _search_domain(query, domain, max_results, offset, cursor, engine, session, filters, min_contrast=None,
+                   perf_budget=None):
+    """search() for a resolved domain; color queries naming hex/rgb colors rank palettes by ΔE"""
+    if perf_budget is not None:
+        if domain != "style":
+            return {"error": "A performance budget only applies to the style domain", "domain": domain}
+        if perf_budget not in importlib.import_module("perf").PERF_BUDGETS:
+            return {"error": f"Unknown performance budget: {perf_budget}", "domain": domain}
+    if min_contrast is not None:
+        if domain != "color":
+            return {"error": "A minimum contrast only applies to the color domain", "domain": domain}
+        try:
+            min_contrast = importlib.import_module("palette").parse_min_contrast(min_contrast)
+        except ValueError as e:
+            return {"error": str(e), "domain": domain}
 
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
     filepath = DATA_DIR / config["file"]
@@ -220,19 +1379,167 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+    try:
+        engine = resolve_engine(config, engine)
+        candidates = _resolve_filters(filepath, config, filters)
+    except ValueError as e:
+        return {"error": str(e), "domain": domain}
+    if domain == "color":
+        palette = importlib.import_module("palette")
+        if palette.parse_colors(query):
+            return _search_palettes(palette, filepath, query, max_results, offset, cursor, filters, candidates,
+                                    min_contrast)
+    if min_contrast is not None:
+        mask = importlib.import_module("palette").get_palette_index().contrast_mask(min_contrast)
+        candidates = mask if candidates is None else candidates & mask
+    if perf_budget is not None:
+        mask = importlib.import_module("perf").get_style_cost_index().budget_mask(perf_budget)
+        candidates = mask if candidates is None else candidates & mask
 
-    return {
+    results, extras = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results,
+                                  offset, cursor, engine, session, candidates)
+
+    result = {
         "domain": domain,
         "query": query,
         "file": config["file"],
         "count": len(results),
         "results": results
     }
+    if filters:
+        result["filters"] = filters
+    if min_contrast is not None:
+        result["min_contrast"] = min_contrast
+    if perf_budget is not None:
+        result["perf_budget"] = perf_budget
+    result.update(extras)
+    return result
+
+
+def _search_palettes(palette, filepath, query, max_results, offset, cursor, filters, candidates, min_contrast):
+    """ΔE palette ranking for color queries naming hex/rgb colors, with the filters and pagination of _search_csv"""
+    paginated = offset is not None or cursor is not None
+    result = palette.search_palettes(query, max_results, min_contrast, max(offset or 0, 0) if paginated else None,
+                                     candidates)
+    if filters:
+        result["filters"] = filters
+    if paginated:
+        # The ranking is recomputed per page; the cursor only identifies the search it belongs to
+        token = _cursor_token(_ranking_key(filepath, list(palette.ROLES.values()), "palette", query, candidates))
+        if cursor and cursor != token:
+            result["cursor_ignored"] = True
+        result["cursor"] = token
+    return result
+
+
+def _guideline_key(row):
+    """Normalized identity of a guideline, used to collapse duplicates across stacks"""
+    return (" ".join(row.get("Category", "").lower().split()), " ".join(row.get("Guideline", "").lower().split()))
+
+
+def _search_stacks(query, stacks, max_results, per_stack, engine, filters=None):
+    """Score several stacks concurrently and return one payload of tagged, de-duplicated results"""
+    stacks = list(dict.fromkeys(stacks))
+    unknown = [stack for stack in stacks if stack not in STACK_CONFIG]
+    if unknown:
+        return {"error": f"Unknown stack: {', '.join(unknown)}. Available: {', '.join(AVAILABLE_STACKS)}"}
+
+    try:
+        engines = {stack: resolve_engine(STACK_CONFIG[stack], engine) for stack in stacks}
+        candidates = {
+            stack: _resolve_filters(DATA_DIR / STACK_CONFIG[stack]["file"], _STACK_COLS, filters)
+            for stack in stacks if (DATA_DIR / STACK_CONFIG[stack]["file"]).exists()
+        }
+    except ValueError as e:
+        return {"error": str(e), "stack": ", ".join(stacks)}
+
+    def score(stack):
+        filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+        if not filepath.exists():
+            return stack, [], {}
+        index = _get_index(filepath, _STACK_COLS["search_cols"], engines[stack])
+        ranked, corrections = index.query(query, max_results, candidates[stack])
+        rows = index.fetch([idx for idx, _ in ranked])
+        return stack, [(score, row) for (_, score), row in zip(ranked, rows)], corrections
+
+    with ThreadPoolExecutor(max_workers=min(len(stacks), MAX_STACK_WORKERS)) as executor:
+        scored = list(executor.map(score, stacks))
+
+    # Best-scoring copy of each guideline wins; the stacks sharing it are listed on it
+    candidates = [(score, stack, row) for stack, rows, _ in scored for score, row in rows]
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    best = {}
+    for score, stack, row in candidates:
+        key = _guideline_key(row)
+        if key in best:
+            best[key][1].append(stack)
+        else:
+            best[key] = (score, [stack], row)
+
+    if per_stack:
+        order = {stack: i for i, stack in enumerate(stacks)}
+        kept = sorted(best.values(), key=lambda b: (order[b[1][0]], -b[0]))
+    else:
+        kept = list(best.values())[:max_results]
+
+    output_cols = _STACK_COLS["output_cols"]
+    results = []
+    for _, tagged, row in kept:
+        result = {"Stack": ", ".join(tagged)}
+        result.update({col: row.get(col, "") for col in output_cols if col in row})
+        results.append(result)
+
+    corrections = {}
+    for _, _, fixes in scored:
+        corrections.update(fixes)
+    applied, suggested = split_corrections(corrections)
+
+    result = {
+        "domain": "stack",
+        "stack": ", ".join(stacks),
+        "stacks": stacks,
+        "mode": "per-stack" if per_stack else "merged",
+        "query": query,
+        "file": ", ".join(STACK_CONFIG[stack]["file"] for stack in stacks),
+        "count": len(results),
+        "results": results
+    }
+    if filters:
+        result["filters"] = filters
+    if applied:
+        result["corrections"] = applied
+    if suggested:
+        result["suggestions"] = suggested
+    return result
+
+
+def search_stack(query, stack, max_results=MAX_RESULTS, offset=None, cursor=None, engine=None, per_stack=False,
+                 filters=None):
+    """Search stack-specific guidelines, optionally paginated and filtered like search().
 
+    stack may also be a list of stacks: they are scored concurrently and
+    returned as one merged top-k (or top-k per stack with per_stack=True),
+    each result tagged with its "Stack" and duplicates collapsed.
+    Pagination applies to single-stack searches only. Concurrent identical
+    calls run once (see SingleFlight).
+    """
+    target = tuple(stack) if isinstance(stack, (list, tuple)) else stack
+    key = _flight_key("stack", target, query, max_results, offset, cursor, engine, per_stack, filters)
+    result = _FLIGHTS.do(key, lambda: _search_stack(query, stack, max_results, offset, cursor, engine, per_stack, filters))
+    if "query" in result:
+        result["query"] = query
+    return result
+
+
+def _search_stack(query, stack, max_results, offset, cursor, engine, per_stack, filters):
+    """search_stack() without coalescing"""
+    if isinstance(stack, (list, tuple)):
+        if len(stack) > 1:
+            if offset is not None or cursor is not None:
+                return {"error": "Pagination (offset/cursor) needs a single stack", "stack": ", ".join(stack)}
+            return _search_stacks(query, stack, max_results, per_stack, engine, filters)
+        stack = stack[0] if stack else None
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
-    """Search stack-specific guidelines"""
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
 
@@ -241,9 +1548,16 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"Stack file not found: {filepath}", "stack": stack}
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+    try:
+        engine = resolve_engine(STACK_CONFIG[stack], engine)
+        candidates = _resolve_filters(filepath, _STACK_COLS, filters)
+    except ValueError as e:
+        return {"error": str(e), "stack": stack}
 
-    return {
+    results, extras = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results,
+                                  offset, cursor, engine, candidates=candidates)
+
+    result = {
         "domain": "stack",
         "stack": stack,
         "query": query,
@@ -251,3 +1565,134 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
         "count": len(results),
         "results": results
     }
+    if filters:
+        result["filters"] = filters
+    result.update(extras)
+    return result
+
+
+# ============ SEARCH SESSION ============
+class SearchSession:
+    """Memoizes the searches of one run (one CLI invocation or design system build).
+
+    Identical searches return the stored result; searches with the same
+    query text (case and whitespace aside) against the same index and engine
+    reuse the ranking, sliced to the requested size; rows are materialized
+    once. Safe to share between the threads of one run.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ranked = {}    # (file, cols, engine, normalized query, candidates) -> (k, ranked, corrections)
+        self._rows = {}      # (file, idx) -> row
+        self._results = {}   # (query, domain, max_results, engine) -> result
+        self._memo = {}      # free-form memoized values, see cached()
+        self.counts = defaultdict(int)
+
+    def rank(self, index, filepath, search_cols, engine, query, k, candidates=None):
+        """index.query(query, k, candidates), reusing a ranking of at least k results for the same query.
+
+        The key is the raw query text, not its terms: term order and phrase
+        syntax change the ranking of the phrase and sqlite paths
+        """
+        key = (str(filepath), tuple(search_cols), engine, " ".join(query.lower().split()), candidates)
+        with self._lock:
+            cached = self._ranked.get(key)
+            if cached and (cached[0] is None or (k is not None and k <= cached[0])):
+                self.counts["ranking_hits"] += 1
+                return cached[1][:k] if k is not None else cached[1], cached[2]
+        ranked, corrections = index.query(query, k, candidates)
+        with self._lock:
+            self.counts["rankings"] += 1
+            self._ranked[key] = (k, ranked, corrections)
+        return ranked, corrections
+
+    def fetch(self, index, filepath, indices):
+        """index.fetch(indices), materializing each row once"""
+        with self._lock:
+            missing = [idx for idx in indices if (str(filepath), idx) not in self._rows]
+            self.counts["row_hits"] += len(indices) - len(missing)
+        if missing:
+            rows = index.fetch(missing)
+            with self._lock:
+                for idx, row in zip(missing, rows):
+                    self._rows[(str(filepath), idx)] = row
+        with self._lock:
+            return [self._rows[(str(filepath), idx)] for idx in indices]
+
+    def search(self, query, domain=None, max_results=MAX_RESULTS, engine=None, filters=None, min_contrast=None,
+               perf_budget=None):
+        """search() within the session; repeated calls return a copy of the first result"""
+        key = (" ".join(query.lower().split()), domain, max_results, engine, json.dumps(filters, sort_keys=True),
+               min_contrast, perf_budget)
+        with self._lock:
+            self.counts["searches"] += 1
+            cached = self._results.get(key)
+            if cached is not None:
+                self.counts["saved"] += 1
+                return json.loads(cached)
+        result = search(query, domain, max_results, engine=engine, session=self, filters=filters,
+                        min_contrast=min_contrast, perf_budget=perf_budget)
+        with self._lock:
+            self._results[key] = json.dumps(result, ensure_ascii=False)
+        return result
+
+    def cached(self, key, compute):
+        """Memoize any derived value for the rest of the run"""
+        with self._lock:
+            if key in self._memo:
+                self.counts["memo_hits"] += 1
+                return self._memo[key]
+        value = compute()
+        with self._lock:
+            self._memo.setdefault(key, value)
+        return value
+
+    def trace(self):
+        """Counters: searches requested, saved by the result memo, rankings computed vs reused"""
+        with self._lock:
+            counts = dict(self.counts)
+        searches = counts.get("searches", 0)
+        return {
+            "searches": searches,
+            "saved": counts.get("saved", 0) + counts.get("ranking_hits", 0),
+            "result_hits": counts.get("saved", 0),
+            "rankings": counts.get("rankings", 0),
+            "ranking_hits": counts.get("ranking_hits", 0),
+            "row_hits": counts.get("row_hits", 0),
+            "memo_hits": counts.get("memo_hits", 0)
+        }
+
+
+def index_stats(domain=None, stack=None, engine=None):
+    """Return engine statistics for a domain or stack index"""
+    if stack:
+        if stack not in STACK_CONFIG:
+            return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
+        config, search_cols = STACK_CONFIG[stack], _STACK_COLS["search_cols"]
+    else:
+        config = CSV_CONFIG.get(domain or "style", CSV_CONFIG["style"])
+        search_cols = config["search_cols"]
+
+    filepath = DATA_DIR / config["file"]
+    if not filepath.exists():
+        return {"error": f"File not found: {filepath}"}
+
+    try:
+        engine = resolve_engine(config, engine)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    index = _get_index(filepath, search_cols, engine)
+    facet_cols = _STACK_COLS["facet_cols"] if stack else config.get("facet_cols", [])
+    return {"file": config["file"], **index.stats(), "facets": _get_facets(filepath, facet_cols).stats()}
+
+
+def compact_segments(engine=None, index_dir=None):
+    """Fold the segments of every data file that has overlays into one artifact, returns the reports"""
+    engine = resolve_engine(engine=engine)
+    reports = []
+    for name, filepath, search_cols, _ in iter_sources():
+        if len(segment_files(filepath)) > 1:
+            reports.append({"name": name, **SegmentedIndex(filepath, search_cols, engine, index_dir).compact()})
+    return reports
@@ -11,18 +11,43 @@ Usage:
     # With persistence (Master + Overrides pattern)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True, page="dashboard")
+    result = generate_design_system("SaaS dashboard", "My Project", persist=True,
+                                    pages=[("dashboard", None), ("checkout", "one-click payment")])
 """
 
+import copy
 import csv
+import hashlib
 import json
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from core import search, DATA_DIR
+from core import (SearchSession, file_fingerprint, resolve_engine, segment_files, BM25, CSV_CONFIG, DATA_DIR, CACHE_DIR,
+                  SYNONYMS_FILE)
+from palette import format_contrast, get_palette_index, hex_contrast
+from perf import PERF_BUDGETS, format_cost, get_style_cost_index
+from render import (COMPACT_FORMATS, encode_binary, iter_compact, iter_json, iter_jsonl, to_columnar,
+                    write_binary, write_lines)
 
 
 # ============ CONFIGURATION ============
 REASONING_FILE = "ui-reasoning.csv"
+# Per-project writer locks live here, not in the user's design-system folder
+LOCK_DIR = CACHE_DIR / "locks"
+MAX_PAGE_WORKERS = 8
+
+# Memoized generate() results; bump CACHE_VERSION when the output shape changes
+CACHE_VERSION = 3
+GENERATE_CACHE_DIR = CACHE_DIR / "design-systems"
+# Design systems prebuilt for every products.csv category (see precompute_design_systems)
+PRECOMPUTED_FILE = GENERATE_CACHE_DIR / "categories.json"
+
+# Lines that change on every run and must not count as a content change
+VOLATILE_PREFIXES = ("**Generated:**", "> **Generated:**")
 
 SEARCH_CONFIG = {
     "product": {"max_results": 1},
@@ -32,11 +57,138 @@ SEARCH_CONFIG = {
     "typography": {"max_results": 2}
 }
 
+# Every data file generate() reads; their fingerprints are part of the cache key
+GENERATE_SOURCES = [CSV_CONFIG[domain]["file"] for domain in SEARCH_CONFIG] + [REASONING_FILE, SYNONYMS_FILE.name]
+
+
+def _source_fingerprints() -> dict:
+    """Fingerprint of every data file generate() reads, overlays included."""
+    sources = {}
+    for filename in GENERATE_SOURCES:
+        filepath = DATA_DIR / filename
+        sources[filename] = file_fingerprint(filepath) if filepath.exists() else None
+        for overlay in segment_files(filepath)[1:]:
+            sources[str(overlay)] = file_fingerprint(overlay)
+    return sources
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _resolved_engines(engine: str = None) -> dict:
+    """Engine each generate() search runs on: explicit > $UIPRO_ENGINE > per-domain config > default."""
+    return {domain: resolve_engine(CSV_CONFIG[domain], engine) for domain in SEARCH_CONFIG}
+
+
+# ============ FONT LOADING ============
+GOOGLE_FONTS_CSS = "https://fonts.googleapis.com/css2"
+GOOGLE_FONTS_ORIGINS = ("https://fonts.googleapis.com", "https://fonts.gstatic.com")
+FONT_FAMILY_PATTERN = re.compile(r"family=([^&:'\")]+)(?::wght@([\d;.]+))?")
+# Weights the generated design system actually renders: body copy (400),
+# buttons/labels (600, see the component specs) and headings (700)
+FONT_WEIGHTS = {"heading": (700,), "body": (400, 600)}
+# Rough woff2 size of one weight of one family for a Latin page; CJK
+# families ship far larger glyph sets even after unicode-range slicing
+FONT_FILE_KB = 20
+CJK_FONT_FILE_KB = 150
+CJK_SUFFIXES = ("JP", "KR", "SC", "TC")
+
+
+def parse_font_import(css_import: str) -> dict:
+    """Families of a Google Fonts css2 import -> sorted weights, or a (min, max) range for
+    variable axes, or None for static single-weight families."""
+    families = {}
+    for name, spec in FONT_FAMILY_PATTERN.findall(css_import or ""):
+        name = name.replace("+", " ").strip()
+        if not spec:
+            families[name] = None
+        elif ".." in spec:
+            low, high = spec.split("..", 1)
+            families[name] = (int(low), int(high))
+        else:
+            families[name] = sorted({int(w) for w in spec.split(";") if w})
+    return families
+
+
+def _font_file_kb(family: str) -> int:
+    return CJK_FONT_FILE_KB if family.startswith("Noto ") and family.split()[-1] in CJK_SUFFIXES else FONT_FILE_KB
+
+
+def _trim_weights(wanted, available):
+    """Weights to request from a family: each wanted weight, or the nearest one it offers."""
+    if available is None:
+        return None
+    if isinstance(available, tuple):
+        return sorted({min(max(w, available[0]), available[1]) for w in wanted})
+    return sorted({min(available, key=lambda a: (abs(a - w), -a)) for w in wanted})
+
+
+def _font_files(families: dict, variable=()) -> list:
+    """Families of each woff2 file the browser downloads: one per weight, one per variable family."""
+    return [name for name, weights in families.items()
+            for _ in (weights if weights and name not in variable else [None])]
+
+
+def font_loading_plan(heading: str, body: str, css_import: str = "") -> dict:
+    """Performance-optimized loading of a font pairing, computed offline.
+
+    Both families go into one css2 request trimmed to FONT_WEIGHTS with
+    display=swap, loaded through preconnect + preload links instead of a
+    render-blocking @import. Families of the import matching neither font
+    name (a stand-in for a non-Google font) keep the weights of both roles.
+    Sizes are estimates from FONT_FILE_KB, not fetched.
+    """
+    available = parse_font_import(css_import)
+    roles = {"heading": heading, "body": body}
+    if not available:
+        available = {name: [100, 200, 300, 400, 500, 600, 700, 800, 900] for name in dict.fromkeys(roles.values()) if name}
+
+    families = {}
+    for name, offered in available.items():
+        wanted = {w for role, font in roles.items() if font == name for w in FONT_WEIGHTS[role]}
+        families[name] = _trim_weights(wanted or {w for weights in FONT_WEIGHTS.values() for w in weights}, offered)
+
+    query = "&".join(
+        f"family={name.replace(' ', '+')}" + (f":wght@{';'.join(map(str, weights))}" if weights else "")
+        for name, weights in sorted(families.items()))
+    url = f"{GOOGLE_FONTS_CSS}?{query}&display=swap"
+    variable = {name for name, offered in available.items() if isinstance(offered, tuple)}
+    files = _font_files(families, variable)
+    original = _font_files(parse_font_import(css_import), variable)
+    return {
+        "url": url,
+        "families": families,
+        "html": [
+            f'<link rel="preconnect" href="{GOOGLE_FONTS_ORIGINS[0]}">',
+            f'<link rel="preconnect" href="{GOOGLE_FONTS_ORIGINS[1]}" crossorigin>',
+            f'<link rel="preload" as="style" href="{url}">',
+            f'<link rel="stylesheet" href="{url}">'
+        ],
+        "files": len(files),
+        "estimated_kb": sum(map(_font_file_kb, files)),
+        "original_files": len(original) or None,
+        "original_kb": sum(map(_font_file_kb, original)) or None
+    }
+
+
+def format_font_budget(plan: dict) -> str:
+    """One-line size summary of a font loading plan."""
+    summary = f"{plan['files']} font files, ~{plan['estimated_kb']} KB"
+    if plan.get("original_kb"):
+        summary += f" (full import: {plan['original_files']} files, ~{plan['original_kb']} KB)"
+    return summary
+
 
 # ============ DESIGN SYSTEM GENERATOR ============
 class DesignSystemGenerator:
     """Generates design system recommendations from aggregated searches."""
 
+    # Process-wide memo shared by all generators: {cache key: design system}
+    _memo = {}
+    # Precomputed category queries, loaded once: (source fingerprints, engines, table)
+    _precomputed = None
+
     def __init__(self):
         self.reasoning_data = self._load_reasoning()
 
@@ -48,17 +200,22 @@ class DesignSystemGenerator:
         with open(filepath, 'r', encoding='utf-8') as f:
             return list(csv.DictReader(f))
 
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
+    def _multi_domain_search(self, query: str, style_priority: list = None, session: SearchSession = None,
+                             min_contrast: float = None, perf_budget: str = None, engine: str = None) -> dict:
         """Execute searches across multiple domains."""
+        session = session or SearchSession()
         results = {}
         for domain, config in SEARCH_CONFIG.items():
-            if domain == "style" and style_priority:
+            if domain == "color" and min_contrast is not None:
+                results[domain] = session.search(query, domain, config["max_results"], engine=engine,
+                                                 min_contrast=min_contrast)
+            elif domain == "style" and (style_priority or perf_budget is not None):
                 # For style, also search with priority keywords
-                priority_query = " ".join(style_priority[:2]) if style_priority else query
-                combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
+                combined_query = f"{query} {' '.join(style_priority[:2])}" if style_priority else query
+                results[domain] = session.search(combined_query, domain, config["max_results"], engine=engine,
+                                                 perf_budget=perf_budget)
             else:
-                results[domain] = search(query, domain, config["max_results"])
+                results[domain] = session.search(query, domain, config["max_results"], engine=engine)
         return results
 
     def _find_reasoning_rule(self, category: str) -> dict:
@@ -119,11 +276,23 @@ class DesignSystemGenerator:
             "severity": rule.get("Severity", "MEDIUM")
         }
 
-    def _select_best_match(self, results: list, priority_keywords: list) -> dict:
-        """Select best matching result based on priority keywords."""
+    def _select_best_match(self, results: list, priority_keywords: list, perf_budget: str = None) -> dict:
+        """Select best matching result based on priority keywords.
+
+        With a perf_budget, results are first re-ranked by search position
+        plus the budget's weight times each style's parsed cost, so cheaper
+        styles move up under "strict" and keep their order under "rich".
+        """
         if not results:
             return {}
 
+        if perf_budget is not None and PERF_BUDGETS[perf_budget]["rerank"]:
+            index = get_style_cost_index()
+            weight = PERF_BUDGETS[perf_budget]["rerank"]
+            costs = [(index.cost_of(result) or {"cost": 0.0})["cost"] for result in results]
+            order = sorted(range(len(results)), key=lambda i: i + weight * costs[i])
+            results = [results[i] for i in order]
+
         if not priority_keywords:
             return results[0]
 
@@ -160,21 +329,119 @@ class DesignSystemGenerator:
         """Extract results list from search result dict."""
         return search_result.get("results", [])
 
-    def generate(self, query: str, project_name: str = None) -> dict:
-        """Generate complete design system recommendation."""
+    def _cache_key(self, query: str, project_name: str, min_contrast: float = None, perf_budget: str = None,
+                   engine: str = None) -> str:
+        """Content address for a generate() call: normalized inputs, resolved engines + data fingerprints."""
+        key = {
+            "version": CACHE_VERSION,
+            "query": _normalize_query(query),
+            "project_name": project_name,
+            "engines": _resolved_engines(engine),
+            "sources": _source_fingerprints()
+        }
+        if min_contrast is not None:
+            key["min_contrast"] = min_contrast
+        if perf_budget is not None:
+            key["perf_budget"] = perf_budget
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _read_cache(self, key: str) -> dict:
+        """Look up a cached design system in memory, then on disk."""
+        if key in self._memo:
+            return self._memo[key]
+        try:
+            with open(GENERATE_CACHE_DIR / key[:2] / f"{key}.json", 'r', encoding='utf-8') as f:
+                design_system = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._memo[key] = design_system
+        return design_system
+
+    def _write_cache(self, key: str, design_system: dict):
+        """Store a design system in memory and on disk (best effort)."""
+        self._memo[key] = design_system
+        try:
+            path = GENERATE_CACHE_DIR / key[:2] / f"{key}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_if_changed(path, json.dumps(design_system, ensure_ascii=False))
+        except OSError:
+            pass
+
+    def _load_precomputed(self, engine: str = None) -> dict:
+        """Precomputed category table if it matches the current data files and engines, else an empty one."""
+        sources = _source_fingerprints()
+        engines = _resolved_engines(engine)
+        cached = DesignSystemGenerator._precomputed
+        if cached is not None and cached[0] == sources and cached[1] == engines:
+            return cached[2]
+        table = {}
+        try:
+            with open(PRECOMPUTED_FILE, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if (stored.get("version") == CACHE_VERSION and stored.get("sources") == sources
+                    and stored.get("engines") == engines):
+                table = stored
+        except (OSError, ValueError):
+            pass
+        table.setdefault("categories", {})
+        table.setdefault("queries", {})
+        DesignSystemGenerator._precomputed = (sources, engines, table)
+        return table
+
+    def generate(self, query: str, project_name: str = None, use_cache: bool = True,
+                 session: SearchSession = None, min_contrast: float = None, perf_budget: str = None,
+                 engine: str = None) -> dict:
+        """Generate complete design system recommendation, memoized unless use_cache is False.
+
+        min_contrast restricts the palette to those whose text/background and
+        CTA/background pairs reach that WCAG contrast ratio. perf_budget
+        (strict, balanced or rich) restricts and re-ranks the style by its
+        parsed performance cost. engine selects the search backend of every
+        search (default: $UIPRO_ENGINE, then each domain's configured engine).
+        """
+        if not use_cache:
+            return self._generate(query, project_name, use_precomputed=False, session=session,
+                                  min_contrast=min_contrast, perf_budget=perf_budget, engine=engine)
+
+        key = self._cache_key(query, project_name, min_contrast, perf_budget, engine)
+        design_system = self._read_cache(key)
+        if design_system is None:
+            design_system = self._generate(query, project_name, session=session, min_contrast=min_contrast,
+                                           perf_budget=perf_budget, engine=engine)
+            self._write_cache(key, design_system)
+
+        design_system = copy.deepcopy(design_system)
+        design_system["project_name"] = project_name or query.upper()
+        return design_system
+
+    def _generate(self, query: str, project_name: str = None, use_precomputed: bool = True,
+                  session: SearchSession = None, min_contrast: float = None, perf_budget: str = None,
+                  engine: str = None) -> dict:
+        """Run the search + reasoning pipeline for one query."""
+        session = session or SearchSession()
+        # Precomputed design systems were chosen without contrast or performance constraints
+        use_precomputed = use_precomputed and min_contrast is None and perf_budget is None
+        precomputed = self._load_precomputed(engine) if use_precomputed else {"categories": {}, "queries": {}}
+
+        # Step 0: A query that is exactly a precomputed category alias is a dict lookup
+        stored = precomputed["queries"].get(_normalize_query(query))
+        if stored:
+            return copy.deepcopy(stored)
+
         # Step 1: First search product to get category
-        product_result = search(query, "product", 1)
+        product_result = session.search(query, "product", 1, engine=engine)
         product_results = product_result.get("results", [])
         category = "General"
         if product_results:
             category = product_results[0].get("Product Type", "General")
 
         # Step 2: Get reasoning rules for this category
-        reasoning = self._apply_reasoning(category, {})
+        entry = precomputed["categories"].get(category)
+        reasoning = copy.deepcopy(entry["reasoning"]) if entry else self._apply_reasoning(category, {})
         style_priority = reasoning.get("style_priority", [])
 
         # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
+        search_results = self._multi_domain_search(query, style_priority, session, min_contrast, perf_budget, engine)
         search_results["product"] = product_result  # Reuse product search
 
         # Step 4: Select best matches from each domain using priority
@@ -183,8 +450,18 @@ class DesignSystemGenerator:
         typography_results = self._extract_results(search_results.get("typography", {}))
         landing_results = self._extract_results(search_results.get("landing", {}))
 
-        best_style = self._select_best_match(style_results, reasoning.get("style_priority", []))
+        best_style = self._select_best_match(style_results, reasoning.get("style_priority", []), perf_budget)
+        if not style_results and perf_budget is not None:
+            # No style matching the query fits the budget: take the cheapest one that does
+            index = get_style_cost_index()
+            cheapest = index.cheapest(perf_budget)
+            best_style = index.rows[cheapest] if cheapest is not None else {}
         best_color = color_results[0] if color_results else {}
+        if not color_results and min_contrast is not None:
+            # No palette matching the query passes: take the highest-contrast one that does
+            index = get_palette_index()
+            strongest = index.strongest(min_contrast)
+            best_color = index.rows[strongest] if strongest is not None else {}
         best_typography = typography_results[0] if typography_results else {}
         best_landing = landing_results[0] if landing_results else {}
 
@@ -194,6 +471,32 @@ class DesignSystemGenerator:
         reasoning_effects = reasoning.get("key_effects", "")
         combined_effects = style_effects if style_effects else reasoning_effects
 
+        colors = {
+            "primary": best_color.get("Primary (Hex)", "#2563EB"),
+            "secondary": best_color.get("Secondary (Hex)", "#3B82F6"),
+            "cta": best_color.get("CTA (Hex)", "#F97316"),
+            "background": best_color.get("Background (Hex)", "#F8FAFC"),
+            "text": best_color.get("Text (Hex)", "#1E293B"),
+            "notes": best_color.get("Notes", "")
+        }
+        if min_contrast is not None:
+            colors["min_contrast"] = min_contrast
+            colors["contrast"] = hex_contrast(colors)
+
+        style = {
+            "name": best_style.get("Style Category", "Minimalism"),
+            "type": best_style.get("Type", "General"),
+            "effects": style_effects,
+            "keywords": best_style.get("Keywords", ""),
+            "best_for": best_style.get("Best For", ""),
+            "performance": best_style.get("Performance", ""),
+            "accessibility": best_style.get("Accessibility", "")
+        }
+        if perf_budget is not None:
+            style["perf_budget"] = perf_budget
+            style["cost"] = get_style_cost_index().cost_of(best_style)
+            style["effect_budget"] = PERF_BUDGETS[perf_budget]["effects"]
+
         return {
             "project_name": project_name or query.upper(),
             "category": category,
@@ -204,30 +507,18 @@ class DesignSystemGenerator:
                 "color_strategy": best_landing.get("Color Strategy", ""),
                 "conversion": best_landing.get("Conversion Optimization", "")
             },
-            "style": {
-                "name": best_style.get("Style Category", "Minimalism"),
-                "type": best_style.get("Type", "General"),
-                "effects": style_effects,
-                "keywords": best_style.get("Keywords", ""),
-                "best_for": best_style.get("Best For", ""),
-                "performance": best_style.get("Performance", ""),
-                "accessibility": best_style.get("Accessibility", "")
-            },
-            "colors": {
-                "primary": best_color.get("Primary (Hex)", "#2563EB"),
-                "secondary": best_color.get("Secondary (Hex)", "#3B82F6"),
-                "cta": best_color.get("CTA (Hex)", "#F97316"),
-                "background": best_color.get("Background (Hex)", "#F8FAFC"),
-                "text": best_color.get("Text (Hex)", "#1E293B"),
-                "notes": best_color.get("Notes", "")
-            },
+            "style": style,
+            "colors": colors,
             "typography": {
                 "heading": best_typography.get("Heading Font", "Inter"),
                 "body": best_typography.get("Body Font", "Inter"),
                 "mood": best_typography.get("Mood/Style Keywords", reasoning.get("typography_mood", "")),
                 "best_for": best_typography.get("Best For", ""),
                 "google_fonts_url": best_typography.get("Google Fonts URL", ""),
-                "css_import": best_typography.get("CSS Import", "")
+                "css_import": best_typography.get("CSS Import", ""),
+                "font_loading": font_loading_plan(best_typography.get("Heading Font", "Inter"),
+                                                  best_typography.get("Body Font", "Inter"),
+                                                  best_typography.get("CSS Import", ""))
             },
             "key_effects": combined_effects,
             "anti_patterns": reasoning.get("anti_patterns", ""),
@@ -236,11 +527,64 @@ class DesignSystemGenerator:
         }
 
 
+def category_aliases(product: dict) -> list:
+    """Queries a products.csv row is typically asked with: its name, the name without
+    qualifiers ("SaaS (General)" -> "saas") and each of its keywords."""
+    name = product.get("Product Type", "")
+    primary = re.sub(r"\s*\([^)]*\)", "", name).replace("/", " ")
+    keywords = product.get("Keywords", "").split(",")
+    tokenize = BM25().tokenize
+    aliases = [_normalize_query(alias) for alias in [name, primary] + keywords]
+    return [alias for alias in dict.fromkeys(aliases) if tokenize(alias)]
+
+
+def precompute_design_systems(path: Path = None, engine: str = None) -> dict:
+    """Generate and store the design system of every products.csv category alias, and each category's reasoning.
+
+    An alias query is answered from the table only when it is asked
+    verbatim, with the entry the live pipeline produced for it. The table
+    is tagged with the data files and engines it was built with and only
+    serves generate() calls resolving to the same ones. An alias whose
+    product search picks another category than the row listing it (a
+    keyword shadowed by another category) is stored as generated, and
+    reported so the data can be fixed.
+    Returns {"categories", "queries": stored counts, "rerouted": {alias: category it resolves to}, "file": path}.
+    """
+    path = Path(path or PRECOMPUTED_FILE)
+    generator = DesignSystemGenerator()
+    session = SearchSession()
+    with open(DATA_DIR / CSV_CONFIG["product"]["file"], 'r', encoding='utf-8') as f:
+        products = list(csv.DictReader(f))
+
+    categories, queries, rerouted = {}, {}, {}
+    for product in products:
+        category = product.get("Product Type", "")
+        if not category:
+            continue
+        categories[category] = {"reasoning": generator._apply_reasoning(category, {})}
+        for alias in category_aliases(product):
+            if alias in queries:
+                continue
+            queries[alias] = generator._generate(alias, use_precomputed=False, session=session, engine=engine)
+            if queries[alias]["category"] != category:
+                rerouted[alias] = queries[alias]["category"]
+
+    table = {"version": CACHE_VERSION, "sources": _source_fingerprints(), "engines": _resolved_engines(engine),
+             "categories": categories, "queries": queries}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_if_changed(path, json.dumps(table, ensure_ascii=False))
+    DesignSystemGenerator._precomputed = None
+    return {"categories": len(categories), "queries": len(queries), "rerouted": rerouted, "file": str(path)}
+
+
 # ============ OUTPUT FORMATTERS ============
 BOX_WIDTH = 90  # Wider box for more content
+# Human-readable formats; anything else is meant for a parser
+TEXT_FORMATS = ["ascii", "markdown"]
+OUTPUT_FORMATS = TEXT_FORMATS + ["json", "jsonl"] + COMPACT_FORMATS
 
-def format_ascii_box(design_system: dict) -> str:
-    """Format design system as ASCII box with emojis (MCP-style)."""
+def iter_ascii_box(design_system: dict):
+    """Yield the design system as ASCII box lines with emojis (MCP-style)."""
     project = design_system.get("project_name", "PROJECT")
     pattern = design_system.get("pattern", {})
     style = design_system.get("style", {})
@@ -271,81 +615,91 @@ def format_ascii_box(design_system: dict) -> str:
     sections = pattern.get("sections", "").split(">")
     sections = [s.strip() for s in sections if s.strip()]
 
-    # Build output lines
-    lines = []
+    # Yield output lines
     w = BOX_WIDTH - 1
 
-    lines.append("+" + "-" * w + "+")
-    lines.append(f"|  TARGET: {project} - RECOMMENDED DESIGN SYSTEM".ljust(BOX_WIDTH) + "|")
-    lines.append("+" + "-" * w + "+")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+    yield "+" + "-" * w + "+"
+    yield f"|  TARGET: {project} - RECOMMENDED DESIGN SYSTEM".ljust(BOX_WIDTH) + "|"
+    yield "+" + "-" * w + "+"
+    yield "|" + " " * BOX_WIDTH + "|"
 
     # Pattern section
-    lines.append(f"|  PATTERN: {pattern.get('name', '')}".ljust(BOX_WIDTH) + "|")
+    yield f"|  PATTERN: {pattern.get('name', '')}".ljust(BOX_WIDTH) + "|"
     if pattern.get('conversion'):
-        lines.append(f"|     Conversion: {pattern.get('conversion', '')}".ljust(BOX_WIDTH) + "|")
+        yield f"|     Conversion: {pattern.get('conversion', '')}".ljust(BOX_WIDTH) + "|"
     if pattern.get('cta_placement'):
-        lines.append(f"|     CTA: {pattern.get('cta_placement', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append("|     Sections:".ljust(BOX_WIDTH) + "|")
+        yield f"|     CTA: {pattern.get('cta_placement', '')}".ljust(BOX_WIDTH) + "|"
+    yield "|     Sections:".ljust(BOX_WIDTH) + "|"
     for i, section in enumerate(sections, 1):
-        lines.append(f"|       {i}. {section}".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        yield f"|       {i}. {section}".ljust(BOX_WIDTH) + "|"
+    yield "|" + " " * BOX_WIDTH + "|"
 
     # Style section
-    lines.append(f"|  STYLE: {style.get('name', '')}".ljust(BOX_WIDTH) + "|")
+    yield f"|  STYLE: {style.get('name', '')}".ljust(BOX_WIDTH) + "|"
     if style.get("keywords"):
         for line in wrap_text(f"Keywords: {style.get('keywords', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
     if style.get("best_for"):
         for line in wrap_text(f"Best For: {style.get('best_for', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
     if style.get("performance") or style.get("accessibility"):
         perf_a11y = f"Performance: {style.get('performance', '')} | Accessibility: {style.get('accessibility', '')}"
-        lines.append(f"|     {perf_a11y}".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        yield f"|     {perf_a11y}".ljust(BOX_WIDTH) + "|"
+    if style.get("perf_budget"):
+        if style.get("cost"):
+            yield f"|     Budget ({style['perf_budget']}): cost {format_cost(style['cost'])}".ljust(BOX_WIDTH) + "|"
+        for line in wrap_text(f"Effect Budget: {style.get('effect_budget', '')}", "|     ", BOX_WIDTH):
+            yield line.ljust(BOX_WIDTH) + "|"
+    yield "|" + " " * BOX_WIDTH + "|"
 
     # Colors section
-    lines.append("|  COLORS:".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Primary:    {colors.get('primary', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Secondary:  {colors.get('secondary', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     CTA:        {colors.get('cta', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Background: {colors.get('background', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Text:       {colors.get('text', '')}".ljust(BOX_WIDTH) + "|")
+    yield "|  COLORS:".ljust(BOX_WIDTH) + "|"
+    yield f"|     Primary:    {colors.get('primary', '')}".ljust(BOX_WIDTH) + "|"
+    yield f"|     Secondary:  {colors.get('secondary', '')}".ljust(BOX_WIDTH) + "|"
+    yield f"|     CTA:        {colors.get('cta', '')}".ljust(BOX_WIDTH) + "|"
+    yield f"|     Background: {colors.get('background', '')}".ljust(BOX_WIDTH) + "|"
+    yield f"|     Text:       {colors.get('text', '')}".ljust(BOX_WIDTH) + "|"
+    if colors.get("contrast"):
+        yield f"|     Contrast:   {format_contrast(colors['contrast'])}".ljust(BOX_WIDTH) + "|"
     if colors.get("notes"):
         for line in wrap_text(f"Notes: {colors.get('notes', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
+    yield "|" + " " * BOX_WIDTH + "|"
 
     # Typography section
-    lines.append(f"|  TYPOGRAPHY: {typography.get('heading', '')} / {typography.get('body', '')}".ljust(BOX_WIDTH) + "|")
+    yield f"|  TYPOGRAPHY: {typography.get('heading', '')} / {typography.get('body', '')}".ljust(BOX_WIDTH) + "|"
     if typography.get("mood"):
         for line in wrap_text(f"Mood: {typography.get('mood', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
     if typography.get("best_for"):
         for line in wrap_text(f"Best For: {typography.get('best_for', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
     if typography.get("google_fonts_url"):
-        lines.append(f"|     Google Fonts: {typography.get('google_fonts_url', '')}".ljust(BOX_WIDTH) + "|")
-    if typography.get("css_import"):
-        lines.append(f"|     CSS Import: {typography.get('css_import', '')[:70]}...".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        yield f"|     Google Fonts: {typography.get('google_fonts_url', '')}".ljust(BOX_WIDTH) + "|"
+    if typography.get("font_loading"):
+        loading = typography["font_loading"]
+        yield f"|     Font Loading: {format_font_budget(loading)}".ljust(BOX_WIDTH) + "|"
+        yield f"|     CSS2: {loading['url'][:70]}...".ljust(BOX_WIDTH) + "|"
+    elif typography.get("css_import"):
+        yield f"|     CSS Import: {typography.get('css_import', '')[:70]}...".ljust(BOX_WIDTH) + "|"
+    yield "|" + " " * BOX_WIDTH + "|"
 
     # Key Effects section
     if effects:
-        lines.append("|  KEY EFFECTS:".ljust(BOX_WIDTH) + "|")
+        yield "|  KEY EFFECTS:".ljust(BOX_WIDTH) + "|"
         for line in wrap_text(effects, "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
-        lines.append("|" + " " * BOX_WIDTH + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
+        yield "|" + " " * BOX_WIDTH + "|"
 
     # Anti-patterns section
     if anti_patterns:
-        lines.append("|  AVOID (Anti-patterns):".ljust(BOX_WIDTH) + "|")
+        yield "|  AVOID (Anti-patterns):".ljust(BOX_WIDTH) + "|"
         for line in wrap_text(anti_patterns, "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
-        lines.append("|" + " " * BOX_WIDTH + "|")
+            yield line.ljust(BOX_WIDTH) + "|"
+        yield "|" + " " * BOX_WIDTH + "|"
 
     # Pre-Delivery Checklist section
-    lines.append("|  PRE-DELIVERY CHECKLIST:".ljust(BOX_WIDTH) + "|")
+    yield "|  PRE-DELIVERY CHECKLIST:".ljust(BOX_WIDTH) + "|"
     checklist_items = [
         "[ ] No emojis as icons (use SVG: Heroicons/Lucide)",
         "[ ] cursor-pointer on all clickable elements",
@@ -356,16 +710,19 @@ def format_ascii_box(design_system: dict) -> str:
         "[ ] Responsive: 375px, 768px, 1024px, 1440px"
     ]
     for item in checklist_items:
-        lines.append(f"|     {item}".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        yield f"|     {item}".ljust(BOX_WIDTH) + "|"
+    yield "|" + " " * BOX_WIDTH + "|"
 
-    lines.append("+" + "-" * w + "+")
+    yield "+" + "-" * w + "+"
 
-    return "\n".join(lines)
+
+def format_ascii_box(design_system: dict) -> str:
+    """Format design system as ASCII box with emojis (MCP-style)."""
+    return "\n".join(iter_ascii_box(design_system))
 
 
-def format_markdown(design_system: dict) -> str:
-    """Format design system as markdown."""
+def iter_markdown(design_system: dict):
+    """Yield the design system as markdown lines."""
     project = design_system.get("project_name", "PROJECT")
     pattern = design_system.get("pattern", {})
     style = design_system.get("style", {})
@@ -374,121 +731,176 @@ def format_markdown(design_system: dict) -> str:
     effects = design_system.get("key_effects", "")
     anti_patterns = design_system.get("anti_patterns", "")
 
-    lines = []
-    lines.append(f"## Design System: {project}")
-    lines.append("")
+    yield f"## Design System: {project}"
+    yield ""
 
     # Pattern section
-    lines.append("### Pattern")
-    lines.append(f"- **Name:** {pattern.get('name', '')}")
+    yield "### Pattern"
+    yield f"- **Name:** {pattern.get('name', '')}"
     if pattern.get('conversion'):
-        lines.append(f"- **Conversion Focus:** {pattern.get('conversion', '')}")
+        yield f"- **Conversion Focus:** {pattern.get('conversion', '')}"
     if pattern.get('cta_placement'):
-        lines.append(f"- **CTA Placement:** {pattern.get('cta_placement', '')}")
+        yield f"- **CTA Placement:** {pattern.get('cta_placement', '')}"
     if pattern.get('color_strategy'):
-        lines.append(f"- **Color Strategy:** {pattern.get('color_strategy', '')}")
-    lines.append(f"- **Sections:** {pattern.get('sections', '')}")
-    lines.append("")
+        yield f"- **Color Strategy:** {pattern.get('color_strategy', '')}"
+    yield f"- **Sections:** {pattern.get('sections', '')}"
+    yield ""
 
     # Style section
-    lines.append("### Style")
-    lines.append(f"- **Name:** {style.get('name', '')}")
+    yield "### Style"
+    yield f"- **Name:** {style.get('name', '')}"
     if style.get('keywords'):
-        lines.append(f"- **Keywords:** {style.get('keywords', '')}")
+        yield f"- **Keywords:** {style.get('keywords', '')}"
     if style.get('best_for'):
-        lines.append(f"- **Best For:** {style.get('best_for', '')}")
+        yield f"- **Best For:** {style.get('best_for', '')}"
     if style.get('performance') or style.get('accessibility'):
-        lines.append(f"- **Performance:** {style.get('performance', '')} | **Accessibility:** {style.get('accessibility', '')}")
-    lines.append("")
+        yield f"- **Performance:** {style.get('performance', '')} | **Accessibility:** {style.get('accessibility', '')}"
+    if style.get("perf_budget"):
+        if style.get("cost"):
+            yield f"- **Performance Budget ({style['perf_budget']}):** cost {format_cost(style['cost'])}"
+        yield f"- **Effect Budget:** {style.get('effect_budget', '')}"
+    yield ""
 
     # Colors section
-    lines.append("### Colors")
-    lines.append(f"| Role | Hex |")
-    lines.append(f"|------|-----|")
-    lines.append(f"| Primary | {colors.get('primary', '')} |")
-    lines.append(f"| Secondary | {colors.get('secondary', '')} |")
-    lines.append(f"| CTA | {colors.get('cta', '')} |")
-    lines.append(f"| Background | {colors.get('background', '')} |")
-    lines.append(f"| Text | {colors.get('text', '')} |")
+    yield "### Colors"
+    yield f"| Role | Hex |"
+    yield f"|------|-----|"
+    yield f"| Primary | {colors.get('primary', '')} |"
+    yield f"| Secondary | {colors.get('secondary', '')} |"
+    yield f"| CTA | {colors.get('cta', '')} |"
+    yield f"| Background | {colors.get('background', '')} |"
+    yield f"| Text | {colors.get('text', '')} |"
+    if colors.get("contrast"):
+        yield f"\n*Contrast (min {colors.get('min_contrast')}:1): {format_contrast(colors['contrast'])}*"
     if colors.get("notes"):
-        lines.append(f"\n*Notes: {colors.get('notes', '')}*")
-    lines.append("")
+        yield f"\n*Notes: {colors.get('notes', '')}*"
+    yield ""
 
     # Typography section
-    lines.append("### Typography")
-    lines.append(f"- **Heading:** {typography.get('heading', '')}")
-    lines.append(f"- **Body:** {typography.get('body', '')}")
+    yield "### Typography"
+    yield f"- **Heading:** {typography.get('heading', '')}"
+    yield f"- **Body:** {typography.get('body', '')}"
     if typography.get("mood"):
-        lines.append(f"- **Mood:** {typography.get('mood', '')}")
+        yield f"- **Mood:** {typography.get('mood', '')}"
     if typography.get("best_for"):
-        lines.append(f"- **Best For:** {typography.get('best_for', '')}")
+        yield f"- **Best For:** {typography.get('best_for', '')}"
     if typography.get("google_fonts_url"):
-        lines.append(f"- **Google Fonts:** {typography.get('google_fonts_url', '')}")
-    if typography.get("css_import"):
-        lines.append(f"- **CSS Import:**")
-        lines.append(f"```css")
-        lines.append(f"{typography.get('css_import', '')}")
-        lines.append(f"```")
-    lines.append("")
+        yield f"- **Google Fonts:** {typography.get('google_fonts_url', '')}"
+    if typography.get("font_loading"):
+        yield f"- **Font Loading:** {format_font_budget(typography['font_loading'])}"
+        yield f"```html"
+        yield from typography["font_loading"]["html"]
+        yield f"```"
+    elif typography.get("css_import"):
+        yield f"- **CSS Import:**"
+        yield f"```css"
+        yield f"{typography.get('css_import', '')}"
+        yield f"```"
+    yield ""
 
     # Key Effects section
     if effects:
-        lines.append("### Key Effects")
-        lines.append(f"{effects}")
-        lines.append("")
+        yield "### Key Effects"
+        yield f"{effects}"
+        yield ""
 
     # Anti-patterns section
     if anti_patterns:
-        lines.append("### Avoid (Anti-patterns)")
+        yield "### Avoid (Anti-patterns)"
         newline_bullet = '\n- '
-        lines.append(f"- {anti_patterns.replace(' + ', newline_bullet)}")
-        lines.append("")
+        yield f"- {anti_patterns.replace(' + ', newline_bullet)}"
+        yield ""
 
     # Pre-Delivery Checklist section
-    lines.append("### Pre-Delivery Checklist")
-    lines.append("- [ ] No emojis as icons (use SVG: Heroicons/Lucide)")
-    lines.append("- [ ] cursor-pointer on all clickable elements")
-    lines.append("- [ ] Hover states with smooth transitions (150-300ms)")
-    lines.append("- [ ] Light mode: text contrast 4.5:1 minimum")
-    lines.append("- [ ] Focus states visible for keyboard nav")
-    lines.append("- [ ] prefers-reduced-motion respected")
-    lines.append("- [ ] Responsive: 375px, 768px, 1024px, 1440px")
-    lines.append("")
+    yield "### Pre-Delivery Checklist"
+    yield "- [ ] No emojis as icons (use SVG: Heroicons/Lucide)"
+    yield "- [ ] cursor-pointer on all clickable elements"
+    yield "- [ ] Hover states with smooth transitions (150-300ms)"
+    yield "- [ ] Light mode: text contrast 4.5:1 minimum"
+    yield "- [ ] Focus states visible for keyboard nav"
+    yield "- [ ] prefers-reduced-motion respected"
+    yield "- [ ] Responsive: 375px, 768px, 1024px, 1440px"
+    yield ""
 
-    return "\n".join(lines)
+
+def format_markdown(design_system: dict) -> str:
+    """Format design system as markdown."""
+    return "\n".join(iter_markdown(design_system))
+
+
+def iter_design_system(design_system: dict, output_format: str = "ascii"):
+    """Yield the design system rendered in any text format of OUTPUT_FORMATS, line by line."""
+    if output_format == "binary":
+        raise ValueError("binary output is not line-based; use render.write_binary()")
+    if output_format in COMPACT_FORMATS:
+        return iter_compact(design_system, output_format)
+    if output_format == "markdown":
+        return iter_markdown(design_system)
+    if output_format == "json":
+        return iter_json(design_system)
+    if output_format == "jsonl":
+        return iter_jsonl(design_system)
+    return iter_ascii_box(design_system)
 
 
 # ============ MAIN ENTRY POINT ============
 def generate_design_system(query: str, project_name: str = None, output_format: str = "ascii", 
-                           persist: bool = False, page: str = None, output_dir: str = None) -> str:
+                           persist: bool = False, page: str = None, output_dir: str = None,
+                           pages: list = None, use_cache: bool = True, sink=None,
+                           session: SearchSession = None, min_contrast: float = None,
+                           perf_budget: str = None, engine: str = None) -> str:
     """
     Main entry point for design system generation.
 
     Args:
         query: Search query (e.g., "SaaS dashboard", "e-commerce luxury")
         project_name: Optional project name for output header
-        output_format: "ascii" (default) or "markdown"
+        output_format: "ascii" (default), "markdown", "json", "jsonl", or a compact
+                       machine format: "json-min", "columnar" or "binary"
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        pages: Optional list of (page, page_query) tuples; overrides for all of them
+               are generated against the same master in one run
+        use_cache: If False, bypass the memoized/on-disk design system cache
+        sink: Optional file-like object; output is streamed to it line by line
+        session: Optional SearchSession shared by every search of the run (its
+                 trace() reports how many searches were saved)
+        min_contrast: Optional WCAG contrast ratio the palette's text/background
+                      and CTA/background pairs must reach
+        perf_budget: Optional performance budget ("strict", "balanced", "rich")
+                     the style's parsed Performance/Complexity/effects must fit
+        engine: Optional search engine backend for every search of the run
+                (default: $UIPRO_ENGINE, then per-domain config, then bm25)
 
     Returns:
-        Formatted design system string
+        Formatted design system string (bytes for "binary"), or None when streamed to sink
     """
+    session = session or SearchSession()
     generator = DesignSystemGenerator()
-    design_system = generator.generate(query, project_name)
+    design_system = generator.generate(query, project_name, use_cache=use_cache, session=session,
+                                       min_contrast=min_contrast, perf_budget=perf_budget, engine=engine)
     
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
-
-    if output_format == "markdown":
-        return format_markdown(design_system)
-    return format_ascii_box(design_system)
+        persist_design_system(design_system, page, output_dir, query, pages=pages, session=session, engine=engine)
+
+    if output_format == "binary":
+        if sink is not None:
+            write_binary(design_system, sink)
+            return None
+        return encode_binary(to_columnar(design_system))
+
+    lines = iter_design_system(design_system, output_format)
+    if sink is not None:
+        write_lines(lines, sink)
+        return None
+    return "\n".join(lines)
 
 
 # ============ PERSISTENCE FUNCTIONS ============
-def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None) -> dict:
+def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None,
+                          pages: list = None, session: SearchSession = None, engine: str = None) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
     
@@ -497,11 +909,22 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        pages: Optional list of (page, page_query) tuples. Overrides are generated
+               concurrently and written together with MASTER.md; a page without
+               its own query falls back to page_query.
+        session: Optional SearchSession shared with the generate() call
+        engine: Optional search engine backend for the page override searches
+    
+    Writes are atomic (temp file + os.replace), skipped when the content is
+    unchanged apart from the generation timestamp, and serialized per project
+    through a lock file kept in the cache directory.
     
     Returns:
-        dict with created file paths and status
+        dict with status, created_files (did not exist before), written_files
+        (created or updated) and skipped_files (unchanged)
     """
     base_dir = Path(output_dir) if output_dir else Path.cwd()
+    session = session or SearchSession()
     
     # Use project name for project-specific folder
     project_name = design_system.get("project_name", "default")
@@ -510,37 +933,142 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
     design_system_dir = base_dir / "design-system" / project_slug
     pages_dir = design_system_dir / "pages"
     
-    created_files = []
+    page_specs = list(pages or [])
+    if page:
+        page_specs.insert(0, (page, page_query))
     
-    # Create directories
-    design_system_dir.mkdir(parents=True, exist_ok=True)
-    pages_dir.mkdir(parents=True, exist_ok=True)
+    # One entry per page file; a later spec for the same page wins
+    page_jobs = {}
+    for name, query in page_specs:
+        page_jobs[pages_dir / f"{name.lower().replace(' ', '-')}.md"] = (name, query or page_query)
     
-    master_file = design_system_dir / "MASTER.md"
+    # Render everything before taking the lock to keep the critical section short
+    files = [(design_system_dir / "MASTER.md", format_master_md(design_system))]
+    if page_jobs:
+        workers = min(MAX_PAGE_WORKERS, len(page_jobs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = executor.map(
+                lambda job: format_page_override_md(design_system, *job, session=session, engine=engine),
+                page_jobs.values())
+            files.extend(zip(page_jobs.keys(), contents))
     
-    # Generate and write MASTER.md
-    master_content = format_master_md(design_system)
-    with open(master_file, 'w', encoding='utf-8') as f:
-        f.write(master_content)
-    created_files.append(str(master_file))
+    created_files = []
+    written_files = []
+    skipped_files = []
     
-    # If page is specified, create page override file with intelligent content
-    if page:
-        page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, 'w', encoding='utf-8') as f:
-            f.write(page_content)
-        created_files.append(str(page_file))
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    with _project_lock(design_system_dir):
+        for path, content in files:
+            existed = path.exists()
+            if _write_if_changed(path, content):
+                written_files.append(str(path))
+                if not existed:
+                    created_files.append(str(path))
+            else:
+                skipped_files.append(str(path))
     
     return {
         "status": "success",
         "design_system_dir": str(design_system_dir),
-        "created_files": created_files
+        "created_files": created_files,
+        "written_files": written_files,
+        "skipped_files": skipped_files
     }
 
 
-def format_master_md(design_system: dict) -> str:
-    """Format design system as MASTER.md with hierarchical override logic."""
+def parse_pages(spec: str) -> list:
+    """Parse "dashboard,checkout:one-click payment" into [(page, page_query or None)]."""
+    pages = []
+    for item in spec.split(","):
+        name, _, query = item.partition(":")
+        if name.strip():
+            pages.append((name.strip(), query.strip() or None))
+    return pages
+
+
+def load_pages_file(path: str) -> list:
+    """Load "page: query" pairs, one per line. Blank lines and # comments are ignored."""
+    pages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                name, _, query = line.partition(":")
+                pages.append((name.strip(), query.strip() or None))
+    return pages
+
+
+def _content_hash(content: str) -> str:
+    """Hash file content, ignoring volatile lines such as generation timestamps."""
+    stable = [line for line in content.splitlines() if not line.startswith(VOLATILE_PREFIXES)]
+    return hashlib.sha256("\n".join(stable).encode("utf-8")).hexdigest()
+
+
+def _write_if_changed(path: Path, content: str) -> bool:
+    """Atomically write content to path unless it is unchanged. Returns True if written.
+
+    A new file gets the process umask applied by the kernel; a replaced one
+    keeps the mode of the file it replaces.
+    """
+    mode = None
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            if _content_hash(f.read()) == _content_hash(content):
+                return False
+        mode = path.stat().st_mode & 0o777
+    
+    # Write to a temp file in the same directory so os.replace stays atomic
+    tmp_path = path.parent / f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+
+@contextmanager
+def _project_lock(design_system_dir: Path):
+    """Serialize writers to one design-system/<project>/ folder with an OS file lock.
+
+    The lock file is named after the folder's resolved path and kept in
+    LOCK_DIR, so nothing but the design system lands in the user's project.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        fcntl = None
+    
+    design_system_dir.mkdir(parents=True, exist_ok=True)
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256(str(design_system_dir.resolve()).encode("utf-8")).hexdigest()[:16]
+    with open(LOCK_DIR / f"{digest}.lock", 'a+b') as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        else:
+            import msvcrt
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def iter_master_md(design_system: dict):
+    """Yield MASTER.md lines with hierarchical override logic."""
     project = design_system.get("project_name", "PROJECT")
     pattern = design_system.get("pattern", {})
     style = design_system.get("style", {})
@@ -551,265 +1079,291 @@ def format_master_md(design_system: dict) -> str:
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    lines = []
-    
     # Logic header
-    lines.append("# Design System Master File")
-    lines.append("")
-    lines.append("> **LOGIC:** When building a specific page, first check `design-system/pages/[page-name].md`.")
-    lines.append("> If that file exists, its rules **override** this Master file.")
-    lines.append("> If not, strictly follow the rules below.")
-    lines.append("")
-    lines.append("---")
-    lines.append("")
-    lines.append(f"**Project:** {project}")
-    lines.append(f"**Generated:** {timestamp}")
-    lines.append(f"**Category:** {design_system.get('category', 'General')}")
-    lines.append("")
-    lines.append("---")
-    lines.append("")
+    yield "# Design System Master File"
+    yield ""
+    yield "> **LOGIC:** When building a specific page, first check `design-system/pages/[page-name].md`."
+    yield "> If that file exists, its rules **override** this Master file."
+    yield "> If not, strictly follow the rules below."
+    yield ""
+    yield "---"
+    yield ""
+    yield f"**Project:** {project}"
+    yield f"**Generated:** {timestamp}"
+    yield f"**Category:** {design_system.get('category', 'General')}"
+    yield ""
+    yield "---"
+    yield ""
     
     # Global Rules section
-    lines.append("## Global Rules")
-    lines.append("")
+    yield "## Global Rules"
+    yield ""
     
     # Color Palette
-    lines.append("### Color Palette")
-    lines.append("")
-    lines.append("| Role | Hex | CSS Variable |")
-    lines.append("|------|-----|--------------|")
-    lines.append(f"| Primary | `{colors.get('primary', '#2563EB')}` | `--color-primary` |")
-    lines.append(f"| Secondary | `{colors.get('secondary', '#3B82F6')}` | `--color-secondary` |")
-    lines.append(f"| CTA/Accent | `{colors.get('cta', '#F97316')}` | `--color-cta` |")
-    lines.append(f"| Background | `{colors.get('background', '#F8FAFC')}` | `--color-background` |")
-    lines.append(f"| Text | `{colors.get('text', '#1E293B')}` | `--color-text` |")
-    lines.append("")
+    yield "### Color Palette"
+    yield ""
+    yield "| Role | Hex | CSS Variable |"
+    yield "|------|-----|--------------|"
+    yield f"| Primary | `{colors.get('primary', '#2563EB')}` | `--color-primary` |"
+    yield f"| Secondary | `{colors.get('secondary', '#3B82F6')}` | `--color-secondary` |"
+    yield f"| CTA/Accent | `{colors.get('cta', '#F97316')}` | `--color-cta` |"
+    yield f"| Background | `{colors.get('background', '#F8FAFC')}` | `--color-background` |"
+    yield f"| Text | `{colors.get('text', '#1E293B')}` | `--color-text` |"
+    yield ""
+    if colors.get("contrast"):
+        yield f"**Contrast (WCAG, min {colors.get('min_contrast')}:1):** {format_contrast(colors['contrast'])}"
+        yield ""
     if colors.get("notes"):
-        lines.append(f"**Color Notes:** {colors.get('notes', '')}")
-        lines.append("")
+        yield f"**Color Notes:** {colors.get('notes', '')}"
+        yield ""
     
     # Typography
-    lines.append("### Typography")
-    lines.append("")
-    lines.append(f"- **Heading Font:** {typography.get('heading', 'Inter')}")
-    lines.append(f"- **Body Font:** {typography.get('body', 'Inter')}")
+    yield "### Typography"
+    yield ""
+    yield f"- **Heading Font:** {typography.get('heading', 'Inter')}"
+    yield f"- **Body Font:** {typography.get('body', 'Inter')}"
     if typography.get("mood"):
-        lines.append(f"- **Mood:** {typography.get('mood', '')}")
+        yield f"- **Mood:** {typography.get('mood', '')}"
     if typography.get("google_fonts_url"):
-        lines.append(f"- **Google Fonts:** [{typography.get('heading', '')} + {typography.get('body', '')}]({typography.get('google_fonts_url', '')})")
-    lines.append("")
-    if typography.get("css_import"):
-        lines.append("**CSS Import:**")
-        lines.append("```css")
-        lines.append(typography.get("css_import", ""))
-        lines.append("```")
-        lines.append("")
+        yield f"- **Google Fonts:** [{typography.get('heading', '')} + {typography.get('body', '')}]({typography.get('google_fonts_url', '')})"
+    yield ""
+    if typography.get("font_loading"):
+        loading = typography["font_loading"]
+        weights = ", ".join(f"{name} {'/'.join(map(str, w)) if w else 'regular'}" for name, w in loading["families"].items())
+        yield f"**Font Loading:** {format_font_budget(loading)}"
+        yield ""
+        yield "Add to `<head>` instead of a CSS `@import`, which blocks rendering until the font CSS arrives."
+        yield f"Only the weights this system uses are requested ({weights}); `display=swap` shows fallback text while fonts load."
+        yield ""
+        yield "```html"
+        yield from loading["html"]
+        yield "```"
+        yield ""
+    elif typography.get("css_import"):
+        yield "**CSS Import:**"
+        yield "```css"
+        yield typography.get("css_import", "")
+        yield "```"
+        yield ""
     
     # Spacing Variables
-    lines.append("### Spacing Variables")
-    lines.append("")
-    lines.append("| Token | Value | Usage |")
-    lines.append("|-------|-------|-------|")
-    lines.append("| `--space-xs` | `4px` / `0.25rem` | Tight gaps |")
-    lines.append("| `--space-sm` | `8px` / `0.5rem` | Icon gaps, inline spacing |")
-    lines.append("| `--space-md` | `16px` / `1rem` | Standard padding |")
-    lines.append("| `--space-lg` | `24px` / `1.5rem` | Section padding |")
-    lines.append("| `--space-xl` | `32px` / `2rem` | Large gaps |")
-    lines.append("| `--space-2xl` | `48px` / `3rem` | Section margins |")
-    lines.append("| `--space-3xl` | `64px` / `4rem` | Hero padding |")
-    lines.append("")
+    yield "### Spacing Variables"
+    yield ""
+    yield "| Token | Value | Usage |"
+    yield "|-------|-------|-------|"
+    yield "| `--space-xs` | `4px` / `0.25rem` | Tight gaps |"
+    yield "| `--space-sm` | `8px` / `0.5rem` | Icon gaps, inline spacing |"
+    yield "| `--space-md` | `16px` / `1rem` | Standard padding |"
+    yield "| `--space-lg` | `24px` / `1.5rem` | Section padding |"
+    yield "| `--space-xl` | `32px` / `2rem` | Large gaps |"
+    yield "| `--space-2xl` | `48px` / `3rem` | Section margins |"
+    yield "| `--space-3xl` | `64px` / `4rem` | Hero padding |"
+    yield ""
     
     # Shadow Depths
-    lines.append("### Shadow Depths")
-    lines.append("")
-    lines.append("| Level | Value | Usage |")
-    lines.append("|-------|-------|-------|")
-    lines.append("| `--shadow-sm` | `0 1px 2px rgba(0,0,0,0.05)` | Subtle lift |")
-    lines.append("| `--shadow-md` | `0 4px 6px rgba(0,0,0,0.1)` | Cards, buttons |")
-    lines.append("| `--shadow-lg` | `0 10px 15px rgba(0,0,0,0.1)` | Modals, dropdowns |")
-    lines.append("| `--shadow-xl` | `0 20px 25px rgba(0,0,0,0.15)` | Hero images, featured cards |")
-    lines.append("")
+    yield "### Shadow Depths"
+    yield ""
+    yield "| Level | Value | Usage |"
+    yield "|-------|-------|-------|"
+    yield "| `--shadow-sm` | `0 1px 2px rgba(0,0,0,0.05)` | Subtle lift |"
+    yield "| `--shadow-md` | `0 4px 6px rgba(0,0,0,0.1)` | Cards, buttons |"
+    yield "| `--shadow-lg` | `0 10px 15px rgba(0,0,0,0.1)` | Modals, dropdowns |"
+    yield "| `--shadow-xl` | `0 20px 25px rgba(0,0,0,0.15)` | Hero images, featured cards |"
+    yield ""
     
     # Component Specs section
-    lines.append("---")
-    lines.append("")
-    lines.append("## Component Specs")
-    lines.append("")
+    yield "---"
+    yield ""
+    yield "## Component Specs"
+    yield ""
     
     # Buttons
-    lines.append("### Buttons")
-    lines.append("")
-    lines.append("```css")
-    lines.append("/* Primary Button */")
-    lines.append(".btn-primary {")
-    lines.append(f"  background: {colors.get('cta', '#F97316')};")
-    lines.append("  color: white;")
-    lines.append("  padding: 12px 24px;")
-    lines.append("  border-radius: 8px;")
-    lines.append("  font-weight: 600;")
-    lines.append("  transition: all 200ms ease;")
-    lines.append("  cursor: pointer;")
-    lines.append("}")
-    lines.append("")
-    lines.append(".btn-primary:hover {")
-    lines.append("  opacity: 0.9;")
-    lines.append("  transform: translateY(-1px);")
-    lines.append("}")
-    lines.append("")
-    lines.append("/* Secondary Button */")
-    lines.append(".btn-secondary {")
-    lines.append(f"  background: transparent;")
-    lines.append(f"  color: {colors.get('primary', '#2563EB')};")
-    lines.append(f"  border: 2px solid {colors.get('primary', '#2563EB')};")
-    lines.append("  padding: 12px 24px;")
-    lines.append("  border-radius: 8px;")
-    lines.append("  font-weight: 600;")
-    lines.append("  transition: all 200ms ease;")
-    lines.append("  cursor: pointer;")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
+    yield "### Buttons"
+    yield ""
+    yield "```css"
+    yield "/* Primary Button */"
+    yield ".btn-primary {"
+    yield f"  background: {colors.get('cta', '#F97316')};"
+    yield "  color: white;"
+    yield "  padding: 12px 24px;"
+    yield "  border-radius: 8px;"
+    yield "  font-weight: 600;"
+    yield "  transition: all 200ms ease;"
+    yield "  cursor: pointer;"
+    yield "}"
+    yield ""
+    yield ".btn-primary:hover {"
+    yield "  opacity: 0.9;"
+    yield "  transform: translateY(-1px);"
+    yield "}"
+    yield ""
+    yield "/* Secondary Button */"
+    yield ".btn-secondary {"
+    yield f"  background: transparent;"
+    yield f"  color: {colors.get('primary', '#2563EB')};"
+    yield f"  border: 2px solid {colors.get('primary', '#2563EB')};"
+    yield "  padding: 12px 24px;"
+    yield "  border-radius: 8px;"
+    yield "  font-weight: 600;"
+    yield "  transition: all 200ms ease;"
+    yield "  cursor: pointer;"
+    yield "}"
+    yield "```"
+    yield ""
     
     # Cards
-    lines.append("### Cards")
-    lines.append("")
-    lines.append("```css")
-    lines.append(".card {")
-    lines.append(f"  background: {colors.get('background', '#FFFFFF')};")
-    lines.append("  border-radius: 12px;")
-    lines.append("  padding: 24px;")
-    lines.append("  box-shadow: var(--shadow-md);")
-    lines.append("  transition: all 200ms ease;")
-    lines.append("  cursor: pointer;")
-    lines.append("}")
-    lines.append("")
-    lines.append(".card:hover {")
-    lines.append("  box-shadow: var(--shadow-lg);")
-    lines.append("  transform: translateY(-2px);")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
+    yield "### Cards"
+    yield ""
+    yield "```css"
+    yield ".card {"
+    yield f"  background: {colors.get('background', '#FFFFFF')};"
+    yield "  border-radius: 12px;"
+    yield "  padding: 24px;"
+    yield "  box-shadow: var(--shadow-md);"
+    yield "  transition: all 200ms ease;"
+    yield "  cursor: pointer;"
+    yield "}"
+    yield ""
+    yield ".card:hover {"
+    yield "  box-shadow: var(--shadow-lg);"
+    yield "  transform: translateY(-2px);"
+    yield "}"
+    yield "```"
+    yield ""
     
     # Inputs
-    lines.append("### Inputs")
-    lines.append("")
-    lines.append("```css")
-    lines.append(".input {")
-    lines.append("  padding: 12px 16px;")
-    lines.append("  border: 1px solid #E2E8F0;")
-    lines.append("  border-radius: 8px;")
-    lines.append("  font-size: 16px;")
-    lines.append("  transition: border-color 200ms ease;")
-    lines.append("}")
-    lines.append("")
-    lines.append(".input:focus {")
-    lines.append(f"  border-color: {colors.get('primary', '#2563EB')};")
-    lines.append("  outline: none;")
-    lines.append(f"  box-shadow: 0 0 0 3px {colors.get('primary', '#2563EB')}20;")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
+    yield "### Inputs"
+    yield ""
+    yield "```css"
+    yield ".input {"
+    yield "  padding: 12px 16px;"
+    yield "  border: 1px solid #E2E8F0;"
+    yield "  border-radius: 8px;"
+    yield "  font-size: 16px;"
+    yield "  transition: border-color 200ms ease;"
+    yield "}"
+    yield ""
+    yield ".input:focus {"
+    yield f"  border-color: {colors.get('primary', '#2563EB')};"
+    yield "  outline: none;"
+    yield f"  box-shadow: 0 0 0 3px {colors.get('primary', '#2563EB')}20;"
+    yield "}"
+    yield "```"
+    yield ""
     
     # Modals
-    lines.append("### Modals")
-    lines.append("")
-    lines.append("```css")
-    lines.append(".modal-overlay {")
-    lines.append("  background: rgba(0, 0, 0, 0.5);")
-    lines.append("  backdrop-filter: blur(4px);")
-    lines.append("}")
-    lines.append("")
-    lines.append(".modal {")
-    lines.append("  background: white;")
-    lines.append("  border-radius: 16px;")
-    lines.append("  padding: 32px;")
-    lines.append("  box-shadow: var(--shadow-xl);")
-    lines.append("  max-width: 500px;")
-    lines.append("  width: 90%;")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
+    yield "### Modals"
+    yield ""
+    yield "```css"
+    yield ".modal-overlay {"
+    yield "  background: rgba(0, 0, 0, 0.5);"
+    yield "  backdrop-filter: blur(4px);"
+    yield "}"
+    yield ""
+    yield ".modal {"
+    yield "  background: white;"
+    yield "  border-radius: 16px;"
+    yield "  padding: 32px;"
+    yield "  box-shadow: var(--shadow-xl);"
+    yield "  max-width: 500px;"
+    yield "  width: 90%;"
+    yield "}"
+    yield "```"
+    yield ""
     
     # Style section
-    lines.append("---")
-    lines.append("")
-    lines.append("## Style Guidelines")
-    lines.append("")
-    lines.append(f"**Style:** {style.get('name', 'Minimalism')}")
-    lines.append("")
+    yield "---"
+    yield ""
+    yield "## Style Guidelines"
+    yield ""
+    yield f"**Style:** {style.get('name', 'Minimalism')}"
+    yield ""
     if style.get("keywords"):
-        lines.append(f"**Keywords:** {style.get('keywords', '')}")
-        lines.append("")
+        yield f"**Keywords:** {style.get('keywords', '')}"
+        yield ""
     if style.get("best_for"):
-        lines.append(f"**Best For:** {style.get('best_for', '')}")
-        lines.append("")
+        yield f"**Best For:** {style.get('best_for', '')}"
+        yield ""
     if effects:
-        lines.append(f"**Key Effects:** {effects}")
-        lines.append("")
+        yield f"**Key Effects:** {effects}"
+        yield ""
+    if style.get("perf_budget"):
+        yield f"**Performance Budget:** {style['perf_budget']}"
+        yield ""
+        if style.get("cost"):
+            yield f"- **Style Cost:** {format_cost(style['cost'])}"
+        if style.get("performance"):
+            yield f"- **Performance Rating:** {style['performance']}"
+        yield f"- **Effect Budget:** {style.get('effect_budget', '')}"
+        yield ""
     
     # Layout Pattern
-    lines.append("### Page Pattern")
-    lines.append("")
-    lines.append(f"**Pattern Name:** {pattern.get('name', '')}")
-    lines.append("")
+    yield "### Page Pattern"
+    yield ""
+    yield f"**Pattern Name:** {pattern.get('name', '')}"
+    yield ""
     if pattern.get('conversion'):
-        lines.append(f"- **Conversion Strategy:** {pattern.get('conversion', '')}")
+        yield f"- **Conversion Strategy:** {pattern.get('conversion', '')}"
     if pattern.get('cta_placement'):
-        lines.append(f"- **CTA Placement:** {pattern.get('cta_placement', '')}")
-    lines.append(f"- **Section Order:** {pattern.get('sections', '')}")
-    lines.append("")
+        yield f"- **CTA Placement:** {pattern.get('cta_placement', '')}"
+    yield f"- **Section Order:** {pattern.get('sections', '')}"
+    yield ""
     
     # Anti-Patterns section
-    lines.append("---")
-    lines.append("")
-    lines.append("## Anti-Patterns (Do NOT Use)")
-    lines.append("")
+    yield "---"
+    yield ""
+    yield "## Anti-Patterns (Do NOT Use)"
+    yield ""
     if anti_patterns:
         anti_list = [a.strip() for a in anti_patterns.split("+")]
         for anti in anti_list:
             if anti:
-                lines.append(f"- ❌ {anti}")
-    lines.append("")
-    lines.append("### Additional Forbidden Patterns")
-    lines.append("")
-    lines.append("- ❌ **Emojis as icons** — Use SVG icons (Heroicons, Lucide, Simple Icons)")
-    lines.append("- ❌ **Missing cursor:pointer** — All clickable elements must have cursor:pointer")
-    lines.append("- ❌ **Layout-shifting hovers** — Avoid scale transforms that shift layout")
-    lines.append("- ❌ **Low contrast text** — Maintain 4.5:1 minimum contrast ratio")
-    lines.append("- ❌ **Instant state changes** — Always use transitions (150-300ms)")
-    lines.append("- ❌ **Invisible focus states** — Focus states must be visible for a11y")
-    lines.append("")
+                yield f"- ❌ {anti}"
+    yield ""
+    yield "### Additional Forbidden Patterns"
+    yield ""
+    yield "- ❌ **Emojis as icons** — Use SVG icons (Heroicons, Lucide, Simple Icons)"
+    yield "- ❌ **Missing cursor:pointer** — All clickable elements must have cursor:pointer"
+    yield "- ❌ **Layout-shifting hovers** — Avoid scale transforms that shift layout"
+    yield "- ❌ **Low contrast text** — Maintain 4.5:1 minimum contrast ratio"
+    yield "- ❌ **Instant state changes** — Always use transitions (150-300ms)"
+    yield "- ❌ **Invisible focus states** — Focus states must be visible for a11y"
+    yield ""
     
     # Pre-Delivery Checklist
-    lines.append("---")
-    lines.append("")
-    lines.append("## Pre-Delivery Checklist")
-    lines.append("")
-    lines.append("Before delivering any UI code, verify:")
-    lines.append("")
-    lines.append("- [ ] No emojis used as icons (use SVG instead)")
-    lines.append("- [ ] All icons from consistent icon set (Heroicons/Lucide)")
-    lines.append("- [ ] `cursor-pointer` on all clickable elements")
-    lines.append("- [ ] Hover states with smooth transitions (150-300ms)")
-    lines.append("- [ ] Light mode: text contrast 4.5:1 minimum")
-    lines.append("- [ ] Focus states visible for keyboard navigation")
-    lines.append("- [ ] `prefers-reduced-motion` respected")
-    lines.append("- [ ] Responsive: 375px, 768px, 1024px, 1440px")
-    lines.append("- [ ] No content hidden behind fixed navbars")
-    lines.append("- [ ] No horizontal scroll on mobile")
-    lines.append("")
-    
-    return "\n".join(lines)
+    yield "---"
+    yield ""
+    yield "## Pre-Delivery Checklist"
+    yield ""
+    yield "Before delivering any UI code, verify:"
+    yield ""
+    yield "- [ ] No emojis used as icons (use SVG instead)"
+    yield "- [ ] All icons from consistent icon set (Heroicons/Lucide)"
+    yield "- [ ] `cursor-pointer` on all clickable elements"
+    yield "- [ ] Hover states with smooth transitions (150-300ms)"
+    yield "- [ ] Light mode: text contrast 4.5:1 minimum"
+    yield "- [ ] Focus states visible for keyboard navigation"
+    yield "- [ ] `prefers-reduced-motion` respected"
+    yield "- [ ] Responsive: 375px, 768px, 1024px, 1440px"
+    yield "- [ ] No content hidden behind fixed navbars"
+    yield "- [ ] No horizontal scroll on mobile"
+    yield ""
+
+
+def format_master_md(design_system: dict) -> str:
+    """Format design system as MASTER.md with hierarchical override logic."""
+    return "\n".join(iter_master_md(design_system))
 
 
-def format_page_override_md(design_system: dict, page_name: str, page_query: str = None) -> str:
+def format_page_override_md(design_system: dict, page_name: str, page_query: str = None,
+                            session: SearchSession = None, engine: str = None) -> str:
     """Format a page-specific override file with intelligent AI-generated content."""
     project = design_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
     
     # Detect page type and generate intelligent overrides
-    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system)
+    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system, session, engine)
     
     lines = []
     
@@ -911,23 +1465,25 @@ def format_page_override_md(design_system: dict, page_name: str, page_query: str
     return "\n".join(lines)
 
 
-def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict) -> dict:
+def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict,
+                                    session: SearchSession = None, engine: str = None) -> dict:
     """
     Generate intelligent overrides based on page type using layered search.
     
     Uses the existing search infrastructure to find relevant style, UX, and layout
     data instead of hardcoded page types.
     """
-    from core import search
+    session = session or SearchSession()
     
     page_lower = page_name.lower()
     query_lower = (page_query or "").lower()
     combined_context = f"{page_lower} {query_lower}"
     
     # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    style_search = session.search(combined_context, "style", max_results=1, engine=engine,
+                                  perf_budget=design_system.get("style", {}).get("perf_budget"))
+    ux_search = session.search(combined_context, "ux", max_results=3, engine=engine)
+    landing_search = session.search(combined_context, "landing", max_results=1, engine=engine)
     
     # Extract results from search response
     style_results = style_search.get("results", [])
@@ -935,7 +1491,9 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
     landing_results = landing_search.get("results", [])
     
     # Detect page type from search results or context
-    page_type = _detect_page_type(combined_context, style_results)
+    style_name = style_results[0].get("Style Category", "") if style_results else ""
+    page_type = session.cached(("page_type", combined_context, style_name),
+                               lambda: _detect_page_type(combined_context, style_results))
     
     # Build overrides from search results
     layout = {}
@@ -1059,9 +1617,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate Design System")
     parser.add_argument("query", help="Search query (e.g., 'SaaS dashboard')")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name")
-    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format")
+    parser.add_argument("--format", "-f", choices=OUTPUT_FORMATS, default="ascii", help="Output format")
 
     args = parser.parse_args()
 
-    result = generate_design_system(args.query, args.project_name, args.format)
-    print(result)
+    import sys
+    generate_design_system(args.query, args.project_name, args.format, sink=sys.stdout)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Palette Index - Perceptual nearest-palette search over the hex columns of
+colors.csv ("palettes closest to #2563EB", "cta #F97316") and WCAG contrast
+constraints.
+
+Every hex column is converted to CIELAB (D65) once, when the index is built,
+and stored as a compact float32 array (palettes x roles x L*a*b*) in an
+artifact next to the search indexes. Queries rank palettes by CIE76 ΔE,
+Euclidean distance in Lab, per role. NumPy scores all palettes in one pass
+when installed; otherwise a pure-Python loop gives the same ranking.
+
+The same build precomputes the WCAG 2 contrast ratio of every role pair of
+every palette, and row bitsets of the palettes whose text/background and
+CTA/background pairs reach each WCAG level, so a minimum-contrast constraint
+is a bitset lookup at query time.
+
+Usage:
+    python search.py "#2563EB" --domain color
+    python search.py "cta #F97316 background #FFFFFF" --domain color
+    python search.py "fintech" --domain color --min-contrast AA
+
+    from palette import search_palettes
+    search_palettes("primary #2563EB", max_results=5)
+"""
+
+import re
+from array import array
+from math import isnan, sqrt
+from itertools import combinations
+from pathlib import Path
+
+from core import CSV_CONFIG, DATA_DIR, INDEX_DIR, MAX_RESULTS, DataIndex, get_data_index, index_key
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+
+# ============ CONFIGURATION ============
+# Query role name -> colors.csv column
+ROLES = {
+    "primary": "Primary (Hex)",
+    "secondary": "Secondary (Hex)",
+    "cta": "CTA (Hex)",
+    "background": "Background (Hex)",
+    "text": "Text (Hex)",
+    "border": "Border (Hex)"
+}
+ROLE_ALIASES = {"bg": "background", "accent": "cta", "foreground": "text", "fg": "text"}
+ANY_ROLE = "any"  # a color given without a role matches the closest role of each palette
+
+# Role pairs every palette must pass under a minimum-contrast constraint
+CHECKED_PAIRS = [("text", "background"), ("cta", "background")]
+# WCAG 2 contrast thresholds; names accepted wherever a minimum contrast is
+WCAG_LEVELS = {"AA-large": 3.0, "AA": 4.5, "AAA": 7.0}
+
+# "#2563EB", "#fff", "rgb(37, 99, 235)", optionally prefixed by a role ("cta #F97316", "bg: #fff")
+_ROLE_NAMES = "|".join(list(ROLES) + list(ROLE_ALIASES))
+COLOR_PATTERN = re.compile(
+    r'(?:\b(' + _ROLE_NAMES + r')\b\s*[:=]?\s*)?'
+    r'(?:#([0-9a-f]{6}|[0-9a-f]{3})\b|rgb\(\s*(\d{1,3})\s*,\s*(\d{1,3})\s*,\s*(\d{1,3})\s*\))',
+    re.IGNORECASE
+)
+
+
+# ============ COLOR SCIENCE ============
+def parse_hex(value):
+    """(r, g, b) in 0..255 from "#RRGGBB" or "#RGB", None if not a hex color"""
+    value = str(value).strip().lstrip("#")
+    if len(value) == 3:
+        value = "".join(c * 2 for c in value)
+    if len(value) != 6:
+        return None
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+
+def to_hex(rgb):
+    return "#" + "".join(f"{c:02X}" for c in rgb)
+
+
+def _linear(channel):
+    """sRGB companding removed, 0..1"""
+    c = channel / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def rgb_to_lab(rgb):
+    """CIELAB (D65 white) of an sRGB color"""
+    r, g, b = (_linear(c) for c in rgb)
+    xyz = (
+        (0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / 0.95047,
+        (0.2126729 * r + 0.7151522 * g + 0.0721750 * b) / 1.00000,
+        (0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / 1.08883
+    )
+    fx, fy, fz = (t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116 for t in xyz)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def relative_luminance(rgb):
+    """WCAG 2 relative luminance of an sRGB color"""
+    r, g, b = (_linear(c) for c in rgb)
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def contrast_ratio(luminance1, luminance2):
+    """WCAG 2 contrast ratio of two relative luminances, 1..21"""
+    lighter, darker = max(luminance1, luminance2), min(luminance1, luminance2)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def pair_ratios(colors, pairs=CHECKED_PAIRS):
+    """WCAG contrast ratio of each role pair of {role: rgb or None} colors, NaN where a color is missing"""
+    luminance = {role: relative_luminance(rgb) for role, rgb in colors.items() if rgb}
+    return [contrast_ratio(luminance[a], luminance[b]) if a in luminance and b in luminance else float("nan")
+            for a, b in pairs]
+
+
+def _display_ratios(pairs, ratios):
+    """{"text/background": ratio, ...} rounded for display, None for a missing color"""
+    return {f"{a}/{b}": None if isnan(ratio) else round(ratio, 2) for (a, b), ratio in zip(pairs, ratios)}
+
+
+def hex_contrast(colors, pairs=CHECKED_PAIRS):
+    """pair_contrast() of {role: "#RRGGBB"} colors that need not be a palette of colors.csv"""
+    roles = {role for pair in pairs for role in pair}
+    return _display_ratios(pairs, pair_ratios({role: parse_hex(colors.get(role, "")) for role in roles}, pairs))
+
+
+def parse_min_contrast(value):
+    """Minimum contrast ratio from a number or a WCAG level name ("AA", "AAA", "AA-large")"""
+    for name, ratio in WCAG_LEVELS.items():
+        if str(value).strip().lower() == name.lower():
+            return ratio
+    ratio = float(value)
+    if not 1 <= ratio <= 21:
+        raise ValueError(f"Contrast ratio must be between 1 and 21, got {value}")
+    return ratio
+
+
+def delta_e(lab1, lab2):
+    """CIE76 color difference; about 2.3 is a just-noticeable difference"""
+    return sqrt(sum((a - b) ** 2 for a, b in zip(lab1, lab2)))
+
+
+def parse_colors(query):
+    """[(role, rgb)] for every color mentioned in a query; role is ANY_ROLE when not given"""
+    colors = []
+    for role, hex_value, r, g, b in COLOR_PATTERN.findall(query):
+        rgb = parse_hex(hex_value) if hex_value else tuple(min(int(c), 255) for c in (r, g, b))
+        role = role.lower()
+        colors.append((ROLE_ALIASES.get(role, role) or ANY_ROLE, rgb))
+    return colors
+
+
+# ============ INDEX ============
+class PaletteIndex(DataIndex):
+    """Lab values of every palette role, built once per version of colors.csv (and its overlays)."""
+
+    def __init__(self, filepath=None, index_dir=None):
+        self.filepath = Path(filepath or DATA_DIR / CSV_CONFIG["color"]["file"])
+        self.index_dir = Path(index_dir or INDEX_DIR)
+        self.roles = list(ROLES)
+        self.pairs = list(combinations(self.roles, 2))
+        self.rows = []
+        self.lab = array('f')       # N x roles x 3, row-major; NaN where a role has no valid hex
+        self.contrast = array('f')  # N x pairs, WCAG contrast ratio of every role pair
+        self.checked = array('f')   # N, lowest ratio over CHECKED_PAIRS (0 if a color is missing)
+        self.levels = {}            # WCAG_LEVELS ratio -> bitset of palettes passing it
+
+    @property
+    def artifact_path(self):
+        return self.index_dir / f"palette-{index_key(self.filepath, list(ROLES.values()))}.pkl"
+
+    def build(self, rows):
+        """Convert every hex column to Lab and precompute the contrast matrix and level bitsets"""
+        self.rows = rows
+        self.lab = array('f')
+        self.contrast = array('f')
+        self.checked = array('f')
+        checked = [self._pair_index(a, b) for a, b in CHECKED_PAIRS]
+        for row in rows:
+            colors = {role: parse_hex(row.get(ROLES[role], "")) for role in self.roles}
+            for rgb in colors.values():
+                self.lab.extend(rgb_to_lab(rgb) if rgb else (float("nan"),) * 3)
+            ratios = pair_ratios(colors, self.pairs)
+            self.contrast.extend(ratios)
+            self.checked.append(min((0.0 if isnan(ratios[i]) else ratios[i] for i in checked), default=0.0))
+        self.levels = {ratio: self._mask(ratio) for ratio in WCAG_LEVELS.values()}
+
+    def _pair_index(self, a, b):
+        """Column of a role pair in the contrast matrix, in either order"""
+        return self.pairs.index((a, b) if (a, b) in self.pairs else (b, a))
+
+    def _mask(self, min_contrast):
+        """Bitset of palettes whose checked pairs all reach min_contrast"""
+        mask = 0
+        for i, ratio in enumerate(self.checked):
+            if ratio >= min_contrast:
+                mask |= 1 << i
+        return mask
+
+    def contrast_mask(self, min_contrast):
+        """Candidate bitset for a minimum contrast: a precomputed WCAG level, else one pass over the stored ratios"""
+        mask = self.levels.get(min_contrast)
+        return self._mask(min_contrast) if mask is None else mask
+
+    def pair_contrast(self, idx, pairs=CHECKED_PAIRS):
+        """{"text/background": ratio, ...} of one palette, rounded for display"""
+        width = len(self.pairs)
+        row = self.contrast[idx * width:(idx + 1) * width]
+        return _display_ratios(pairs, [row[self._pair_index(a, b)] for a, b in pairs])
+
+    def strongest(self, min_contrast):
+        """Index of the palette with the highest checked contrast, if it reaches min_contrast"""
+        best = max(range(len(self.checked)), key=lambda i: self.checked[i], default=None)
+        return best if best is not None and self.checked[best] >= min_contrast else None
+
+    def _state(self):
+        """The Lab array, contrast matrix and rows stored in the artifact"""
+        return {"roles": self.roles, "rows": self.rows, "lab": self.lab, "contrast": self.contrast,
+                "checked": self.checked, "levels": self.levels}
+
+    def _restore(self, artifact):
+        """Inverse of _state(), returns False if the artifact has other roles or no contrast matrix"""
+        if artifact.get("roles") != self.roles or "contrast" not in artifact:
+            return False
+        self.rows, self.lab = artifact["rows"], artifact["lab"]
+        self.contrast, self.checked, self.levels = artifact["contrast"], artifact["checked"], artifact["levels"]
+        return True
+
+    def distances(self, targets):
+        """Mean ΔE of every palette to [(role, lab)] targets: ([total], [[(ΔE, matched role) per target]])"""
+        n, width = len(self.rows), len(self.roles) * 3
+        if not targets or not n:
+            return [], []
+        if np is not None:
+            lab = np.frombuffer(self.lab, dtype=np.float32).reshape(n, len(self.roles), 3)
+            scores, matched = [], []
+            for role, target in targets:
+                diff = np.sqrt(((lab - np.asarray(target, dtype=np.float32)) ** 2).sum(axis=2))
+                diff = np.where(np.isnan(diff), np.inf, diff)
+                column = diff.argmin(axis=1) if role == ANY_ROLE else np.full(n, self.roles.index(role))
+                scores.append(diff[np.arange(n), column])
+                matched.append(column)
+            scores, matched = np.stack(scores, axis=1), np.stack(matched, axis=1)
+            details = [[(score, self.roles[j]) for score, j in zip(row, cols)]
+                       for row, cols in zip(scores.tolist(), matched.tolist())]
+            return scores.mean(axis=1).tolist(), details
+
+        totals, details = [], []
+        for i in range(n):
+            row = self.lab[i * width:(i + 1) * width]
+            labs = [row[j:j + 3] for j in range(0, width, 3)]
+            scores = []
+            for role, target in targets:
+                candidates = range(len(labs)) if role == ANY_ROLE else [self.roles.index(role)]
+                scores.append(min(((delta_e(labs[j], target), self.roles[j]) for j in candidates if not isnan(labs[j][0])),
+                                  default=(float("inf"), role)))
+            totals.append(sum(score for score, _ in scores) / len(scores))
+            details.append(scores)
+        return totals, details
+
+    def nearest(self, targets, k=MAX_RESULTS, candidates=None):
+        """Top-k [(idx, mean ΔE, [(ΔE, matched role) per target])] for [(role, lab)] targets, closest first.
+
+        candidates is an optional bitset of the palettes allowed (see contrast_mask).
+        """
+        totals, details = self.distances(targets)
+        ranked = sorted((i for i, total in enumerate(totals)
+                         if total != float("inf") and (candidates is None or candidates >> i & 1)),
+                        key=lambda i: totals[i])
+        return [(i, totals[i], details[i]) for i in ranked[:k]]
+
+    def stats(self):
+        return {
+            "palettes": len(self.rows),
+            "roles": self.roles,
+            "lab_bytes": len(self.lab) * 4,
+            "contrast_pairs": len(self.pairs),
+            "contrast_bytes": (len(self.contrast) + len(self.checked)) * 4,
+            "wcag_levels": {name: bin(self.levels.get(ratio, 0)).count("1") for name, ratio in WCAG_LEVELS.items()},
+            "backend": "numpy" if np is not None else "python"
+        }
+
+
+def get_palette_index(filepath=None, index_dir=None):
+    """The palette index of colors.csv: a current artifact if present, else built once per process"""
+    return get_data_index(PaletteIndex, filepath, index_dir)
+
+
+def build_palette_index(index_dir=None):
+    """Build and save the palette artifact (deploy time), returns the index"""
+    return PaletteIndex.build_artifact(index_dir)
+
+
+# ============ SEARCH ============
+def search_palettes(query, max_results=MAX_RESULTS, min_contrast=None, offset=None, candidates=None):
+    """Palettes closest to the colors in a query, in the payload shape of core.search().
+
+    min_contrast restricts results to palettes whose text/background and
+    CTA/background ratios reach it, candidates (a facet bitset over the rows
+    of colors.csv and its overlays) to those palettes. offset pages through
+    the ranking and adds "offset", "next_offset" and "total"; the ΔE ranking
+    is one pass over the Lab array, so every page recomputes it.
+    """
+    config = CSV_CONFIG["color"]
+    colors = parse_colors(query)
+    if not colors:
+        return {"error": "No color in query (use #RRGGBB, #RGB or rgb(r, g, b), optionally after a role)",
+                "domain": "color"}
+
+    index = get_palette_index()
+    targets = [(role, rgb_to_lab(rgb)) for role, rgb in colors]
+    if min_contrast is not None:
+        mask = index.contrast_mask(min_contrast)
+        candidates = mask if candidates is None else candidates & mask
+    start = max(offset or 0, 0)
+    ranked = index.nearest(targets, None if offset is not None else max_results, candidates)
+    results = []
+    for idx, total, details in ranked[start:start + max_results]:
+        row = index.rows[idx]
+        result = {col: row.get(col, "") for col in config["output_cols"] if col in row}
+        matched = ", ".join(f"{role} {to_hex(rgb)} {score:.1f}" for (_, rgb), (score, role) in zip(colors, details))
+        result["ΔE"] = f"{total:.1f} ({matched})"
+        if min_contrast is not None:
+            result["Contrast"] = format_contrast(index.pair_contrast(idx))
+        results.append(result)
+
+    result = {
+        "domain": "color",
+        "query": query,
+        "file": config["file"],
+        "mode": "nearest color (CIE76 ΔE)",
+        "colors": [{"role": role, "hex": to_hex(rgb)} for role, rgb in colors],
+        **({"min_contrast": min_contrast} if min_contrast is not None else {}),
+        "count": len(results),
+        "results": results
+    }
+    if offset is not None:
+        end = start + max_results
+        result.update({"offset": start, "next_offset": end if end < len(ranked) else None, "total": len(ranked)})
+    return result
+
+
+def format_contrast(ratios):
+    """Display form of pair_contrast(): text/background 12.6:1, cta/background 4.8:1"""
+    return ", ".join(f"{pair} {'n/a' if ratio is None else f'{ratio}:1'}" for pair, ratio in ratios.items())
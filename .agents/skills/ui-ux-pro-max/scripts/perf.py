@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Style Cost Index - Runtime cost of every style in styles.csv, parsed from its
+Performance, Complexity and Effects & Animation columns, and performance
+budgets (strict / balanced / rich) that constrain and re-rank styles.
+
+The free-text columns are parsed into scores once, when the index is built,
+and stored next to the search indexes with a row bitset of the styles each
+budget allows, so a budget is a bitset lookup at query time.
+
+Usage:
+    python search.py "mobile banking" --domain style --perf-budget strict
+    python search.py "fintech app" --design-system --perf-budget balanced
+
+    from perf import get_style_cost_index
+    get_style_cost_index().budget_mask("strict")
+"""
+
+import re
+from array import array
+from pathlib import Path
+
+from core import CSV_CONFIG, DATA_DIR, INDEX_DIR, DataIndex, get_data_index, index_key
+
+
+# ============ CONFIGURATION ============
+COST_COLUMNS = ["Style Category", "Performance", "Complexity", "Effects & Animation"]
+
+# Performance rating word -> score (0 best); checked longest first so "Moderate-Poor" wins over "Poor"
+PERFORMANCE_SCORES = {"excellent": 0.0, "good": 1.0, "moderate-poor": 2.5, "moderate": 2.0, "poor": 3.0}
+CAVEAT_MARK = "⚠"       # "⚠ Good" is good with a cost caveat
+CAVEAT_PENALTY = 0.5
+COMPLEXITY_SCORES = {"low": 0.0, "medium": 1.0, "high": 2.0}
+
+# Effect phrases -> weight; clauses starting with "no " ("No motion blur") are skipped
+HEAVY_EFFECTS = [
+    (re.compile(r"webgl|three\.js|\b3d\b|canvas|\bar\b|orbit"), 3.0),
+    (re.compile(r"backdrop|blur"), 2.0),
+    (re.compile(r"parallax"), 2.0),
+    (re.compile(r"video|\bgif"), 2.0),
+    (re.compile(r"morph|physics|generative|fluid"), 2.0),
+    (re.compile(r"scroll.?trigger|scroll anim|scroll reveal|reveal on scroll"), 1.0),
+    (re.compile(r"glitch|flicker|jitter|blink|marquee"), 1.0),
+    (re.compile(r"glow|filter|blend"), 1.0),
+    (re.compile(r"anim|keyframes"), 0.5)
+]
+
+# Budget -> limits on each score (None = unlimited), re-rank weight per cost
+# point, and the effect budget recommended to the implementer
+PERF_BUDGETS = {
+    "strict": {
+        "max_performance": 1.0, "max_complexity": 1.0, "max_effects": 3.0, "rerank": 0.5,
+        "effects": "Transitions on transform/opacity only (150-250ms); no blur, parallax, video or WebGL; "
+                   "honor prefers-reduced-motion"
+    },
+    "balanced": {
+        "max_performance": 2.0, "max_complexity": 2.0, "max_effects": 6.0, "rerank": 0.25,
+        "effects": "At most two animated effects per view (<=400ms); backdrop-filter only on small fixed surfaces; "
+                   "lazy-load media below the fold"
+    },
+    "rich": {
+        "max_performance": None, "max_complexity": None, "max_effects": None, "rerank": 0.0,
+        "effects": "Heavy effects allowed; initialize WebGL/video lazily, keep one such surface per page "
+                   "and provide a reduced-motion fallback"
+    }
+}
+
+
+# ============ PARSING ============
+def parse_performance(value):
+    """Score of a Performance cell ("⚡ Excellent" 0 ... "❌ Poor" 3), None if unrecognized"""
+    text = (value or "").lower()
+    for word in sorted(PERFORMANCE_SCORES, key=len, reverse=True):
+        if word in text:
+            score = PERFORMANCE_SCORES[word]
+            return score + CAVEAT_PENALTY if CAVEAT_MARK in (value or "") and score < 2 else score
+    return None
+
+
+def parse_complexity(value):
+    """Score of a Complexity cell (Low 0, Medium 1, High 2), None if unrecognized"""
+    return COMPLEXITY_SCORES.get((value or "").strip().lower())
+
+
+def effects_weight(value):
+    """Summed weight of the heavy effects an Effects & Animation cell lists"""
+    weight = 0.0
+    for clause in (value or "").lower().split(","):
+        clause = clause.strip()
+        if clause.startswith("no "):
+            continue
+        weight += sum(w for pattern, w in HEAVY_EFFECTS if pattern.search(clause))
+    return weight
+
+
+def style_cost(row):
+    """{"performance", "complexity", "effects", "cost"} of a styles.csv row; unknown ratings count as average"""
+    performance = parse_performance(row.get("Performance", ""))
+    complexity = parse_complexity(row.get("Complexity", ""))
+    performance = PERFORMANCE_SCORES["good"] if performance is None else performance
+    complexity = COMPLEXITY_SCORES["medium"] if complexity is None else complexity
+    effects = effects_weight(row.get("Effects & Animation", ""))
+    return {"performance": performance, "complexity": complexity, "effects": effects,
+            "cost": round(2 * performance + complexity + effects / 2, 2)}
+
+
+def fits_budget(cost, budget):
+    """Whether a style_cost() stays within every limit of a PERF_BUDGETS entry"""
+    limits = PERF_BUDGETS[budget]
+    return all(limits[f"max_{score}"] is None or cost[score] <= limits[f"max_{score}"]
+               for score in ("performance", "complexity", "effects"))
+
+
+# ============ INDEX ============
+class StyleCostIndex(DataIndex):
+    """Parsed cost scores of every style, built once per version of styles.csv (and its overlays)."""
+
+    def __init__(self, filepath=None, index_dir=None):
+        self.filepath = Path(filepath or DATA_DIR / CSV_CONFIG["style"]["file"])
+        self.index_dir = Path(index_dir or INDEX_DIR)
+        self.rows = []
+        self.scores = array('f')   # N x (performance, complexity, effects, cost), row-major
+        self.names = {}            # lowercased Style Category -> row
+        self.budgets = {}          # PERF_BUDGETS name -> bitset of styles within it
+
+    @property
+    def artifact_path(self):
+        return self.index_dir / f"style-cost-{index_key(self.filepath, COST_COLUMNS)}.pkl"
+
+    def build(self, rows):
+        """Parse every style's cost columns and precompute the budget bitsets"""
+        self.rows = rows
+        self.scores = array('f')
+        self.names = {}
+        self.budgets = {budget: 0 for budget in PERF_BUDGETS}
+        for i, row in enumerate(rows):
+            cost = style_cost(row)
+            self.scores.extend((cost["performance"], cost["complexity"], cost["effects"], cost["cost"]))
+            self.names.setdefault(row.get("Style Category", "").strip().lower(), i)
+            for budget in PERF_BUDGETS:
+                if fits_budget(cost, budget):
+                    self.budgets[budget] |= 1 << i
+
+    def budget_mask(self, budget):
+        """Candidate bitset of the styles a budget allows"""
+        return self.budgets[budget]
+
+    def cost(self, idx):
+        """{"performance", "complexity", "effects", "cost"} of one style"""
+        performance, complexity, effects, cost = self.scores[idx * 4:(idx + 1) * 4]
+        return {"performance": performance, "complexity": complexity, "effects": effects, "cost": round(cost, 2)}
+
+    def cost_of(self, row):
+        """cost() of a search result row, looked up by style name; None for an unknown style"""
+        idx = self.names.get(row.get("Style Category", "").strip().lower())
+        return None if idx is None else self.cost(idx)
+
+    def cheapest(self, budget):
+        """Index of the lowest-cost style within a budget, None if none fits"""
+        allowed = [i for i in range(len(self.rows)) if self.budgets[budget] >> i & 1]
+        return min(allowed, key=lambda i: self.scores[i * 4 + 3], default=None)
+
+    def _state(self):
+        """The scores, budget bitsets and rows stored in the artifact"""
+        return {"budgets_config": PERF_BUDGETS, "rows": self.rows, "scores": self.scores, "names": self.names,
+                "budgets": self.budgets}
+
+    def _restore(self, artifact):
+        """Inverse of _state(), returns False if the artifact was built for other budgets"""
+        if artifact.get("budgets_config") != PERF_BUDGETS:
+            return False
+        self.rows, self.scores = artifact["rows"], artifact["scores"]
+        self.names, self.budgets = artifact["names"], artifact["budgets"]
+        return True
+
+    def stats(self):
+        return {
+            "styles": len(self.rows),
+            "score_bytes": len(self.scores) * 4,
+            "budgets": {budget: bin(mask).count("1") for budget, mask in self.budgets.items()}
+        }
+
+
+def get_style_cost_index(filepath=None, index_dir=None):
+    """The cost index of styles.csv: a current artifact if present, else built once per process"""
+    return get_data_index(StyleCostIndex, filepath, index_dir)
+
+
+def build_style_cost_index(index_dir=None):
+    """Build and save the style cost artifact (deploy time), returns the index"""
+    return StyleCostIndex.build_artifact(index_dir)
+
+
+def format_cost(cost):
+    """'3.5 (performance 1/3, complexity 1/2, effects 3)' for display"""
+    return (f"{cost['cost']:g} (performance {cost['performance']:g}/3, "
+            f"complexity {cost['complexity']:g}/2, effects {cost['effects']:g})")
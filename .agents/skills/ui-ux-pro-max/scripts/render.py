@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming Renderers - Write search results and design systems incrementally
+to any file-like sink instead of building the whole output in memory.
+
+Usage:
+    from render import iter_json, write_lines
+    write_lines(iter_json(result), sys.stdout)
+
+    from render import fit_budget
+    result = fit_budget(result, 800)  # best results and fields within ~800 tokens
+"""
+
+import json
+import re
+import struct
+
+
+# ============ SINKS ============
+def write_lines(lines, sink):
+    """Write lines to a file-like sink as they are produced."""
+    for line in lines:
+        sink.write(line)
+        sink.write("\n")
+
+
+# ============ JSON / JSONL ============
+def iter_json(value, indent: int = 2, _level: int = 0, _prefix: str = "", _suffix: str = ""):
+    """Yield the lines of json.dumps(value, indent=indent, ensure_ascii=False) one at a time."""
+    pad = " " * (indent * _level)
+    inner = " " * (indent * (_level + 1))
+
+    if isinstance(value, dict) and value:
+        yield f"{_prefix}{{"
+        last = len(value) - 1
+        for i, (key, item) in enumerate(value.items()):
+            key_prefix = f"{inner}{json.dumps(str(key), ensure_ascii=False)}: "
+            yield from iter_json(item, indent, _level + 1, key_prefix, "," if i < last else "")
+        yield f"{pad}}}{_suffix}"
+    elif isinstance(value, (list, tuple)) and value:
+        yield f"{_prefix}["
+        last = len(value) - 1
+        for i, item in enumerate(value):
+            yield from iter_json(item, indent, _level + 1, inner, "," if i < last else "")
+        yield f"{pad}]{_suffix}"
+    else:
+        yield f"{_prefix}{json.dumps(value, ensure_ascii=False)}{_suffix}"
+
+
+def iter_jsonl(result: dict, rows_key: str = "results"):
+    """Yield one JSON line with the result metadata, then one line per result row."""
+    yield json.dumps({k: v for k, v in result.items() if k != rows_key}, ensure_ascii=False)
+    for row in result.get(rows_key, []):
+        yield json.dumps(row, ensure_ascii=False)
+
+
+# ============ COMPACT FORMATS ============
+# Machine formats shared by the search and design-system paths
+COMPACT_FORMATS = ["json-min", "columnar", "binary"]
+
+
+def iter_json_min(value):
+    """Yield value as a single line of minified JSON."""
+    yield json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def to_columnar(value):
+    """Replace every list of dicts with {"columns": [...], "rows": [[...], ...]}, recursively."""
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            columns = list(dict.fromkeys(key for item in value for key in item))
+            return {"columns": columns, "rows": [[to_columnar(item.get(col)) for col in columns] for item in value]}
+        return [to_columnar(item) for item in value]
+    return value
+
+
+def _varint(n):
+    """Unsigned LEB128: 7 bits per byte, high bit set on all but the last."""
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return out
+
+
+def _read_varint(data, pos):
+    """Inverse of _varint(), returns (value, next position)."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _encode(value, out):
+    """Append the tagged, length-prefixed encoding of value to a bytearray."""
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+        out += b"I" + struct.pack(">q", value)
+    elif isinstance(value, float):
+        out += b"D" + struct.pack(">d", value)
+    elif isinstance(value, dict):
+        out += b"M" + _varint(len(value))
+        for key, item in value.items():
+            data = str(key).encode("utf-8")
+            out += _varint(len(data)) + data
+            _encode(item, out)
+    elif isinstance(value, (list, tuple)):
+        out += b"L" + _varint(len(value))
+        for item in value:
+            _encode(item, out)
+    else:
+        data = str(value).encode("utf-8")
+        out += b"S" + _varint(len(data)) + data
+
+
+def encode_binary(value) -> bytes:
+    """Encode value as one frame: a 4-byte big-endian length, then the tagged payload.
+
+    Tags: N null, T/F bool, I int64, D float64, S string, L list, M map,
+    each followed by its fixed-size value or a varint length/count.
+    """
+    payload = bytearray()
+    _encode(value, payload)
+    return struct.pack(">I", len(payload)) + bytes(payload)
+
+
+def decode_binary(frame: bytes):
+    """Decode one frame produced by encode_binary()."""
+    (length,) = struct.unpack_from(">I", frame, 0)
+    value, end = _decode(frame, 4)
+    if end != 4 + length:
+        raise ValueError(f"Frame length mismatch: header {length}, payload {end - 4}")
+    return value
+
+
+def _decode(data, pos):
+    """Decode one tagged value at pos, returns (value, next position)."""
+    tag = data[pos:pos + 1]
+    pos += 1
+    if tag == b"N":
+        return None, pos
+    if tag in (b"T", b"F"):
+        return tag == b"T", pos
+    if tag == b"I":
+        return struct.unpack_from(">q", data, pos)[0], pos + 8
+    if tag == b"D":
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    size, pos = _read_varint(data, pos)
+    if tag == b"S":
+        return data[pos:pos + size].decode("utf-8"), pos + size
+    if tag == b"L":
+        items = []
+        for _ in range(size):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == b"M":
+        mapping = {}
+        for _ in range(size):
+            key_size, pos = _read_varint(data, pos)
+            key = data[pos:pos + key_size].decode("utf-8")
+            mapping[key], pos = _decode(data, pos + key_size)
+        return mapping, pos
+    raise ValueError(f"Unknown tag {tag!r} at offset {pos - 1}")
+
+
+def write_binary(value, sink):
+    """Write one encode_binary() frame of the columnar layout to a sink (its byte buffer if it has one)."""
+    frame = encode_binary(to_columnar(value))
+    if hasattr(sink, "buffer"):
+        sink.flush()
+        sink = sink.buffer
+    sink.write(frame)
+    sink.flush()
+
+
+def iter_compact(value, output_format: str):
+    """Yield the lines of a text compact format ("json-min" or "columnar")."""
+    return iter_json_min(to_columnar(value) if output_format == "columnar" else value)
+
+
+# ============ TOKEN BUDGET ============
+# Columns shown only when budget remains after every other field
+LOW_VALUE_COLUMNS = ("Docs URL", "Google Fonts URL", "Code Bad", "Code Example Bad", "CSS Import",
+                     "Tailwind Config", "Import Code", "Implementation Checklist", "Design System Variables")
+# Columns naming a row (first present wins, else the first column), and tags kept alongside it
+TITLE_COLUMNS = ("Guideline", "Issue", "Style Category", "Product Type", "Pattern Name", "Font Pairing Name",
+                 "Icon Name", "Data Type")
+TAG_COLUMNS = ("Stack",)
+SNIPPET_TOKENS = 60     # longest value kept for one field
+MIN_SNIPPET_TOKENS = 8  # shorter snippets are not worth their label
+RESULT_OVERHEAD = 4     # "### Result N" line and separators
+
+_PIECES = re.compile(r"\w+|[^\w\s]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: one token per ~6 characters of each word or punctuation run."""
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECES.findall(str(text)))
+
+
+def snippet(value: str, terms: set, max_tokens: int) -> tuple:
+    """Extract the window of at most max_tokens around the first query term match.
+
+    Returns (text, truncated): truncated is True when words were cut off and
+    the text carries "…" marks, which the value itself may also contain.
+    """
+    value = " ".join(str(value).split())
+    if estimate_tokens(value) <= max_tokens:
+        return value, False
+    words = value.split(" ")
+    hits = [i for i, word in enumerate(words) if re.sub(r"[^\w]", "", word).lower() in terms]
+    start = max(hits[0] - 3, 0) if hits else 0
+    kept = []
+    used = 2  # ellipses
+    for word in words[start:]:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    text = " ".join(kept)
+    if start > 0:
+        text = "…" + text
+    if start + len(kept) < len(words):
+        text += "…"
+    return text, True
+
+
+def fit_budget(result: dict, budget_tokens: int, rows_key: str = "results") -> dict:
+    """Return a copy of a search result whose rows fit an approximate token budget.
+
+    Fields are admitted in value order across all rows (best-ranked first):
+    each row's title, then fields mentioning the query terms, then the rest,
+    then LOW_VALUE_COLUMNS. Long values become snippets around the matched
+    terms. Rows whose title does not fit are dropped.
+    """
+    if "error" in result:
+        return result
+    rows = result.get(rows_key, [])
+    terms = {w for w in re.sub(r"[^\w\s]", " ", result.get("query", "").lower()).split() if len(w) > 2}
+    for expansions in result.get("corrections", {}).values():
+        terms.update(expansions)
+
+    meta = {k: v for k, v in result.items() if k != rows_key}
+    remaining = budget_tokens - estimate_tokens(json.dumps(meta, ensure_ascii=False))
+
+    tiers = ([], [], [], [])
+    for rank, row in enumerate(rows):
+        title = next((key for key in TITLE_COLUMNS if key in row), None)
+        title = title or next((key for key in row if key not in TAG_COLUMNS), None)
+        for position, (key, value) in enumerate(row.items()):
+            if not str(value).strip():
+                continue
+            words = set(re.sub(r"[^\w\s]", " ", str(value).lower()).split())
+            if key == title or key in TAG_COLUMNS:
+                tier = 0
+            elif key in LOW_VALUE_COLUMNS:
+                tier = 3
+            elif terms & words:
+                tier = 1
+            else:
+                tier = 2
+            tiers[tier].append((rank, position, key, value))
+
+    kept = {}
+    for tier, fields in enumerate(tiers):
+        for rank, position, key, value in fields:
+            if tier > 0 and rank not in kept:
+                continue  # title did not fit, the row is dropped
+            available = remaining - estimate_tokens(f"- **{key}:** ")
+            if rank not in kept:
+                available -= RESULT_OVERHEAD
+            text, truncated = snippet(value, terms, min(SNIPPET_TOKENS, available))
+            cost = estimate_tokens(text)
+            if not text or cost > available or (truncated and cost < MIN_SNIPPET_TOKENS):
+                continue
+            if rank not in kept:
+                remaining -= RESULT_OVERHEAD
+            kept.setdefault(rank, {})[position] = (key, text)
+            remaining -= cost + estimate_tokens(f"- **{key}:** ")
+
+    packed = dict(meta)
+    packed[rows_key] = [dict(fields[p] for p in sorted(fields)) for _, fields in sorted(kept.items())]
+    packed["count"] = len(packed[rows_key])
+    packed["budget"] = {
+        "tokens": budget_tokens,
+        "used": budget_tokens - remaining,
+        "dropped_results": len(rows) - len(kept)
+    }
+    return packed
@@ -3,22 +3,33 @@
 """
 UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
+       python search.py "<query>" --stack nextjs,shadcn,html-tailwind [--per-stack]
+       python search.py "<query>" [--domain <domain>] --budget-tokens 500
+       python search.py "<query>" --domain ux --filter Severity=High --filter Platform=Web
+       python search.py "<query>" --domain color --min-contrast AA
+       python search.py "<query>" [--domain <domain>] --offset 10 [--cursor <token>]
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py "<query>" --design-system --persist [-p "Project Name"] --pages "dashboard,checkout:payment"
 
 Domains: style, prompt, color, chart, landing, product, ux, typography
-Stacks: html-tailwind, react, nextjs
+Stacks: html-tailwind, react, nextjs (comma-separate several to search them in one run)
 
 Persistence (Master + Overrides pattern):
   --persist    Save design system to design-system/MASTER.md
   --page       Also create a page-specific override file in design-system/pages/
+  --pages      Create several page override files in one run (page or page:query, comma-separated)
+  --pages-file Same as --pages, read from a file with one "page: query" pair per line
 """
 
 import argparse
 import sys
 import io
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
-from design_system import generate_design_system, persist_design_system
+from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, SearchSession, search, search_stack, available_engines, index_stats
+from design_system import generate_design_system, persist_design_system, parse_pages, load_pages_file, OUTPUT_FORMATS, TEXT_FORMATS
+from palette import WCAG_LEVELS, parse_min_contrast
+from perf import PERF_BUDGETS
+from render import COMPACT_FORMATS, iter_compact, iter_json, iter_jsonl, write_binary, write_lines, fit_budget
 
 # Force UTF-8 for stdout/stderr to handle emojis on Windows (cp1252 default)
 if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
@@ -27,88 +38,195 @@ if sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 
-def format_output(result):
-    """Format results for Claude consumption (token-optimized)"""
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def iter_output(result):
+    """Yield token-optimized result lines for Claude consumption, one at a time"""
     if "error" in result:
-        return f"Error: {result['error']}"
+        yield f"Error: {result['error']}"
+        return
 
-    output = []
     if result.get("stack"):
-        output.append(f"## UI Pro Max Stack Guidelines")
-        output.append(f"**Stack:** {result['stack']} | **Query:** {result['query']}")
+        yield f"## UI Pro Max Stack Guidelines"
+        yield f"**Stack:** {result['stack']} | **Query:** {result['query']}"
+        if result.get("mode"):
+            yield f"**Mode:** {result['mode']}"
     else:
-        output.append(f"## UI Pro Max Search Results")
-        output.append(f"**Domain:** {result['domain']} | **Query:** {result['query']}")
-    output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
+        yield f"## UI Pro Max Search Results"
+        yield f"**Domain:** {result['domain']} | **Query:** {result['query']}"
+        if result.get("mode"):
+            yield f"**Mode:** {result['mode']}"
+    if result.get("filters"):
+        shown = ", ".join(f"{col}={'|'.join([value] if isinstance(value, str) else value)}" for col, value in result["filters"].items())
+        yield f"**Filters:** {shown}"
+    if result.get("min_contrast"):
+        yield f"**Min contrast:** {result['min_contrast']}:1 (text/background, cta/background)"
+    if result.get("perf_budget"):
+        yield f"**Perf budget:** {result['perf_budget']} (performance, complexity, effects)"
+    if result.get("corrections"):
+        fixes = ", ".join(f"{typo} → {' / '.join(terms)}" for typo, terms in result["corrections"].items())
+        yield f"**Corrected:** {fixes}"
+    if result.get("suggestions"):
+        hints = ", ".join(f"{typo} → {' / '.join(terms)}" for typo, terms in result["suggestions"].items())
+        yield f"**Did you mean:** {hints} (not applied)"
+    if result.get("cursor_ignored"):
+        yield "**Cursor:** belongs to another search, ranked afresh"
+    if result.get("cursor"):
+        yield f"**Total:** {result['total']} | **Offset:** {result['offset']} | **Cursor:** {result['cursor']}"
+        if result.get("next_offset") is not None:
+            yield f"**Next page:** --cursor {result['cursor']} --offset {result['next_offset']}"
+    if result.get("budget"):
+        budget = result["budget"]
+        yield f"**Budget:** ~{budget['used']}/{budget['tokens']} tokens | **Dropped:** {budget['dropped_results']} results"
+    yield f"**Source:** {result['file']} | **Found:** {result['count']} results\n"
 
-    for i, row in enumerate(result['results'], 1):
-        output.append(f"### Result {i}")
+    for i, row in enumerate(result['results'], result.get("offset", 0) + 1):
+        yield f"### Result {i}"
         for key, value in row.items():
             value_str = str(value)
-            if len(value_str) > 300:
+            # Budgeted results are already cut to snippets
+            if len(value_str) > 300 and "budget" not in result:
                 value_str = value_str[:300] + "..."
-            output.append(f"- **{key}:** {value_str}")
-        output.append("")
+            yield f"- **{key}:** {value_str}"
+        yield ""
+
+
+def format_output(result):
+    """Format results for Claude consumption (token-optimized)"""
+    return "\n".join(iter_output(result))
 
-    return "\n".join(output)
+
+def iter_result(result, output_format):
+    """Yield a search result rendered as text, JSON, JSONL or compact JSON lines"""
+    if output_format in COMPACT_FORMATS:
+        return iter_compact(result, output_format)
+    if output_format == "json":
+        return iter_json(result)
+    if output_format == "jsonl":
+        return iter_jsonl(result)
+    return iter_output(result)
+
+
+def write_result(result, output_format, sink):
+    """Stream a search result to sink; "binary" writes one length-prefixed frame"""
+    if output_format == "binary":
+        write_binary(result, sink)
+    else:
+        write_lines(iter_result(result, output_format), sink)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
     parser.add_argument("query", help="Search query")
     parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
-    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
+    parser.add_argument("--stack", "-s", type=str, default=None, help="Stack-specific search (html-tailwind, react, nextjs); comma-separate several for a merged search")
+    parser.add_argument("--per-stack", action="store_true", help="With several stacks, return top results per stack instead of one merged top list")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
-    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--engine", "-e", choices=available_engines(), default=None, help="Search engine backend (default: $UIPRO_ENGINE, per-domain config, then bm25)")
+    parser.add_argument("--stats", action="store_true", help="Print index statistics for the domain/stack instead of searching")
+    parser.add_argument("--filter", action="append", default=[], metavar="COLUMN=VALUE", help="Only rank rows whose facet column has this value (repeatable; same column = any of the values)")
+    parser.add_argument("--min-contrast", type=parse_min_contrast, default=None, metavar="RATIO", help=f"Only palettes whose text/background and CTA/background contrast reaches RATIO or a WCAG level ({', '.join(WCAG_LEVELS)}); color domain and --design-system")
+    parser.add_argument("--perf-budget", choices=list(PERF_BUDGETS), default=None, help="Only styles whose parsed Performance, Complexity and effects fit this budget, cheaper ones ranked first in --design-system; style domain and --design-system")
+    parser.add_argument("--offset", type=int, default=None, help="Skip this many ranked results (enables cursor pagination)")
+    parser.add_argument("--cursor", type=str, default=None, help="Cursor token from a previous page; reuses its cached ranking")
+    parser.add_argument("--json", action="store_true", help="Output as JSON (same as --format json)")
+    parser.add_argument("--budget-tokens", type=positive_int, default=None, help="Pack the best results and fields into about N tokens, cutting long values to snippets around the query terms")
     # Design system generation
     parser.add_argument("--design-system", "-ds", action="store_true", help="Generate complete design system recommendation")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name for design system output")
-    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format for design system")
+    parser.add_argument("--format", "-f", choices=OUTPUT_FORMATS, default="ascii", help="Output format (ascii/markdown for design system text; json/jsonl and compact json-min/columnar/binary for both paths)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the design system cache and regenerate from the data")
+    parser.add_argument("--trace", action="store_true", help="Print the search session trace (searches run vs saved) to stderr")
     # Persistence (Master + Overrides pattern)
     parser.add_argument("--persist", action="store_true", help="Save design system to design-system/MASTER.md (creates hierarchical structure)")
     parser.add_argument("--page", type=str, default=None, help="Create page-specific override file in design-system/pages/")
+    parser.add_argument("--pages", type=str, default=None, help="Comma-separated pages (page or page:query) to create override files for in one run")
+    parser.add_argument("--pages-file", type=str, default=None, help="File with one 'page: query' pair per line")
     parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
 
     args = parser.parse_args()
+    output_format = "json" if args.json else args.format
+
+    filters = {}
+    for spec in args.filter:
+        column, sep, value = spec.partition("=")
+        if not sep or not column.strip() or not value.strip():
+            parser.error(f"argument --filter: expected COLUMN=VALUE, got '{spec}'")
+        filters.setdefault(column.strip(), []).append(value.strip())
+
+    stacks = [stack.strip() for stack in args.stack.split(",") if stack.strip()] if args.stack else []
+    for stack in stacks:
+        if stack not in AVAILABLE_STACKS:
+            parser.error(f"argument --stack/-s: invalid choice: '{stack}' (choose from {', '.join(AVAILABLE_STACKS)})")
+
+    pages = []
+    if args.pages:
+        pages.extend(parse_pages(args.pages))
+    if args.pages_file:
+        pages.extend(load_pages_file(args.pages_file))
 
+    # Index statistics
+    if args.stats:
+        for stack in stacks or [None]:
+            write_lines(iter_json(index_stats(args.domain, stack, args.engine)), sys.stdout)
     # Design system takes priority
-    if args.design_system:
-        result = generate_design_system(
+    elif args.design_system:
+        session = SearchSession()
+        generate_design_system(
             args.query, 
             args.project_name, 
-            args.format,
+            output_format,
             persist=args.persist,
             page=args.page,
-            output_dir=args.output_dir
+            output_dir=args.output_dir,
+            pages=pages,
+            use_cache=not args.no_cache,
+            sink=sys.stdout,
+            session=session,
+            min_contrast=args.min_contrast,
+            perf_budget=args.perf_budget,
+            engine=args.engine
         )
-        print(result)
+        if args.trace:
+            trace = session.trace()
+            print(f"[trace] {trace['searches']} searches, {trace['saved']} saved "
+                  f"({trace['result_hits']} repeated, {trace['ranking_hits']} rankings reused), "
+                  f"{trace['rankings']} rankings computed, {trace['row_hits']} rows reused", file=sys.stderr)
         
-        # Print persistence confirmation
+        # Print persistence confirmation, on stderr when stdout carries machine-readable output
         if args.persist:
+            banner = sys.stdout if output_format in TEXT_FORMATS else sys.stderr
             project_slug = args.project_name.lower().replace(' ', '-') if args.project_name else "default"
-            print("\n" + "=" * 60)
-            print(f"✅ Design system persisted to design-system/{project_slug}/")
-            print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)")
-            if args.page:
-                page_filename = args.page.lower().replace(' ', '-')
-                print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)")
-            print("")
-            print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
-            print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
-            print("=" * 60)
+            print("\n" + "=" * 60, file=banner)
+            print(f"✅ Design system persisted to design-system/{project_slug}/", file=banner)
+            print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)", file=banner)
+            page_names = ([args.page] if args.page else []) + [name for name, _ in pages]
+            for page_name in dict.fromkeys(page_names):
+                page_filename = page_name.lower().replace(' ', '-')
+                print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)", file=banner)
+            print(file=banner)
+            print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.", file=banner)
+            print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.", file=banner)
+            print("=" * 60, file=banner)
     # Stack search
-    elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
+    elif stacks:
+        result = search_stack(args.query, stacks, args.max_results, args.offset, args.cursor, args.engine, args.per_stack,
+                              filters or None)
+        if args.budget_tokens is not None:
+            result = fit_budget(result, args.budget_tokens)
+        write_result(result, output_format, sys.stdout)
     # Domain search
     else:
-        result = search(args.query, args.domain, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
+        domain = args.domain or ("color" if args.min_contrast is not None else
+                                 "style" if args.perf_budget is not None else None)
+        result = search(args.query, domain, args.max_results, args.offset, args.cursor, args.engine,
+                        filters=filters or None, min_contrast=args.min_contrast, perf_budget=args.perf_budget)
+        if args.budget_tokens is not None:
+            result = fit_budget(result, args.budget_tokens)
+        write_result(result, output_format, sys.stdout)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hybrid Engine - BM25 fused with a latent-semantic (LSA) layer so that
+conceptually close rows match even without shared words
+("calm wellness" -> "serene spa").
+
+The LSA model is a truncated SVD of each index's TF-IDF matrix, fitted
+offline together with BM25 and stored in the same artifact as compact
+float32 arrays. No network, no model downloads. NumPy is used when
+installed; otherwise a pure-Python subspace iteration computes the same
+decomposition.
+
+Usage:
+    python search.py "<query>" --engine hybrid
+    UIPRO_ENGINE=hybrid python search.py "<query>" --design-system
+"""
+
+import os
+import random
+import time
+from array import array
+from math import log, sqrt
+from operator import mul
+
+from core import BM25Engine, iter_bits, register_engine
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+
+# ============ CONFIGURATION ============
+SEMANTIC_DIMS = 32          # latent dimensions kept from the SVD
+SEMANTIC_WEIGHT = 0.35      # share of the fused score coming from LSA similarity
+MIN_SIMILARITY = 0.35       # cosine below this never lifts a row into the results
+POWER_ITERATIONS = 40       # subspace iterations for the pure-Python SVD
+BUDGET_ENV = "UIPRO_SEMANTIC_BUDGET_MS"
+DEFAULT_BUDGET_MS = 50      # per-query time allowed before LSA is skipped
+
+
+def latency_budget():
+    """Per-query budget in seconds: $UIPRO_SEMANTIC_BUDGET_MS or DEFAULT_BUDGET_MS"""
+    try:
+        return float(os.environ.get(BUDGET_ENV, DEFAULT_BUDGET_MS)) / 1000
+    except ValueError:
+        return DEFAULT_BUDGET_MS / 1000
+
+
+# ============ LINEAR ALGEBRA (PURE PYTHON) ============
+def _dot(a, b):
+    return sum(map(mul, a, b))
+
+
+def _orthonormalize(columns):
+    """Modified Gram-Schmidt over a list of column vectors, dropping degenerate ones"""
+    basis = []
+    for col in columns:
+        col = list(col)
+        for q in basis:
+            proj = _dot(col, q)
+            col = [c - proj * x for c, x in zip(col, q)]
+        norm = sqrt(_dot(col, col))
+        if norm > 1e-10:
+            basis.append([c / norm for c in col])
+    return basis
+
+
+def _top_eigenpairs(gram, k):
+    """Top-k eigenpairs of a symmetric PSD matrix by orthogonal (subspace) iteration"""
+    n = len(gram)
+    rng = random.Random(0)
+    basis = _orthonormalize([[rng.gauss(0, 1) for _ in range(n)] for _ in range(k)])
+    for _ in range(POWER_ITERATIONS):
+        basis = _orthonormalize([[_dot(row, q) for row in gram] for q in basis])
+    pairs = [(_dot(q, [_dot(row, q) for row in gram]), q) for q in basis]
+    return sorted(pairs, key=lambda pair: pair[0], reverse=True)
+
+
+# ============ LSA MODEL ============
+class LSA:
+    """Truncated SVD of a TF-IDF matrix: unit-length row vectors plus term projections."""
+
+    def __init__(self, dims=SEMANTIC_DIMS):
+        self.dims = dims
+        self.k = 0
+        self.idf = {}
+        self.terms = {}                 # term -> row in term_vectors
+        self.doc_vectors = array('f')   # N x k, row-major, unit length
+        self.term_vectors = array('f')  # V x k, row-major (V_k, so q . V_k lands in doc space)
+
+    def _weights(self, tokens):
+        """Sublinear TF-IDF weights of one tokenized document or query"""
+        counts = {}
+        for token in tokens:
+            if token in self.idf:
+                counts[token] = counts.get(token, 0) + 1
+        return {t: (1 + log(c)) * self.idf[t] for t, c in counts.items()}
+
+    def fit(self, corpus, doc_freqs):
+        """Fit from BM25's tokenized corpus and document frequencies"""
+        n = len(corpus)
+        if n < 2:
+            return
+        self.idf = {t: log((1 + n) / (1 + df)) + 1 for t, df in doc_freqs.items()}
+        docs = [self._weights(tokens) for tokens in corpus]
+        vocab = sorted(self.idf)
+        self.terms = {t: i for i, t in enumerate(vocab)}
+
+        if np is not None:
+            matrix = np.zeros((n, len(vocab)))
+            for i, weights in enumerate(docs):
+                for t, w in weights.items():
+                    matrix[i, self.terms[t]] = w
+            u, s, vt = np.linalg.svd(matrix, full_matrices=False)
+            keep = [j for j in range(min(self.dims, len(s))) if s[j] > 1e-8]
+            sigma = [float(s[j]) for j in keep]
+            u_cols = [u[:, j].tolist() for j in keep]
+            v_cols = [vt[j].tolist() for j in keep]
+        else:
+            # A A^T is only N x N (rows per CSV), cheap to decompose without NumPy
+            gram = [[0.0] * n for _ in range(n)]
+            for i in range(n):
+                for j in range(i, n):
+                    a, b = docs[i], docs[j]
+                    if len(a) > len(b):
+                        a, b = b, a
+                    gram[i][j] = gram[j][i] = sum(w * b[t] for t, w in a.items() if t in b)
+            pairs = [(val, q) for val, q in _top_eigenpairs(gram, min(self.dims, n)) if val > 1e-8]
+            sigma = [sqrt(val) for val, _ in pairs]
+            u_cols = [q for _, q in pairs]
+            # V_k = A^T U_k S_k^-1
+            v_cols = []
+            for s_j, u_j in zip(sigma, u_cols):
+                col = [0.0] * len(vocab)
+                for i, weights in enumerate(docs):
+                    if u_j[i]:
+                        for t, w in weights.items():
+                            col[self.terms[t]] += w * u_j[i]
+                v_cols.append([c / s_j for c in col])
+
+        self.k = len(sigma)
+        self.doc_vectors = array('f')
+        for i in range(n):
+            row = [u_cols[j][i] * sigma[j] for j in range(self.k)]
+            norm = sqrt(_dot(row, row)) or 1.0
+            self.doc_vectors.extend(x / norm for x in row)
+        self.term_vectors = array('f')
+        for t in range(len(vocab)):
+            self.term_vectors.extend(v_cols[j][t] for j in range(self.k))
+
+    def project(self, tokens):
+        """Fold a tokenized query into the latent space, returns a unit vector or None"""
+        if not self.k:
+            return None
+        vector = [0.0] * self.k
+        for t, w in self._weights(tokens).items():
+            start = self.terms[t] * self.k
+            for j, x in enumerate(self.term_vectors[start:start + self.k]):
+                vector[j] += w * x
+        norm = sqrt(_dot(vector, vector))
+        return [x / norm for x in vector] if norm > 0 else None
+
+    def similarities(self, vector, deadline=None):
+        """Cosine similarity of every row to a projected query (brute force over the float32 matrix).
+
+        Returns None if the deadline passes before the scan completes.
+        """
+        k = self.k
+        if np is not None:
+            matrix = np.frombuffer(self.doc_vectors, dtype=np.float32).reshape(-1, k)
+            return (matrix @ np.asarray(vector, dtype=np.float32)).tolist()
+        sims = []
+        rows = self.doc_vectors
+        for start in range(0, len(rows), k):
+            if deadline is not None and not (start // k) % 256 and time.perf_counter() > deadline:
+                return None
+            sims.append(_dot(vector, rows[start:start + k]))
+        return sims
+
+
+# ============ ENGINE ============
+class HybridEngine(BM25Engine):
+    """BM25 + LSA, fused per query; see core.BM25Engine for the protocol."""
+
+    name = "hybrid"
+    segmentable = False  # one LSA model spans all rows, so overlays are compacted
+
+    def __init__(self, filepath, search_cols, index_dir=None):
+        super().__init__(filepath, search_cols, index_dir)
+        self.lsa = LSA()
+
+    def build(self, rows):
+        """Fit BM25, then the LSA model over the same tokens"""
+        super().build(rows)
+        self.lsa.fit(self.bm25.corpus, self.bm25.doc_freqs)
+
+    def _state(self):
+        return {**super()._state(), "lsa": self.lsa}
+
+    def _restore(self, artifact):
+        if "lsa" not in artifact or not super()._restore(artifact):
+            return False
+        self.lsa = artifact["lsa"]
+        return True
+
+    def query(self, text, k=None, candidates=None, stats=None):
+        """Return (top-k [(idx, fused score)], corrections).
+
+        The fused score is (1 - w) * normalized BM25 + w * cosine similarity.
+        Rows below MIN_SIMILARITY keep their BM25 share only. If the latency
+        budget is spent before the LSA stage finishes, plain BM25 ranking is
+        returned.
+        """
+        deadline = time.perf_counter() + latency_budget()
+        query_tokens, lexical, corrections, candidates = self._lexical(text, candidates, stats)
+
+        vector = self.lsa.project(query_tokens) if time.perf_counter() < deadline else None
+        sims = self.lsa.similarities(vector, deadline) if vector else None
+        if sims is None:
+            return lexical[:k] if k is not None else lexical, corrections
+
+        top = lexical[0][1] if lexical else 1.0
+        fused = {idx: (1 - SEMANTIC_WEIGHT) * score / top for idx, score in lexical}
+        allowed = None if candidates is None else set(iter_bits(candidates))
+        for idx, sim in enumerate(sims):
+            if sim >= MIN_SIMILARITY and (allowed is None or idx in allowed):
+                fused[idx] = fused.get(idx, 0.0) + SEMANTIC_WEIGHT * sim
+
+        ranked = sorted(fused.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:k] if k is not None else ranked, corrections
+
+    def stats(self):
+        """Index statistics, including the latent model"""
+        return {
+            **super().stats(),
+            "semantic_dims": self.lsa.k,
+            "semantic_bytes": (len(self.lsa.doc_vectors) + len(self.lsa.term_vectors)) * 4,
+            "semantic_backend": "numpy" if np is not None else "python",
+            "semantic_budget_ms": latency_budget() * 1000
+        }
+
+
+register_engine(HybridEngine.name, HybridEngine)
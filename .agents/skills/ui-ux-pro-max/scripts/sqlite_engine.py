@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite FTS5 Engine - Compiles every CSV_CONFIG and STACK_CONFIG data file into
+a single SQLite database and ranks queries with FTS5's native bm25().
+
+Each index gets an FTS5 table over its search columns (one FTS column per
+search column, plus one for synonym expansions), an fts5vocab table for typo
+correction, and a regular table holding the full CSV rows for output. Queries only open the database file.
+
+Usage:
+    python search.py "<query>" --engine sqlite
+    UIPRO_ENGINE=sqlite python search.py "<query>" --design-system
+
+    from sqlite_engine import compile_database
+    compile_database()  # (re)build stale tables in $UIPRO_INDEX_DIR/uipro.sqlite3
+"""
+
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from core import (BM25, COMPACT_DIR, SymSpell, INDEX_DIR, PHRASE_JOINER, PROXIMITY_BOOST, correct_tokens,
+                  expansion_stats, index_fingerprint, index_key, iter_bits, iter_sources, load_synonyms,
+                  parse_phrases, register_engine, source_fingerprint)
+
+
+# ============ CONFIGURATION ============
+DB_NAME = "uipro.sqlite3"
+DB_ENV = "UIPRO_SQLITE_DB"
+BUSY_TIMEOUT = 30  # seconds to wait for a concurrent writer
+EXPANSION_WEIGHT = 0.7  # bm25() weight of the synonym expansion column
+TOKENIZER = f"unicode61 tokenchars '{PHRASE_JOINER}'"
+SCHEMA_VERSION = 2      # bump when the table layout or tokenizer changes so tables are rebuilt
+
+
+def database_path(index_dir=None):
+    """Location of the compiled database: $UIPRO_SQLITE_DB or <index_dir>/uipro.sqlite3"""
+    return Path(os.environ.get(DB_ENV) or Path(index_dir or INDEX_DIR) / DB_NAME)
+
+
+def _table_name(filepath, search_cols):
+    """Table name prefix for one index (index_key is already SQL-safe)"""
+    return "idx_" + index_key(filepath, search_cols)
+
+
+def _quote(text):
+    """FTS5 string literal, so operators in user input are treated as text"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _connect(db_path):
+    """Open the database in autocommit mode with WAL so readers never block each other"""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS sources (
+        name TEXT PRIMARY KEY,
+        file TEXT NOT NULL,
+        search_cols TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        built_at REAL NOT NULL
+    )""")
+    return conn
+
+
+def _fingerprint(filepath, compacted=False):
+    """index_fingerprint() of a data file (with its overlays if compacted), tagged with the table schema version"""
+    fingerprint = source_fingerprint(filepath) if compacted else index_fingerprint(filepath)
+    return f"{fingerprint}/v{SCHEMA_VERSION}"
+
+
+def _is_current(conn, table, fingerprint):
+    """True if the table was compiled from the data version with this _fingerprint()"""
+    row = conn.execute("SELECT fingerprint FROM sources WHERE name = ?", (table,)).fetchone()
+    return row is not None and row[0] == fingerprint
+
+
+def _build_table(conn, table, filepath, search_cols, rows, fingerprint):
+    """(Re)create the FTS5, vocab and rows tables for one index in a single transaction"""
+    fts_cols = ", ".join(f"c{i}" for i in range(len(search_cols) + 1))
+    placeholders = ", ".join("?" for _ in range(len(search_cols) + 2))
+
+    # Alias terms go into the last column, down-weighted in query(); PHRASE_JOINER is
+    # a token character so multi-word alias phrase terms stay one token
+    tokenize, synonyms = BM25().tokenize, load_synonyms()
+    expansions = [
+        " ".join(synonyms.expand(tokenize(" ".join(str(row.get(col, "")) for col in search_cols))))
+        for row in rows
+    ]
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {table}_vocab")
+        conn.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        conn.execute(f"DROP TABLE IF EXISTS {table}_rows")
+        conn.execute(f"CREATE VIRTUAL TABLE {table}_fts USING fts5({fts_cols}, tokenize=\"{TOKENIZER}\")")
+        conn.execute(f"CREATE VIRTUAL TABLE {table}_vocab USING fts5vocab({table}_fts, 'row')")
+        conn.execute(f"CREATE TABLE {table}_rows (idx INTEGER PRIMARY KEY, row TEXT NOT NULL)")
+        conn.executemany(
+            f"INSERT INTO {table}_fts (rowid, {fts_cols}) VALUES ({placeholders})",
+            ([idx] + [str(row.get(col, "")) for col in search_cols] + [expansions[idx]] for idx, row in enumerate(rows))
+        )
+        conn.executemany(
+            f"INSERT INTO {table}_rows (idx, row) VALUES (?, ?)",
+            ((idx, json.dumps(row, ensure_ascii=False)) for idx, row in enumerate(rows))
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)",
+            (table, str(filepath), json.dumps(search_cols), fingerprint, len(rows), time.time())
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return table
+
+
+def compile_database(db_path=None, force=False):
+    """Compile every domain and stack CSV into one database, rebuilding only stale tables.
+
+    Returns one {"name", "table", "rows", "built"} report per data file.
+    """
+    db_path = Path(db_path or database_path())
+    conn = _connect(db_path)
+    report = []
+    try:
+        for name, filepath, search_cols, _ in iter_sources():
+            if not filepath.exists():
+                continue
+            table = _table_name(filepath, search_cols)
+            fingerprint = _fingerprint(filepath)
+            built = force or not _is_current(conn, table, fingerprint)
+            if built:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    _build_table(conn, table, filepath, search_cols, list(csv.DictReader(f)), fingerprint)
+            rows = conn.execute("SELECT rows FROM sources WHERE name = ?", (table,)).fetchone()[0]
+            report.append({"name": name, "table": table, "rows": rows, "built": built})
+    finally:
+        conn.close()
+    return report
+
+
+# ============ ENGINE ============
+class SQLiteEngine:
+    """FTS5-backed engine following the core engine protocol (see core.BM25Engine).
+
+    FTS5 bm25() only sees the statistics of its own table, so scores of
+    separate overlay segments do not compare: overlays are compacted with
+    the bundled file into one table (the engine SegmentedIndex.compact()
+    creates in the compacted index directory).
+    """
+
+    name = "sqlite"
+    segmentable = False  # bm25() scores are table-local, so overlays are compacted
+
+    def __init__(self, filepath, search_cols, index_dir=None):
+        self.filepath = Path(filepath)
+        self.search_cols = list(search_cols)
+        self.db_path = database_path(index_dir)
+        self.compacted = index_dir is not None and Path(index_dir).name == COMPACT_DIR
+        self.table = _table_name(filepath, search_cols) + ("_compacted" if self.compacted else "")
+        self._local = threading.local()
+        self._tokenizer = BM25()
+        self._vocab = None
+        self._speller = None
+
+    def _conn(self):
+        """One connection per thread; SQLite handles concurrent readers"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.db_path)
+        return conn
+
+    @property
+    def artifact_path(self):
+        return self.db_path
+
+    def load(self):
+        """Use the compiled database if it holds a current table for this file"""
+        if not self.db_path.exists():
+            return False
+        return _is_current(self._conn(), self.table, _fingerprint(self.filepath, self.compacted))
+
+    def build(self, rows):
+        """Compile this file's tables into the shared database (compile_database does all files)"""
+        conn = self._conn()
+        fingerprint = _fingerprint(self.filepath, self.compacted)
+        if not _is_current(conn, self.table, fingerprint):
+            _build_table(conn, self.table, self.filepath, self.search_cols, rows, fingerprint)
+
+    def save(self):
+        """Nothing to do: build() writes straight into the database"""
+
+    def _lookup(self, token):
+        """SymSpell suggestions from the FTS5 vocabulary, the speller built on first miss"""
+        if self._speller is None:
+            self._speller = SymSpell()
+            self._speller.build(self._vocab)
+        return self._speller.lookup(token)
+
+    def _correct(self, tokens):
+        """SymSpell correction against the FTS5 vocabulary (see core.correct_tokens), loaded on first use"""
+        if self._vocab is None:
+            rows = self._conn().execute(f"SELECT term, doc FROM {self.table}_vocab").fetchall()
+            self._vocab = {term: doc for term, doc in rows if len(term) > 2}
+        return correct_tokens(tokens, self._vocab, self._lookup)
+
+    def _phrase_words(self, phrase):
+        """Words of a quoted query phrase as FTS5 indexed them, the longer ones spell-corrected"""
+        return [self._correct([word])[0][0] if len(word) > 2 else word
+                for word in re.sub(r'[^\w\s]', ' ', phrase.lower()).split()]
+
+    def query(self, text, k=None, candidates=None):
+        """Return (top-k ranked [(idx, score)] by FTS5 bm25(), corrections).
+
+        Exact phrases become FTS5 phrase queries ANDed to the terms; proximity
+        phrases boost the rows matched by an FTS5 NEAR group (which, unlike
+        the BM25 engine, does not enforce word order).
+        """
+        tokens, corrections = self._correct(self._tokenizer.tokenize(text))
+        tokens += load_synonyms().phrase_terms(tokens)
+        if not tokens or candidates == 0:
+            return [], corrections
+
+        match = " OR ".join(_quote(token) for token in dict.fromkeys(tokens))
+        near = []
+        for phrase, slop in parse_phrases(text):
+            words = self._phrase_words(phrase)
+            if not words:
+                continue
+            if slop is None:
+                match = f"({match}) AND {_quote(' '.join(words))}"
+            else:
+                near.append(f"NEAR({' '.join(map(_quote, words))}, {slop})")
+
+        fts = f"{self.table}_fts"
+        rank = f"bm25({fts}, {', '.join(['1.0'] * len(self.search_cols))}, {EXPANSION_WEIGHT})"
+        # Facet candidates are plain integers, safe to inline
+        within = "" if candidates is None else f" AND rowid IN ({', '.join(map(str, iter_bits(candidates)))})"
+        rows = self._conn().execute(
+            f"SELECT rowid, -{rank} FROM {fts} WHERE {fts} MATCH ?{within} ORDER BY {rank} LIMIT ?",
+            (match, -1 if k is None or near else k)
+        ).fetchall()
+        ranked = [(idx, score) for idx, score in rows if score > 0]
+
+        if near:
+            boosted = {idx for idx, in self._conn().execute(
+                f"SELECT rowid FROM {fts} WHERE {fts} MATCH ?", (" OR ".join(near),)
+            ).fetchall()}
+            ranked = sorted(((idx, score * (1 + PROXIMITY_BOOST) if idx in boosted else score)
+                             for idx, score in ranked), key=lambda x: x[1], reverse=True)
+            ranked = ranked[:k] if k is not None else ranked
+        return ranked, corrections
+
+    def fetch(self, indices):
+        """Return the stored CSV rows for the given indices"""
+        if not indices:
+            return []
+        placeholders = ", ".join("?" for _ in indices)
+        rows = dict(self._conn().execute(
+            f"SELECT idx, row FROM {self.table}_rows WHERE idx IN ({placeholders})", list(indices)
+        ).fetchall())
+        return [json.loads(rows[idx]) for idx in indices]
+
+    def stats(self):
+        """Index statistics"""
+        conn = self._conn()
+        documents = conn.execute(f"SELECT COUNT(*) FROM {self.table}_rows").fetchone()[0]
+        vocabulary = conn.execute(f"SELECT COUNT(*) FROM {self.table}_vocab WHERE length(term) > 2").fetchone()[0]
+        expanded = conn.execute(f"SELECT c{len(self.search_cols)} FROM {self.table}_fts").fetchall()
+        return {
+            "engine": self.name,
+            "documents": documents,
+            "vocabulary": vocabulary,
+            "table": self.table,
+            "database": str(self.db_path),
+            "database_bytes": self.db_path.stat().st_size,
+            **expansion_stats([terms.split() for terms, in expanded])
+        }
+
+
+register_engine(SQLiteEngine.name, SQLiteEngine)
+
+
+# ============ CLI SUPPORT ============
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile all data CSVs into one SQLite FTS5 database")
+    parser.add_argument("--db", type=str, default=None, help=f"Database path (default: ${DB_ENV} or $UIPRO_INDEX_DIR/{DB_NAME})")
+    parser.add_argument("--force", action="store_true", help="Rebuild every table, even if current")
+
+    args = parser.parse_args()
+
+    for entry in compile_database(args.db, args.force):
+        status = "built" if entry["built"] else "current"
+        print(f"{entry['name']:<24} {entry['rows']:>5} rows  {status}")
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Shared setup for the script tests: the scripts directory is importable and
+every cache, index and cursor lives in a throwaway directory.
+
+Run from the scripts directory: python -m pytest -q tests
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Before core is imported: CACHE_DIR, INDEX_DIR and CURSOR_DIR are read at import time
+os.environ["UIPRO_CACHE_DIR"] = tempfile.mkdtemp(prefix="uipro-test-")
+for name in ("UIPRO_INDEX_DIR", "UIPRO_ENGINE", "UIPRO_EXTRA_DATA", "UIPRO_SQLITE_DB"):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
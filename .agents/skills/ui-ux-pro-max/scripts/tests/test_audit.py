@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Static audit: example compilation, findings, suppression and the parallel path"""
+
+import re
+
+import pytest
+
+import audit as audit_module
+from audit import audit, compile_example, iter_report
+
+BAD = '''export function Close() {
+  return <button><XIcon /></button>;
+}
+
+export const Field = () => <input placeholder="Email" />;
+export const Quiet = () => <input placeholder='Name' />; // uipro-ignore
+'''
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "Close.tsx").write_text(BAD, encoding="utf-8")
+    (tmp_path / "src" / "clean.ts").write_text("export const answer = 42;\n", encoding="utf-8")
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "index.js").write_text(BAD, encoding="utf-8")
+    (tmp_path / "src" / "app.min.js").write_text(BAD, encoding="utf-8")
+    (tmp_path / "src" / "image.tsx").write_bytes(b"\0" + BAD.encode("utf-8"))
+    return tmp_path
+
+
+def test_compile_example():
+    regex, literal = compile_example("<input placeholder='Email' />")
+    assert literal == "placeholder="
+    assert re.search(regex, '<input  placeholder="Email"/>')
+    assert re.search(compile_example("<div class='x'>...</div>")[0], '<div className="x">anything</div>')
+    assert compile_example("No padding compensation", prose=True) is None
+    assert compile_example("useState only") is None
+
+
+def test_findings_point_at_the_bad_lines(tree):
+    result = audit(str(tree))
+    assert result["files"] == 3  # dependencies and minified bundles are not listed
+    assert {finding["file"] for finding in result["findings"]} == {"src/Close.tsx"}  # binary files are not scanned
+    found = {(finding["file"], finding["line"], finding["severity"]) for finding in result["findings"]}
+    assert ("src/Close.tsx", 2, "Critical") in found
+    assert ("src/Close.tsx", 5, "Critical") in found
+    assert not any(finding["line"] == 6 for finding in result["findings"])  # uipro-ignore
+    assert result["count"] == len(result["findings"]) == sum(result["severities"].values())
+
+
+def test_min_severity_and_errors(tree):
+    assert all(finding["severity"] == "Critical" for finding in audit(str(tree), min_severity="Critical")["findings"])
+    assert "error" in audit(str(tree), stacks=["cobol"])
+    assert "error" in audit(str(tree), min_severity="Urgent")
+    assert "error" in audit(str(tree / "missing"))
+
+
+def test_parallel_scan_matches_in_process(tree, monkeypatch):
+    for i in range(20):
+        (tree / "src" / f"copy{i}.tsx").write_text(BAD, encoding="utf-8")
+    serial = audit(str(tree), jobs=1)
+    monkeypatch.setattr(audit_module, "PARALLEL_MIN_FILES", 1)
+    monkeypatch.setattr(audit_module, "FILES_PER_TASK", 4)
+    parallel = audit(str(tree), jobs=2)
+    assert parallel["findings"] == serial["findings"] and serial["count"] > 0
+
+
+def test_report_lists_file_line_and_fix(tree):
+    lines = list(iter_report(audit(str(tree))))
+    assert lines[0] == "## UI Pro Max Audit"
+    assert any(line.startswith("src/Close.tsx:2 [Critical]") for line in lines)
+    assert any(line.strip().startswith("Fix: ") for line in lines)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""build_index.py: column validation and prebuilt artifacts"""
+
+from build_index import build_all, build_source, validate_source
+from core import BM25Engine, CSV_CONFIG, DATA_DIR, get_data_index, read_artifact, write_artifact
+from palette import PaletteIndex, build_palette_index
+from perf import StyleCostIndex, build_style_cost_index
+
+
+def test_bundled_data_validates():
+    reports = build_all(check_only=True, jobs=2)
+    assert reports and all(report["errors"] == [] for report in reports)
+
+
+def test_missing_columns_are_reported(tmp_path):
+    broken = tmp_path / "styles.csv"
+    broken.write_text("No,Style Category\n1,Flat\n", encoding="utf-8")
+    config = CSV_CONFIG["style"]
+    _, errors = validate_source(broken, config["search_cols"], config["output_cols"])
+    assert "search column missing: Keywords" in errors
+    assert "output column missing: Primary Colors" in errors
+    _, errors = validate_source(tmp_path / "missing.csv", [], [])
+    assert errors and errors[0].startswith("file not found")
+
+
+def test_prebuilt_artifact_loads_without_fitting(tmp_path):
+    report = build_source("style", "bm25", str(tmp_path))
+    assert report["errors"] == [] and report["rows"] > 0 and report["artifact_bytes"] > 0
+
+    engine = BM25Engine(DATA_DIR / CSV_CONFIG["style"]["file"], CSV_CONFIG["style"]["search_cols"], tmp_path)
+    assert engine.load()
+    assert engine.stats()["documents"] == report["rows"]
+
+
+def test_artifacts_are_bound_to_their_sources(tmp_path):
+    path = tmp_path / "table.pkl"
+    write_artifact(path, "abc", {"rows": [1, 2]})
+    assert read_artifact(path, "abc") == {"fingerprint": "abc", "rows": [1, 2]}
+    assert read_artifact(path, "def") is None
+    assert read_artifact(tmp_path / "missing.pkl", "abc") is None
+
+
+def test_data_indexes_load_their_prebuilt_artifacts(tmp_path):
+    for index_cls, build in ((PaletteIndex, build_palette_index), (StyleCostIndex, build_style_cost_index)):
+        built = build(tmp_path)
+        index = index_cls(index_dir=tmp_path)
+        assert index.load() and index.rows == built.rows
+        shared = get_data_index(index_cls, index_dir=tmp_path)
+        assert get_data_index(index_cls, index_dir=tmp_path) is shared and shared.rows == built.rows
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""search.py end to end: stdout carries only the requested format, and flag validation"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from render import decode_binary
+
+SEARCH = Path(__file__).resolve().parent.parent / "search.py"
+
+
+def _run(*args, check=True):
+    return subprocess.run([sys.executable, str(SEARCH), *args], capture_output=True, check=check)
+
+
+@pytest.mark.parametrize("output_format", ["json", "json-min", "columnar"])
+def test_persist_banner_stays_off_machine_output(tmp_path, output_format):
+    proc = _run("fintech crypto", "--design-system", "--persist", "-p", "Ledger", "-f", output_format,
+                "--output-dir", str(tmp_path))
+    json.loads(proc.stdout.decode("utf-8"))
+    assert "Design system persisted" in proc.stderr.decode("utf-8")
+    assert (tmp_path / "design-system" / "ledger" / "MASTER.md").exists()
+
+
+def test_persist_banner_stays_off_binary_output(tmp_path):
+    proc = _run("fintech crypto", "--design-system", "--persist", "-f", "binary", "--output-dir", str(tmp_path))
+    assert decode_binary(proc.stdout)["category"]
+
+
+def test_persist_banner_follows_text_output(tmp_path):
+    proc = _run("fintech crypto", "--design-system", "--persist", "-f", "markdown", "--output-dir", str(tmp_path))
+    assert "Design system persisted" in proc.stdout.decode("utf-8")
+
+
+@pytest.mark.parametrize("budget", ["0", "-5"])
+def test_budget_tokens_must_be_positive(budget):
+    proc = _run("glassmorphism", "--budget-tokens", budget, check=False)
+    assert proc.returncode == 2
+    assert "--budget-tokens: must be a positive integer" in proc.stderr.decode("utf-8")
+
+
+def test_small_budget_is_applied():
+    result = json.loads(_run("glassmorphism", "-d", "style", "--budget-tokens", "1", "--json").stdout)
+    assert result["budget"]["tokens"] == 1 and result["results"] == []
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Single-flight coalescing of concurrent identical computations and searches"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import SingleFlight, search
+
+CALLERS = 6
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _run_concurrently(flight, key, compute):
+    """Start CALLERS identical calls and let the computation finish once all have joined"""
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return compute()
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [executor.submit(flight.do, key, blocked) for _ in range(CALLERS)]
+        _wait_for(lambda: flight.stats()["coalesced"] == CALLERS - 1)
+        release.set()
+        return futures
+
+
+def test_identical_calls_run_once():
+    flight, runs = SingleFlight(), []
+    futures = _run_concurrently(flight, "k", lambda: runs.append(1) or {"rows": [1, 2]})
+    results = [future.result() for future in futures]
+    assert len(runs) == 1
+    assert all(result == {"rows": [1, 2]} for result in results)
+    assert len({id(result) for result in results}) == CALLERS  # every caller owns its copy
+    assert flight.stats() == {"calls": CALLERS, "executions": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    for future in _run_concurrently(flight, "k", fail):
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result()
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_finished_results_are_not_kept():
+    flight, runs = SingleFlight(), []
+    flight.do("k", lambda: runs.append(1))
+    flight.do("k", lambda: runs.append(1))
+    assert len(runs) == 2
+
+
+def test_coalesced_search_keeps_each_callers_query():
+    queries = ["Dark Mode", "dark  mode", "DARK MODE"] * 4
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        results = list(executor.map(lambda query: search(query, "style", 5, engine="bm25"), queries))
+    for query, result in zip(queries, results):
+        assert result["query"] == query
+        assert result["results"] == results[0]["results"]
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Design system generation: caching, engine selection and precomputed categories"""
+
+import csv
+
+import pytest
+
+from core import CSV_CONFIG, DATA_DIR
+from design_system import DesignSystemGenerator, category_aliases
+
+# Differs between engines in its typography
+ENGINE_SENSITIVE_QUERY = "beauty spa wellness"
+
+
+def _choice(design_system):
+    return (design_system["category"], design_system["style"]["name"], design_system["typography"]["heading"],
+            design_system["pattern"]["name"])
+
+
+@pytest.fixture
+def generator():
+    DesignSystemGenerator._memo.clear()
+    return DesignSystemGenerator()
+
+
+def test_cached_result_matches_live(generator):
+    live = generator.generate("fintech crypto", use_cache=False)
+    assert generator.generate("fintech crypto") == {**live, "project_name": "FINTECH CRYPTO"}
+    assert generator.generate("fintech crypto") == generator.generate("fintech crypto")
+
+
+def test_disk_cache_survives_the_memo(generator, monkeypatch):
+    first = generator.generate("fintech crypto")
+    DesignSystemGenerator._memo.clear()
+    monkeypatch.setattr(DesignSystemGenerator, "_generate", lambda *args, **kwargs: pytest.fail("not cached"))
+    assert generator.generate("  Fintech   CRYPTO ") == {**first, "project_name": "  FINTECH   CRYPTO "}
+
+
+def test_cached_result_is_a_copy(generator):
+    first = generator.generate("fintech crypto", "Ledger")
+    first["style"]["name"] = "changed"
+    assert generator.generate("fintech crypto", "Ledger")["style"]["name"] != "changed"
+
+
+def test_cache_key_covers_inputs_and_data(generator, monkeypatch):
+    key = generator._cache_key("fintech crypto", None)
+    assert generator._cache_key(" Fintech  Crypto", None) == key
+    assert generator._cache_key("fintech crypto", "Ledger") != key
+    assert generator._cache_key("fintech crypto", None, min_contrast=4.5) != key
+    assert generator._cache_key("fintech crypto", None, perf_budget="strict") != key
+    monkeypatch.setattr("design_system._source_fingerprints", lambda: {"products.csv": "edited"})
+    assert generator._cache_key("fintech crypto", None) != key
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "hybrid"])
+def test_engine_argument_reaches_every_search(generator, engine):
+    bm25 = generator.generate(ENGINE_SENSITIVE_QUERY, engine="bm25")
+    other = generator.generate(ENGINE_SENSITIVE_QUERY, engine=engine)
+    assert _choice(other) == _choice(generator.generate(ENGINE_SENSITIVE_QUERY, use_cache=False, engine=engine))
+    assert _choice(bm25) == _choice(generator.generate(ENGINE_SENSITIVE_QUERY, use_cache=False, engine="bm25"))
+
+
+def test_engine_env_is_part_of_the_cache_key(generator, monkeypatch):
+    bm25 = generator.generate(ENGINE_SENSITIVE_QUERY)
+    monkeypatch.setenv("UIPRO_ENGINE", "sqlite")
+    sqlite = generator.generate(ENGINE_SENSITIVE_QUERY)
+    assert _choice(sqlite) == _choice(generator.generate(ENGINE_SENSITIVE_QUERY, use_cache=False))
+    assert _choice(sqlite) != _choice(bm25)
+
+
+@pytest.fixture(scope="module")
+def precomputed():
+    from design_system import precompute_design_systems
+    report = precompute_design_systems()
+    yield report
+    DesignSystemGenerator._precomputed = None
+
+
+def test_precomputed_entries_match_live(generator, precomputed):
+    assert precomputed["queries"] > precomputed["categories"] > 0
+    table = generator._load_precomputed()
+    for query in ["saas", "hotel", "beauty spa wellness service", "saas (general)"]:
+        assert query in table["queries"]
+        assert generator.generate(query) == {**generator.generate(query, use_cache=False),
+                                             "project_name": query.upper()}
+
+
+def test_rerouted_aliases_are_reported(generator, precomputed):
+    table = generator._load_precomputed()
+    with open(DATA_DIR / CSV_CONFIG["product"]["file"], encoding="utf-8") as f:
+        products = list(csv.DictReader(f))
+    listed_by = {}
+    for product in products:
+        for alias in category_aliases(product):
+            listed_by.setdefault(alias, product["Product Type"])
+    resolved = {alias: table["queries"][alias]["category"] for alias in listed_by}
+    assert precomputed["rerouted"] == {alias: resolved[alias] for alias in listed_by
+                                       if resolved[alias] != listed_by[alias]}
+    assert precomputed["rerouted"]["saas"] != "SaaS (General)"
+
+
+def test_precomputed_table_only_serves_exact_aliases(generator, precomputed):
+    table = generator._load_precomputed()
+    assert "beauty spa wellness" not in table["queries"]
+    live = generator.generate("beauty spa wellness", use_cache=False)
+    assert _choice(generator.generate("beauty spa wellness")) == _choice(live)
+
+
+def test_precomputed_table_is_bound_to_its_engines(generator, precomputed, monkeypatch):
+    assert generator._load_precomputed()["queries"]
+    monkeypatch.setenv("UIPRO_ENGINE", "sqlite")
+    assert generator._load_precomputed()["queries"] == {}
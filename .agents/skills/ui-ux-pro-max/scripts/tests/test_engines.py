@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Engine dispatch and the behavior every backend shares"""
+
+import pytest
+
+from core import CSV_CONFIG, DEFAULT_ENGINE, ENGINE_ENV, available_engines, resolve_engine, search
+
+ENGINES = ["bm25", "sqlite", "hybrid"]
+
+
+def test_all_backends_available():
+    assert set(ENGINES) <= set(available_engines())
+
+
+def test_engine_precedence(monkeypatch):
+    config = {"engine": "hybrid"}
+    assert resolve_engine() == DEFAULT_ENGINE
+    assert resolve_engine(config) == "hybrid"
+    monkeypatch.setenv(ENGINE_ENV, "sqlite")
+    assert resolve_engine(config) == "sqlite"
+    assert resolve_engine(config, "bm25") == "bm25"
+
+
+def test_unknown_engine(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown search engine"):
+        resolve_engine(engine="lucene")
+    assert "error" in search("glassmorphism", "style", engine="lucene")
+    monkeypatch.setenv(ENGINE_ENV, "lucene")
+    assert "error" in search("glassmorphism", "style")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("domain, query, column, expected", [
+    ("style", "glassmorphism", "Style Category", "Glassmorphism"),
+    ("typography", "playfair display", "Font Pairing Name", "Restaurant Menu"),
+    ("ux", "z-index stacking", "Issue", "Stacking Context"),
+])
+def test_backends_agree_on_exact_matches(engine, domain, query, column, expected):
+    result = search(query, domain, 3, engine=engine)
+    assert result["results"][0][column] == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_results_carry_the_output_columns(engine):
+    result = search("dark mode dashboard", "style", 5, engine=engine)
+    assert result["count"] == len(result["results"]) == 5
+    for row in result["results"]:
+        assert list(row) == [col for col in CSV_CONFIG["style"]["output_cols"] if col in row]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_no_match_is_empty(engine):
+    assert search("qqqqzzzz xxyyzz", "style", 5, engine=engine)["results"] == []
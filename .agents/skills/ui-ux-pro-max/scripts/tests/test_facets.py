@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Facet filters: bitset semantics and filtered search on every engine"""
+
+import pytest
+
+from core import FacetIndex, iter_bits, search
+
+ROWS = [
+    {"Severity": "High", "Platform": "Web"},
+    {"Severity": "Medium", "Platform": "iOS + Android"},
+    {"Severity": "high", "Platform": "Android"},
+    {"Severity": "Low", "Platform": ""},
+]
+
+
+@pytest.fixture
+def facets():
+    index = FacetIndex(["Severity", "Platform"])
+    index.build(ROWS)
+    return index
+
+
+def test_or_within_and_across_columns(facets):
+    assert list(iter_bits(facets.resolve({"Severity": "HIGH"}))) == [0, 2]
+    assert list(iter_bits(facets.resolve({"Severity": ["high", "low"]}))) == [0, 2, 3]
+    assert list(iter_bits(facets.resolve({"Severity": "high", "Platform": "android"}))) == [2]
+    assert facets.resolve({"Severity": "critical"}) == 0
+
+
+def test_multi_valued_cells_match_each_part(facets):
+    assert list(iter_bits(facets.resolve({"Platform": "Android"}))) == [1, 2]
+    assert list(iter_bits(facets.resolve({"platform": "iOS + Android"}))) == [1]
+
+
+def test_unknown_column_is_an_error(facets):
+    with pytest.raises(ValueError, match="Facet columns: Severity, Platform"):
+        facets.resolve({"Stack": "react"})
+    assert "error" in search("touch", "ux", filters={"Stack": "react"})
+
+
+@pytest.mark.parametrize("engine", ["bm25", "sqlite", "hybrid"])
+def test_filtered_results_all_match(engine):
+    filters = {"Severity": ["High"], "Platform": ["Web", "All"]}
+    result = search("touch keyboard focus", "ux", 10, engine=engine, filters=filters)
+    assert result["results"]
+    for row in result["results"]:
+        assert row["Severity"] == "High" and row["Platform"] in ("Web", "All")
+    unfiltered = search("touch keyboard focus", "ux", 50, engine=engine)["results"]
+    expected = [row for row in unfiltered if row["Severity"] == "High" and row["Platform"] in ("Web", "All")]
+    assert result["results"] == expected[:len(result["results"])]
+
+
+def test_symbols_and_case_are_ignored():
+    assert search("minimal", "style", 5, filters={"Performance": "excellent"})["results"] == \
+        search("minimal", "style", 5, filters={"Performance": "⚡ Excellent"})["results"]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Font loading plans: import parsing, weight trimming and size estimates"""
+
+from design_system import (CJK_FONT_FILE_KB, FONT_FILE_KB, DesignSystemGenerator, font_loading_plan,
+                           format_font_budget, parse_font_import)
+
+IMPORT = ("@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@400;500;600;700"
+          "&family=Inter:wght@300;400;500;600;700&display=swap');")
+
+
+def test_parse_font_import():
+    assert parse_font_import(IMPORT) == {"Playfair Display": [400, 500, 600, 700], "Inter": [300, 400, 500, 600, 700]}
+    assert parse_font_import("family=Inter:wght@100..900&family=Bebas+Neue") == {"Inter": (100, 900),
+                                                                                 "Bebas Neue": None}
+    assert parse_font_import("") == {}
+
+
+def test_only_used_weights_in_one_request():
+    plan = font_loading_plan("Playfair Display", "Inter", IMPORT)
+    assert plan["families"] == {"Playfair Display": [700], "Inter": [400, 600]}
+    assert plan["url"] == ("https://fonts.googleapis.com/css2?family=Inter:wght@400;600"
+                           "&family=Playfair+Display:wght@700&display=swap")
+    assert plan["files"] == 3 and plan["estimated_kb"] == 3 * FONT_FILE_KB
+    assert (plan["original_files"], plan["original_kb"]) == (9, 9 * FONT_FILE_KB)
+    assert plan["html"][-2] == f'<link rel="preload" as="style" href="{plan["url"]}">'
+
+
+def test_nearest_weight_and_variable_axes():
+    plan = font_loading_plan("Bebas Neue", "Inter", "family=Bebas+Neue&family=Inter:wght@300;500")
+    assert plan["families"] == {"Bebas Neue": None, "Inter": [500]}
+    variable = font_loading_plan("Inter", "Inter", "family=Inter:wght@100..900")
+    assert variable["families"] == {"Inter": [400, 600, 700]} and variable["files"] == 1
+
+
+def test_cjk_families_cost_more():
+    plan = font_loading_plan("Noto Sans JP", "Noto Sans JP", "family=Noto+Sans+JP:wght@400;700")
+    assert plan["estimated_kb"] == plan["files"] * CJK_FONT_FILE_KB
+    assert format_font_budget(plan).startswith(f"{plan['files']} font files")
+
+
+def test_design_system_carries_the_plan():
+    typography = DesignSystemGenerator().generate("fintech crypto")["typography"]
+    loading = typography["font_loading"]
+    assert loading["url"].endswith("&display=swap")
+    assert typography["heading"].replace(" ", "+") in loading["url"]
+    assert loading["estimated_kb"] <= (loading["original_kb"] or loading["estimated_kb"])
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Cursor pagination over cached rankings"""
+
+import os
+import time
+
+import core
+from core import search
+
+
+def test_pages_follow_the_full_ranking():
+    full = search("glass card", "style", 6)["results"]
+    first = search("glass card", "style", 3, offset=0)
+    second = search("glass card", "style", 3, offset=3, cursor=first["cursor"])
+    assert first["results"] + second["results"] == full
+    assert second["cursor"] == first["cursor"]
+    assert "cursor_ignored" not in second
+
+
+def test_cursor_from_another_domain_is_ignored():
+    cursor = search("glass card", "style", 2, offset=0)["cursor"]
+    result = search("focus", "web", 2, offset=2, cursor=cursor)
+    assert "error" not in result
+    assert result["cursor_ignored"] is True
+    assert result["cursor"] != cursor
+    assert result["results"] == search("focus", "web", 4)["results"][2:]
+
+
+def test_cursor_from_another_query_is_ignored():
+    cursor = search("glass card", "style", 2, offset=0)["cursor"]
+    result = search("dark mode", "style", 2, offset=0, cursor=cursor)
+    assert result["cursor_ignored"] is True
+    assert result["results"] == search("dark mode", "style", 2)["results"]
+
+
+def test_cursor_is_bound_to_filters():
+    plain = search("dashboard", "style", 2, offset=0)
+    filtered = search("dashboard", "style", 2, offset=0, cursor=plain["cursor"], filters={"Complexity": "Low"})
+    assert filtered["cursor_ignored"] is True
+    assert all(row["Complexity"] == "Low" for row in filtered["results"])
+
+
+def test_cursor_directory_stays_bounded(monkeypatch):
+    monkeypatch.setattr(core, "MAX_CURSORS", 4)
+    for word in ("glass", "dark", "minimal", "brutal", "neon", "retro", "flat", "soft"):
+        search(word, "style", 2, offset=0)
+    assert len(list(core.CURSOR_DIR.glob("*.json"))) <= 4
+    assert set(core._CURSORS) == {path.stem for path in core.CURSOR_DIR.glob("*.json")}
+
+
+def test_expired_cursor_files_are_deleted():
+    core.CURSOR_DIR.mkdir(parents=True, exist_ok=True)
+    stale = core.CURSOR_DIR / "stale.json"
+    stale.write_text("{}", encoding="utf-8")
+    expired = time.time() - core.CURSOR_TTL - 1
+    os.utime(stale, (expired, expired))
+    search("claymorphism toy", "style", 2, offset=0)  # a new cursor, so one is written
+    assert not stale.exists()
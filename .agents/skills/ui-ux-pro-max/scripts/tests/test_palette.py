@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Palette search: color parsing, CIELAB distance, role matching and WCAG contrast constraints"""
+
+import pytest
+
+from core import search
+from design_system import DesignSystemGenerator
+from palette import (ANY_ROLE, CHECKED_PAIRS, ROLES, WCAG_LEVELS, contrast_ratio, delta_e, get_palette_index,
+                     hex_contrast, parse_colors, parse_hex, parse_min_contrast, relative_luminance, rgb_to_lab)
+
+
+def test_parse_colors():
+    assert parse_colors("#2563EB and rgb(255, 0, 300)") == [(ANY_ROLE, (37, 99, 235)), (ANY_ROLE, (255, 0, 255))]
+    assert parse_colors("cta #F97316 bg: #fff, accent=#000") == [
+        ("cta", (249, 115, 22)), ("background", (255, 255, 255)), ("cta", (0, 0, 0))]
+    assert parse_colors("blue saas") == []
+    assert parse_hex("#12345") is None and parse_hex("#GGGGGG") is None
+
+
+def test_lab_reference_points():
+    assert rgb_to_lab((255, 255, 255)) == pytest.approx((100, 0, 0), abs=0.01)
+    assert rgb_to_lab((0, 0, 0)) == pytest.approx((0, 0, 0), abs=0.01)
+    assert delta_e(rgb_to_lab((37, 99, 235)), rgb_to_lab((37, 99, 235))) == 0
+    assert rgb_to_lab((255, 0, 0)) == pytest.approx((53.24, 80.09, 67.20), abs=0.05)
+
+
+def test_exact_color_ranks_first():
+    result = search("#2563EB", "color", 5)
+    assert result["mode"].startswith("nearest color")
+    top = result["results"][0]
+    assert "#2563EB" in (top["Primary (Hex)"], top["CTA (Hex)"], top["Secondary (Hex)"])
+    assert top["ΔE"].startswith("0.0")
+    distances = [float(row["ΔE"].split()[0]) for row in result["results"]]
+    assert distances == sorted(distances)
+
+
+def test_role_restricts_the_compared_column():
+    for row in search("cta #2563EB", "color", 5)["results"]:
+        assert " (cta " in row["ΔE"]
+    assert search("background #2563EB", "color", 1)["results"][0]["Background (Hex)"] != "#2563EB"
+
+
+def test_several_colors_average_their_distances():
+    result = search("primary #2563EB cta #F97316", "color", 1)
+    top = result["results"][0]
+    assert (top["Primary (Hex)"], top["CTA (Hex)"]) == ("#2563EB", "#F97316")
+    assert [color["role"] for color in result["colors"]] == ["primary", "cta"]
+
+
+def test_hex_query_pages_through_the_delta_e_ranking():
+    first = search("#2563EB", "color", 3)
+    page = search("#2563EB", "color", 3, offset=0)
+    assert page["mode"].startswith("nearest color") and page["results"] == first["results"]
+    assert page["total"] == len(get_palette_index().rows) and page["next_offset"] == 3
+
+    second = search("#2563EB", "color", 3, offset=3, cursor=page["cursor"])
+    assert second["cursor"] == page["cursor"] and "cursor_ignored" not in second
+    assert second["results"] == search("#2563EB", "color", 6)["results"][3:]
+    assert search("#F97316", "color", 3, offset=3, cursor=page["cursor"])["cursor_ignored"]
+
+
+def test_hex_query_filters_are_checked():
+    assert "error" in search("#2563EB", "color", 3, filters={"Product Type": "SaaS (General)"})
+
+
+def test_index_covers_every_palette():
+    index = get_palette_index()
+    assert len(index.rows) == index.stats()["palettes"] > 0
+    totals, _ = index.distances([(ANY_ROLE, rgb_to_lab((37, 99, 235)))])
+    assert len(totals) == len(index.rows)
+
+
+def _lowest_contrast(row):
+    """Lowest checked-pair contrast of a colors.csv row, from its hex values"""
+    luminance = {role: relative_luminance(parse_hex(row[ROLES[role]]) or (0, 0, 0))
+                 for role in ("text", "background", "cta")}
+    return min(contrast_ratio(luminance[a], luminance[b]) for a, b in CHECKED_PAIRS)
+
+
+def test_wcag_contrast_reference_points():
+    white, black = relative_luminance((255, 255, 255)), relative_luminance((0, 0, 0))
+    assert contrast_ratio(white, black) == pytest.approx(21)
+    assert contrast_ratio(black, white) == contrast_ratio(white, black)
+    assert contrast_ratio(relative_luminance((118, 118, 118)), white) == pytest.approx(4.54, abs=0.01)
+
+
+def test_hex_contrast_matches_the_index():
+    index = get_palette_index()
+    for idx, row in enumerate(index.rows):
+        assert hex_contrast({role: row[ROLES[role]] for role in ROLES}) == index.pair_contrast(idx)
+    assert hex_contrast({"text": "#000000", "background": "#FFFFFF", "cta": "oops"}) == {
+        "text/background": 21.0, "cta/background": None}
+
+
+def test_parse_min_contrast():
+    assert [parse_min_contrast(level) for level in ("aa", "AAA", "AA-large")] == [4.5, 7.0, 3.0]
+    assert parse_min_contrast("5") == 5.0
+    with pytest.raises(ValueError):
+        parse_min_contrast("25")
+
+
+@pytest.mark.parametrize("level", ["AA-large", "AA", "AAA", "5.2"])
+def test_contrast_mask_matches_the_hex_values(level):
+    index = get_palette_index()
+    ratio = parse_min_contrast(level)
+    mask = index.contrast_mask(ratio)
+    for i, row in enumerate(index.rows):
+        lowest = _lowest_contrast(row)
+        if abs(lowest - ratio) > 1e-3:  # stored as float32
+            assert bool(mask >> i & 1) == (lowest >= ratio), row["Product Type"]
+
+
+@pytest.mark.parametrize("query", ["#2563EB", "dashboard"])
+def test_min_contrast_filters_color_results(query):
+    result = search(query, "color", 10, min_contrast=WCAG_LEVELS["AA"])
+    assert result["results"]
+    assert all(_lowest_contrast(row) >= 4.5 for row in result["results"])
+
+
+def test_design_system_palette_meets_min_contrast():
+    design_system = DesignSystemGenerator().generate("fintech crypto", min_contrast=7.0, use_cache=False)
+    colors = design_system["colors"]
+    luminance = {role: relative_luminance(parse_hex(colors[role])) for role in ("text", "background", "cta")}
+    assert contrast_ratio(luminance["text"], luminance["background"]) >= 7.0
+    assert contrast_ratio(luminance["cta"], luminance["background"]) >= 7.0
+    assert colors["contrast"] == hex_contrast(colors)
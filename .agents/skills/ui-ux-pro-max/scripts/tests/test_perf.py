@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Performance budgets: cost parsing, budget bitsets and budget-aware style selection"""
+
+import pytest
+
+from core import search
+from design_system import DesignSystemGenerator
+from perf import (PERF_BUDGETS, effects_weight, fits_budget, get_style_cost_index, parse_complexity,
+                  parse_performance, style_cost)
+
+
+def test_parse_ratings():
+    assert parse_performance("⚡ Excellent") == 0.0
+    assert parse_performance("⚠ Good") == 1.5
+    assert parse_performance("Moderate-Poor") == 2.5
+    assert parse_performance("❌ Poor") == 3.0
+    assert parse_performance("n/a") is None
+    assert parse_complexity(" High ") == 2.0 and parse_complexity("?") is None
+
+
+def test_effects_weight_skips_negated_clauses():
+    assert effects_weight("Backdrop blur, parallax scrolling") == 4.0
+    assert effects_weight("No motion blur, subtle fade animation") == 0.5
+    assert effects_weight("WebGL 3D scene") == 3.0
+
+
+def test_unknown_ratings_count_as_average():
+    assert style_cost({}) == {"performance": 1.0, "complexity": 1.0, "effects": 0.0, "cost": 3.0}
+
+
+def test_budgets_are_nested():
+    index = get_style_cost_index()
+    strict, balanced, rich = (index.budget_mask(budget) for budget in ("strict", "balanced", "rich"))
+    assert 0 < strict and strict & ~balanced == 0 and balanced & ~rich == 0
+    assert rich == (1 << len(index.rows)) - 1
+    for i, row in enumerate(index.rows):
+        assert bool(strict >> i & 1) == fits_budget(style_cost(row), "strict")
+
+
+@pytest.mark.parametrize("budget", list(PERF_BUDGETS))
+def test_search_keeps_styles_within_budget(budget):
+    index = get_style_cost_index()
+    result = search("glassmorphism immersive 3d dashboard", "style", 10, perf_budget=budget)
+    assert result["perf_budget"] == budget and result["results"]
+    for row in result["results"]:
+        assert fits_budget(index.cost_of(row), budget)
+
+
+def test_strict_budget_changes_the_design_system_style():
+    generator = DesignSystemGenerator()
+    rich = generator.generate("gaming immersive 3d", use_cache=False)
+    strict = generator.generate("gaming immersive 3d", perf_budget="strict", use_cache=False)
+    assert not fits_budget(get_style_cost_index().cost_of({"Style Category": rich["style"]["name"]}), "strict")
+    assert fits_budget(get_style_cost_index().cost_of({"Style Category": strict["style"]["name"]}), "strict")
+    assert strict["style"]["perf_budget"] == "strict"
+    assert strict["style"]["effect_budget"] == PERF_BUDGETS["strict"]["effects"]
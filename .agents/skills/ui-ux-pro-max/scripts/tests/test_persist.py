@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Persisting design systems: file modes, locking, the created/written/skipped report and page overrides"""
+
+import os
+import stat
+
+import pytest
+
+from design_system import (DesignSystemGenerator, LOCK_DIR, VOLATILE_PREFIXES, load_pages_file, parse_pages,
+                           persist_design_system)
+
+
+@pytest.fixture(scope="module")
+def design_system():
+    return DesignSystemGenerator().generate("fintech crypto", "Ledger")
+
+
+def _stable(text):
+    """File content without its generation timestamp"""
+    return [line for line in text.splitlines() if not line.startswith(VOLATILE_PREFIXES)]
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_follow_the_umask(design_system, tmp_path):
+    previous = os.umask(0o027)
+    try:
+        result = persist_design_system(design_system, page="dashboard", output_dir=str(tmp_path))
+        assert os.umask(0o027) == 0o027  # persisting leaves the process umask alone
+    finally:
+        os.umask(previous)
+    assert result["created_files"]
+    for path in result["created_files"]:
+        assert _mode(path) == 0o640
+
+
+def test_rewrite_keeps_the_existing_mode(design_system, tmp_path):
+    master = persist_design_system(design_system, output_dir=str(tmp_path))["created_files"][0]
+    os.chmod(master, 0o600)
+    with open(master, "a", encoding="utf-8") as f:
+        f.write("\nlocal edit\n")
+    result = persist_design_system(design_system, output_dir=str(tmp_path))
+    assert result["written_files"] == [master]
+    assert _mode(master) == 0o600
+
+
+def test_created_files_lists_only_new_files(design_system, tmp_path):
+    first = persist_design_system(design_system, output_dir=str(tmp_path))
+    assert first["created_files"] == first["written_files"]
+
+    second = persist_design_system(design_system, page="dashboard", output_dir=str(tmp_path))
+    assert second["skipped_files"] == first["written_files"]
+    assert len(second["created_files"]) == 1 and second["created_files"][0].endswith("dashboard.md")
+
+    other = DesignSystemGenerator().generate("beauty spa wellness", "Ledger")
+    third = persist_design_system(other, page="dashboard", output_dir=str(tmp_path))
+    assert third["created_files"] == []
+    assert third["written_files"] == [first["written_files"][0]]
+
+
+def test_lock_stays_out_of_the_project_folder(design_system, tmp_path):
+    result = persist_design_system(design_system, page="dashboard", output_dir=str(tmp_path))
+    project_dir = result["design_system_dir"]
+    leftovers = [name for _, _, files in os.walk(project_dir) for name in files if not name.endswith(".md")]
+    assert leftovers == []
+    assert any(LOCK_DIR.glob("*.lock"))
+
+
+def test_pages_spec_and_file_parse_alike(tmp_path):
+    pages_file = tmp_path / "pages.txt"
+    pages_file.write_text("# pages\ndashboard\n\ncheckout: one-click payment\n", encoding="utf-8")
+    expected = [("dashboard", None), ("checkout", "one-click payment")]
+    assert parse_pages("dashboard, checkout:one-click payment,") == expected
+    assert load_pages_file(str(pages_file)) == expected
+
+
+def test_several_pages_are_written_with_one_master(design_system, tmp_path):
+    result = persist_design_system(design_system, output_dir=str(tmp_path),
+                                   pages=[("dashboard", None), ("checkout", "one-click payment")])
+    names = sorted(os.path.basename(path) for path in result["written_files"])
+    assert names == ["MASTER.md", "checkout.md", "dashboard.md"]
+
+    pages_dir = tmp_path / "design-system" / "ledger" / "pages"
+    dashboard = (pages_dir / "dashboard.md").read_text(encoding="utf-8")
+    checkout = (pages_dir / "checkout.md").read_text(encoding="utf-8")
+    assert "Dashboard" in dashboard and "Checkout" in checkout
+    assert dashboard != checkout
+
+    # One page on its own renders the same override as in the batch
+    single = tmp_path / "single"
+    persist_design_system(design_system, page="checkout", page_query="one-click payment", output_dir=str(single))
+    assert _stable((single / "design-system" / "ledger" / "pages" / "checkout.md").read_text(encoding="utf-8")) == \
+        _stable(checkout)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Phrase and proximity queries: positional matching and their effect on search"""
+
+import re
+
+import pytest
+
+from core import BM25, CSV_CONFIG, iter_bits, parse_phrases, search
+
+
+@pytest.fixture(scope="module")
+def bm25():
+    model = BM25()
+    model.fit(["dark mode toggle", "mode for dark rooms", "dark high contrast mode", "light mode", "dark dark mode"])
+    return model
+
+
+def test_parse_phrases():
+    assert parse_phrases('"dark mode" dashboard "touch target"~3 x') == [("dark mode", None), ("touch target", 3)]
+    assert parse_phrases('no "unbalanced quote') == []
+
+
+def test_exact_phrase_needs_adjacent_words_in_order(bm25):
+    assert list(iter_bits(bm25.phrase_matches(["dark", "mode"]))) == [0, 4]
+
+
+def test_slop_allows_words_in_between(bm25):
+    assert list(iter_bits(bm25.phrase_matches(["dark", "mode"], slop=1))) == [0, 4]
+    assert list(iter_bits(bm25.phrase_matches(["dark", "mode"], slop=2))) == [0, 2, 4]
+    assert bm25.phrase_matches(["dark", "unknown"]) == 0
+
+
+def _text(row, domain):
+    return " ".join(re.sub(r"[^\w\s]", " ", str(row.get(col, ""))).lower() for col in CSV_CONFIG[domain]["search_cols"])
+
+
+@pytest.mark.parametrize("engine", ["bm25", "sqlite"])
+def test_quoted_phrase_filters_results(engine):
+    phrased = search('"dark mode" dashboard', "style", 50, engine=engine)["results"]
+    loose = search("dark mode dashboard", "style", 50, engine=engine)["results"]
+    assert 0 < len(phrased) < len(loose)
+    assert all(" dark mode " in f" {' '.join(_text(row, 'style').split())} " for row in phrased)
+
+
+@pytest.mark.parametrize("engine", ["bm25", "sqlite"])
+def test_proximity_phrase_only_boosts(engine):
+    boosted = search('"touch target"~3 mobile', "ux", 50, engine=engine)["results"]
+    plain = search("touch target mobile", "ux", 50, engine=engine)["results"]
+    assert sorted(row["Issue"] for row in boosted) == sorted(row["Issue"] for row in plain)
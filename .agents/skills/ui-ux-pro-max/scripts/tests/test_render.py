@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Renderers: streamed JSON/JSONL, token budgets and compact formats"""
+
+import io
+import json
+
+import pytest
+
+from core import search
+from design_system import generate_design_system
+from render import (TITLE_COLUMNS, decode_binary, encode_binary, estimate_tokens, fit_budget, iter_compact, iter_json,
+                    iter_jsonl, snippet, to_columnar, write_binary, write_lines)
+
+NESTED = {
+    "query": "café \"quoted\"",
+    "empty_dict": {},
+    "empty_list": [],
+    "rows": [{"a": 1, "b": [1.5, None, True]}, {"a": -2, "b": {"c": "✓"}}],
+    "scalar": None
+}
+
+
+@pytest.mark.parametrize("value", [NESTED, [], {}, [NESTED, [[]]], "text", 3])
+def test_streamed_json_matches_json_dumps(value):
+    sink = io.StringIO()
+    write_lines(iter_json(value), sink)
+    assert sink.getvalue() == json.dumps(value, indent=2, ensure_ascii=False) + "\n"
+
+
+def test_jsonl_is_metadata_then_one_row_per_line():
+    lines = list(iter_jsonl(NESTED, rows_key="rows"))
+    assert json.loads(lines[0]) == {k: v for k, v in NESTED.items() if k != "rows"}
+    assert [json.loads(line) for line in lines[1:]] == NESTED["rows"]
+
+
+def test_search_result_streams_losslessly():
+    result = search("glassmorphism", "style", 10, engine="bm25")
+    sink = io.StringIO()
+    write_lines(iter_json(result), sink)
+    assert json.loads(sink.getvalue()) == result
+
+
+def test_design_system_json_streams_losslessly():
+    rendered = generate_design_system("fintech crypto", "Ledger", "json")
+    sink = io.StringIO()
+    assert generate_design_system("fintech crypto", "Ledger", "json", sink=sink) is None
+    assert sink.getvalue() == rendered + "\n"
+    assert json.loads(rendered)["project_name"] == "Ledger"
+
+
+@pytest.fixture(scope="module")
+def long_result():
+    return search("dark mode dashboard", "style", 10, engine="bm25")
+
+
+@pytest.mark.parametrize("budget", [120, 400, 1500])
+def test_budget_is_respected(long_result, budget):
+    packed = fit_budget(long_result, budget)
+    assert packed["budget"]["used"] <= budget
+    assert packed["count"] == len(packed["results"]) == 10 - packed["budget"]["dropped_results"]
+    body = sum(estimate_tokens(f"- **{key}:** {value}") for row in packed["results"] for key, value in row.items())
+    assert body <= budget
+
+
+def test_best_results_and_titles_first(long_result):
+    small, large = fit_budget(long_result, 150), fit_budget(long_result, 1500)
+    assert 0 < small["count"] < large["count"]
+    titles = [row["Style Category"] for row in long_result["results"]]
+    assert [row["Style Category"] for row in small["results"]] == titles[:small["count"]]
+    for row in large["results"]:
+        assert next(key for key in row if key in TITLE_COLUMNS) == "Style Category"
+
+
+def test_snippet_centers_on_the_match():
+    text = " ".join(f"word{i}" for i in range(200)) + " glassmorphism " + " ".join(f"tail{i}" for i in range(200))
+    cut, truncated = snippet(text, {"glassmorphism"}, 20)
+    assert truncated and "glassmorphism" in cut and cut.startswith("…") and cut.endswith("…")
+    assert estimate_tokens(cut) <= 20
+    assert snippet("Wait… then fade", {"fade"}, 20) == ("Wait… then fade", False)
+
+
+def test_short_values_with_an_ellipsis_are_kept():
+    result = {"query": "fade", "results": [{"Style Category": "Calm", "Effects": "Fade… slowly"}]}
+    assert fit_budget(result, 200)["results"] == result["results"]
+
+
+def test_errors_pass_through():
+    assert fit_budget({"error": "boom"}, 10) == {"error": "boom"}
+
+
+@pytest.mark.parametrize("value", [NESTED, [], {}, 0, -2 ** 63, 2 ** 63 - 1, 1e-300, "✓" * 300, [None, True, False]])
+def test_binary_round_trip(value):
+    assert decode_binary(encode_binary(value)) == value
+
+
+def test_binary_frame_is_length_prefixed():
+    frame = encode_binary(NESTED)
+    assert int.from_bytes(frame[:4], "big") == len(frame) - 4
+    with pytest.raises(ValueError):
+        decode_binary((len(frame) - 3).to_bytes(4, "big") + frame[4:] + b"N")
+
+
+def test_columnar_names_columns_once():
+    columnar = to_columnar(NESTED)
+    assert columnar["rows"] == {"columns": ["a", "b"], "rows": [[1, [1.5, None, True]], [-2, {"c": "✓"}]]}
+    assert columnar["empty_list"] == [] and columnar["query"] == NESTED["query"]
+
+
+@pytest.mark.parametrize("output_format", ["json-min", "columnar"])
+def test_compact_text_is_one_line(output_format):
+    lines = list(iter_compact(NESTED, output_format))
+    assert len(lines) == 1 and "\n" not in lines[0]
+    expected = to_columnar(NESTED) if output_format == "columnar" else NESTED
+    assert json.loads(lines[0]) == expected
+
+
+def test_binary_sink_gets_the_columnar_frame():
+    sink = io.BytesIO()
+    write_binary(NESTED, sink)
+    assert decode_binary(sink.getvalue()) == to_columnar(NESTED)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Overlay segments: global row indices, collection-wide stats and compaction"""
+
+import shutil
+
+import pytest
+
+from core import DATA_DIR, EXPANSION_TOTALS, EXTRA_DATA_ENV, index_stats, search, search_stack
+
+STYLES = DATA_DIR / "styles.csv"
+REACT_ROW = "1,Hooks,Zyzzyva hooks,Overlay guideline about zyzzyva hooks,Use zyzzyva hooks,,,,High,\n"
+
+
+@pytest.fixture
+def overlay(tmp_path, monkeypatch):
+    """An overlay directory holding a full copy of styles.csv"""
+    shutil.copy(STYLES, tmp_path / STYLES.name)
+    monkeypatch.setenv(EXTRA_DATA_ENV, str(tmp_path))
+    return tmp_path
+
+
+def test_stats_add_up_across_segments(overlay, monkeypatch):
+    overlaid = index_stats("style", engine="bm25")
+    monkeypatch.delenv(EXTRA_DATA_ENV)
+    bundled = index_stats("style", engine="bm25")
+
+    assert overlaid["documents"] == 2 * bundled["documents"]
+    assert [segment["documents"] for segment in overlaid["segments"]] == [bundled["documents"]] * 2
+    for key in EXPANSION_TOTALS:
+        assert bundled[key] > 0
+        assert overlaid[key] == 2 * bundled[key]
+        assert [segment[key] for segment in overlaid["segments"]] == [bundled[key]] * 2
+
+
+def test_overlay_rows_are_searchable(overlay):
+    with open(overlay / STYLES.name, "a", encoding="utf-8") as f:
+        f.write("999,Zephyrcore Test Style,General,zephyrcore,,,,,,,,,,,,,,,,,,\n")
+    result = search("zephyrcore", "style", 3, engine="bm25")
+    assert result["results"][0]["Style Category"] == "Zephyrcore Test Style"
+
+
+def test_sqlite_compacts_overlays(overlay, monkeypatch):
+    overlaid = index_stats("style", engine="sqlite")
+    monkeypatch.delenv(EXTRA_DATA_ENV)
+    bundled = index_stats("style", engine="sqlite")
+    assert overlaid["compacted"] is True and overlaid["segments"] == 2
+    assert overlaid["documents"] == 2 * bundled["documents"]
+    for key in EXPANSION_TOTALS:
+        assert overlaid[key] == 2 * bundled[key]
+
+
+@pytest.mark.parametrize("engine", ["bm25", "sqlite"])
+def test_overlay_row_ranks_on_collection_statistics(tmp_path, monkeypatch, engine):
+    (tmp_path / "stacks").mkdir()
+    (tmp_path / "stacks" / "react.csv").write_text((DATA_DIR / "stacks" / "react.csv").read_text(
+        encoding="utf-8").splitlines(keepends=True)[0] + REACT_ROW, encoding="utf-8")
+    monkeypatch.setenv(EXTRA_DATA_ENV, str(tmp_path))
+    result = search_stack("zyzzyva hooks", "react", 5, engine=engine)
+    assert result["results"][0]["Guideline"] == "Zyzzyva hooks"
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Hybrid engine: the LSA model, fused ranking and the latency budget fallback"""
+
+from math import sqrt
+
+import pytest
+
+from core import BM25, search
+from semantic import BUDGET_ENV, LSA
+
+
+@pytest.fixture(scope="module")
+def lsa():
+    bm25 = BM25()
+    bm25.fit(["calm serene spa wellness", "serene quiet meditation spa", "neon gaming esports",
+              "esports gaming tournament stream", "calm quiet meditation wellness"])
+    model = LSA(dims=2)
+    model.fit(bm25.corpus, bm25.doc_freqs)
+    return model
+
+
+def test_document_vectors_are_unit_length(lsa):
+    assert lsa.k == 2
+    for start in range(0, len(lsa.doc_vectors), lsa.k):
+        row = lsa.doc_vectors[start:start + lsa.k]
+        assert sqrt(sum(x * x for x in row)) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_related_documents_score_higher(lsa):
+    # Row 0 never says "meditation" but shares its topic
+    sims = lsa.similarities(lsa.project(["meditation"]))
+    assert min(sims[0], sims[1], sims[4]) > max(sims[2], sims[3])
+    assert lsa.project(["unknownterm"]) is None
+
+
+def test_spent_budget_falls_back_to_bm25(monkeypatch):
+    monkeypatch.setenv(BUDGET_ENV, "0")
+    assert search("calm wellness", "style", 5, engine="hybrid") == search("calm wellness", "style", 5, engine="bm25")
+
+
+def test_semantic_layer_changes_the_ranking():
+    hybrid = search("calm wellness", "style", 5, engine="hybrid")["results"]
+    bm25 = search("calm wellness", "style", 5, engine="bm25")["results"]
+    assert hybrid[0] == bm25[0]
+    assert hybrid != bm25
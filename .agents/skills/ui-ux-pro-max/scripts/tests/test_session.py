@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""SearchSession memoization: what is reused and what is ranked afresh"""
+
+import pytest
+
+from core import SearchSession, search
+
+
+@pytest.mark.parametrize("engine", ["bm25", "sqlite"])
+def test_results_match_a_sessionless_search(engine):
+    session = SearchSession()
+    for query in ("glassmorphism card", "card glassmorphism", '"dark mode" dashboard', "dark mode dashboard"):
+        assert session.search(query, "style", 5, engine=engine) == search(query, "style", 5, engine=engine)
+
+
+def test_reordered_or_quoted_queries_are_ranked_afresh():
+    session = SearchSession()
+    session.search("dark mode dashboard", "style", 5, engine="bm25")
+    session.search("dashboard dark mode", "style", 5, engine="bm25")
+    session.search('"dark mode" dashboard', "style", 5, engine="bm25")
+    assert session.trace()["rankings"] == 3
+    assert session.trace()["ranking_hits"] == 0
+
+
+def test_same_query_reuses_the_ranking():
+    session = SearchSession()
+    first = session.search("Dark  Mode", "style", 5, engine="bm25")
+    second = session.search("dark mode", "style", 3, engine="bm25")
+    assert second["results"] == first["results"][:3]
+    trace = session.trace()
+    assert trace["rankings"] == 1 and trace["ranking_hits"] == 1
+
+
+def test_engines_do_not_share_rankings():
+    session = SearchSession()
+    session.search("dark mode", "style", 5, engine="bm25")
+    session.search("dark mode", "style", 5, engine="sqlite")
+    assert session.trace()["rankings"] == 2
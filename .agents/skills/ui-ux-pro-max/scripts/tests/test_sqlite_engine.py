@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""SQLite FTS5 backend: incremental compilation and query safety"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import iter_sources, search
+from sqlite_engine import DB_ENV, compile_database
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "uipro.sqlite3"
+    monkeypatch.setenv(DB_ENV, str(path))
+    return path
+
+
+def test_compiles_every_source_once(database):
+    sources = [name for name, filepath, *_ in iter_sources() if filepath.exists()]
+    first = compile_database(database)
+    assert [entry["name"] for entry in first] == sources
+    assert all(entry["built"] and entry["rows"] > 0 for entry in first)
+    assert not any(entry["built"] for entry in compile_database(database))
+    assert all(entry["built"] for entry in compile_database(database, force=True))
+
+
+@pytest.mark.parametrize("query", ['"unbalanced', "NEAR(a b)", "dark OR mode AND", "col:value", "a*", "-minus ^caret"])
+def test_fts_syntax_in_queries_is_text(database, query):
+    assert "error" not in search(query, "style", 3, engine="sqlite")
+
+
+def test_concurrent_readers(database):
+    compile_database(database)
+    expected = search("dark mode dashboard", "style", 5, engine="sqlite")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: search("dark mode dashboard", "style", 5, engine="sqlite"), range(16)))
+    assert all(result == expected for result in results)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Multi-stack search: merged and per-stack modes, tagging and de-duplication"""
+
+from core import search_stack
+
+STACKS = ["react", "nextjs", "html-tailwind"]
+
+
+def _stacks(row):
+    return row["Stack"].split(", ")
+
+
+def test_merged_top_list_is_tagged():
+    result = search_stack("form validation", STACKS, 5)
+    assert result["mode"] == "merged" and result["stacks"] == STACKS
+    assert result["count"] == len(result["results"]) == 5
+    for row in result["results"]:
+        assert set(_stacks(row)) <= set(STACKS)
+
+
+def test_single_stack_copy_matches_a_plain_search():
+    merged = search_stack("suspense data fetching", ["react", "nextjs"], 10)
+    for stack in ("react", "nextjs"):
+        alone = [row["Guideline"] for row in search_stack("suspense data fetching", stack, 10)["results"]]
+        found = [row["Guideline"] for row in merged["results"] if _stacks(row)[0] == stack]
+        assert found == [guideline for guideline in alone if guideline in found]
+
+
+def test_shared_guideline_shown_once():
+    result = search_stack("state management hooks", ["react", "react-native"], 30)
+    guidelines = [row["Guideline"] for row in result["results"]]
+    assert len(guidelines) == len(set(guidelines))
+    shared = next(row for row in result["results"] if row["Guideline"] == "Use useState for local state")
+    assert sorted(_stacks(shared)) == ["react", "react-native"]
+
+
+def test_per_stack_groups_in_requested_order():
+    result = search_stack("form validation", STACKS, 3, per_stack=True)
+    assert result["mode"] == "per-stack"
+    first_stacks = [_stacks(row)[0] for row in result["results"]]
+    assert first_stacks == sorted(first_stacks, key=STACKS.index)
+    assert all(first_stacks.count(stack) <= 3 for stack in STACKS)
+
+
+def test_invalid_requests():
+    assert "error" in search_stack("forms", ["react", "cobol"])
+    assert "error" in search_stack("forms", ["react", "nextjs"], offset=0)
+    assert "error" not in search_stack("forms", ["react"], offset=0)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Index-time alias expansion must add recall without reordering exact matches"""
+
+import pytest
+
+from core import Synonyms, load_synonyms, phrase_term, search
+
+ENGINES = ["bm25", "sqlite", "hybrid"]
+
+# Top results of these queries before synonyms existed
+BASELINE = [
+    ("glassmorphism", "style", "Style Category", ["Glassmorphism"]),
+    ("button hover", "style", "Style Category",
+     ["Interactive Product Demo", "Interactive Cursor Design", "3D Product Preview"]),
+    ("glassmorphism portfolio", "product", "Product Type",
+     ["Portfolio/Personal", "Construction/Architecture", "Freelancer Platform"]),
+]
+
+
+def _titles(result, column):
+    return [row[column] for row in result["results"]]
+
+
+@pytest.mark.parametrize("query,domain,column,expected", BASELINE)
+def test_baseline_rankings_kept(query, domain, column, expected):
+    result = search(query, domain, len(expected), engine="bm25")
+    assert _titles(result, column) == expected
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "hybrid"])
+@pytest.mark.parametrize("query,domain,column,expected", BASELINE)
+def test_baseline_top_result_kept(engine, query, domain, column, expected):
+    result = search(query, domain, 1, engine=engine)
+    assert _titles(result, column) == expected[:1]
+
+
+def test_expansion_weight_is_capped_per_document():
+    synonyms = Synonyms([(["glassmorphism", "glass", "frosted glass"], 0.7)])
+    tokens = ["glass", "card", "glass", "panel", "glass"]
+    expansions = synonyms.expand(tokens)
+    assert expansions["glassmorphism"] == 0.7
+    assert "glass" not in expansions
+
+
+def test_multi_word_alias_is_one_phrase_term():
+    synonyms = Synonyms([(["saas", "b2b software"], 0.7)])
+    assert synonyms.expand(["saas", "pricing"]) == {"b2b_software": 0.7}
+    assert synonyms.expand(["modern", "b2b", "software"]) == {"saas": 0.7, "b2b_software": 1.0}
+    assert synonyms.expand(["b2b", "marketing", "software"]) == {}
+    assert synonyms.phrase_terms(["b2b", "software", "tools"]) == [phrase_term(("b2b", "software"))]
+
+
+def test_generic_aliases_removed():
+    aliases = {phrase for phrases, _ in load_synonyms().groups for phrase in phrases}
+    for generic in ["shop", "clean", "calm", "showcase", "plans", "review", "hero", "course", "property"]:
+        assert (generic,) not in aliases
+    assert ("web", "app") not in aliases
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_alias_finds_term(engine):
+    result = search("frosted glass", "style", 3, engine=engine)
+    assert "Glassmorphism" in _titles(result, "Style Category")
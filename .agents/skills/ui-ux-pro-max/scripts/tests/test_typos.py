@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""SymSpell typo correction: length-scaled distance and confidence gating"""
+
+import pytest
+
+from core import SymSpell, correct_tokens, search
+
+ENGINES = ["bm25", "sqlite"]
+
+
+def _speller(words):
+    speller = SymSpell()
+    speller.build(words)
+    return speller
+
+
+def test_distance_scales_with_word_length():
+    speller = _speller({"voice": 3, "dashboard": 5, "glassmorphism": 2})
+    assert speller.lookup("invoice") == []                       # 2 edits, 7 chars
+    assert [w for w, _, _ in speller.lookup("dashbord")] == ["dashboard"]  # 1 edit
+    assert [w for w, _, _ in speller.lookup("glasmorphsm")] == ["glassmorphism"]  # 2 edits, 11 chars
+
+
+def test_ambiguous_correction_is_only_reported_when_query_matches():
+    vocabulary = {"glassmorphism": 4, "care": 3, "car": 2, "cards": 2}
+    speller = _speller(vocabulary)
+    tokens, corrections = correct_tokens(["glasmorphism", "card"], vocabulary, speller.lookup)
+    assert tokens == ["glassmorphism", "card"]
+    assert corrections["glasmorphism"] == {"terms": ["glassmorphism"], "applied": True}
+    assert corrections["card"]["applied"] is False
+
+
+def test_correction_applied_when_nothing_else_matches():
+    vocabulary = {"care": 3, "car": 2, "cards": 2}
+    tokens, corrections = correct_tokens(["card"], vocabulary, _speller(vocabulary).lookup)
+    assert tokens == corrections["card"]["terms"]
+    assert corrections["card"]["applied"] is True
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_no_confident_wrong_matches(engine):
+    invoice = search("invoice", "style", 3, engine=engine)
+    assert invoice["count"] == 0 and "corrections" not in invoice
+    kanban = search("kanban board", "product", 3, engine=engine)
+    assert "board" not in kanban.get("corrections", {})
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_typos_corrected(engine):
+    result = search("brutalsm", "style", 1, engine=engine)
+    assert result["corrections"] == {"brutalsm": ["brutalism"]}
+    assert result["results"][0]["Style Category"] == "Brutalism"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_low_confidence_correction_reported(engine):
+    result = search("glasmorphism card", "product", 2, engine=engine)
+    assert result["corrections"] == {"glasmorphism": ["glassmorphism"]}
+    assert "card" in result["suggestions"]